@@ -1,4 +1,6 @@
-from src.apps.test_functions import test_main
+from src.apps.bench import bench_main
+from src.apps.test_functions import test_main, test_names
+from src.core.operators import OperatorProfiler
 
 from argparse import ArgumentParser
 from json import load
@@ -20,9 +22,9 @@ parser_test.add_argument(
     '--test', 
     action='store', 
     nargs=1, 
-    type=int,
+    type=str,
     required=True,
-    choices=['sphere', 'rast'],
+    choices=test_names,
     help='benchmark function to test against'
 )
 parser_test.add_argument(
@@ -30,7 +32,7 @@ parser_test.add_argument(
     dest='optimizer', 
     action='store', 
     nargs=1, 
-    type=int,
+    type=str,
     required=True,
     choices=['pso', 'acd_pso', 'ese_apso'],
     help='optimization algorithm'
@@ -71,18 +73,217 @@ parser_test.add_argument(
     required=True,
     help='output verbosity'
 )
+parser_test.add_argument(
+    '--local-search', 
+    dest='local_search', 
+    action='store', 
+    nargs=1, 
+    choices=['gradient', 'adam', 'lbfgs'],
+    default=['gradient'],
+    help='local search method applied to the ese_apso elites'
+)
+parser_test.add_argument(
+    '--local-steps', 
+    dest='local_steps', 
+    action='store', 
+    nargs=1, 
+    type=int,
+    default=[1],
+    help='local search steps per iteration'
+)
 parser_test.add_argument(
     '--debug', 
     action='count', 
     help='output debug messages'
 )
+parser_test.add_argument(
+    '--profile', 
+    dest='profile', 
+    action='store', 
+    nargs='?', 
+    const='', 
+    default=None,
+    metavar='TRACE_PATH',
+    help='print per-operator timings and optionally write a Chrome trace to TRACE_PATH'
+)
+parser_test.add_argument(
+    '--profile-memory', 
+    dest='profile_memory', 
+    action='store_true', 
+    help='include allocation stats in the profile (slow)'
+)
+
+parser_bench = subparsers.add_parser(
+    'bench', 
+    help='benchmark optimizers across test functions, dimensions, swarm sizes and seeds'
+)
+parser_bench.add_argument(
+    '--opt', 
+    dest='optimizer', 
+    action='store', 
+    nargs='+', 
+    type=str,
+    default=['pso', 'acd_pso', 'ese_apso'],
+    choices=['pso', 'acd_pso', 'ese_apso'],
+    help='optimization algorithms'
+)
+parser_bench.add_argument(
+    '--test', 
+    action='store', 
+    nargs='+', 
+    type=str,
+    default=['sphere', 'rast'],
+    choices=test_names,
+    help='benchmark functions'
+)
+parser_bench.add_argument(
+    '--dim', 
+    dest='dim', 
+    action='store', 
+    nargs='+', 
+    type=int,
+    required=True,
+    help='dimensions of problem space'
+)
+parser_bench.add_argument(
+    '--n-part', 
+    dest='n_particles', 
+    action='store', 
+    nargs='+', 
+    type=int,
+    required=True,
+    help='numbers of particles'
+)
+parser_bench.add_argument(
+    '--n-iter', 
+    dest='n_iter', 
+    action='store', 
+    nargs=1, 
+    type=int,
+    required=True,
+    help='number of optimization iterations per run'
+)
+parser_bench.add_argument(
+    '--seeds', 
+    dest='seeds', 
+    action='store', 
+    nargs='+', 
+    type=int,
+    default=[0],
+    help='random seeds, one run per seed'
+)
+parser_bench.add_argument(
+    '--target', 
+    dest='target', 
+    action='store', 
+    nargs=1, 
+    type=float,
+    default=None,
+    help='fitness target for time-to-target (defaults per benchmark function)'
+)
+parser_bench.add_argument(
+    '--out', 
+    dest='out', 
+    action='store', 
+    nargs=1, 
+    type=str,
+    default=None,
+    help='path of the JSON results file (printed to stdout if omitted)'
+)
+parser_bench.add_argument(
+    '--baseline', 
+    dest='baseline', 
+    action='store', 
+    nargs=1, 
+    type=str,
+    default=None,
+    help='JSON results file to compare against'
+)
+parser_bench.add_argument(
+    '--tolerance', 
+    dest='tolerance', 
+    action='store', 
+    nargs=1, 
+    type=float,
+    default=[0.1],
+    help='relative tolerance for baseline regressions'
+)
+parser_bench.add_argument(
+    '--gate-throughput', 
+    dest='gate_throughput', 
+    action='store_true', 
+    help='fail on throughput regressions instead of only reporting them as warnings'
+)
+parser_bench.add_argument(
+    '--eval-delay', 
+    dest='eval_delay', 
+    action='store', 
+    nargs=1, 
+    type=float,
+    default=[0.],
+    help='artificial cost in seconds added to every fitness evaluation'
+)
+parser_bench.add_argument(
+    '--eval-work', 
+    dest='eval_work', 
+    action='store', 
+    nargs=1, 
+    type=int,
+    default=[0],
+    help='artificial CPU work (elementwise passes over the batch) added to every fitness call'
+)
+parser_bench.add_argument(
+    '--dtype', 
+    dest='dtype', 
+    action='store', 
+    nargs=1, 
+    type=str,
+    default=['float64'],
+    choices=['float32', 'float64'],
+    help='floating point type of the swarm state'
+)
+parser_bench.add_argument(
+    '--storage', 
+    dest='storage', 
+    action='store', 
+    nargs=1, 
+    type=str,
+    default=['array'],
+    choices=['array', 'memmap'],
+    help='swarm state backend (memmap keeps positions, velocities and personal bests in files on disk)'
+)
+parser_bench.add_argument(
+    '--no-memory', 
+    dest='no_memory', 
+    action='store_true', 
+    help='skip the traced run used to measure peak memory'
+)
+parser_bench.add_argument(
+    '--verbosity', 
+    dest='verbosity', 
+    action='store', 
+    nargs=1, 
+    type=int,
+    default=[0],
+    help='output verbosity'
+)
 
 
 def main(args):
     app = args['app']
     
     if app == 'test':
-        test_main(args)
+        if args.get('profile') is None:
+            test_main(args)
+        else:
+            with OperatorProfiler(track_memory=args.get('profile_memory', False)) as profiler:
+                test_main(args)
+            print(profiler.summary())
+            if args['profile']:
+                profiler.save_trace(args['profile'])
+    elif app == 'bench':
+        if bench_main(args) > 0:
+            sys.exit(1)
     else:
         raise ValueError(f'unrecognized app name "{app}"')
 
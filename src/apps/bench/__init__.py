@@ -0,0 +1,4 @@
+from .bench_runner import main as bench_main
+
+if __name__=='__main__':
+    pass
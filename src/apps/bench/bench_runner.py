@@ -0,0 +1,328 @@
+from itertools import product
+from json import dump, dumps, load
+from platform import python_version
+from statistics import median
+from time import perf_counter, strftime
+from typing import Any, Dict, Iterator, List, Tuple
+import tracemalloc
+
+import numpy
+from numpy import repeat
+from numpy.random import seed as np_seed
+
+from ..test_functions import get_test
+from ...pso import IterationRecord, ParticleSwarmBase, pso_iterate
+from ...pso.selectors import elite
+from ...pso.initializers import uniform
+from ...pso.adaptive_complex_directed import ParticleSwarmAdaptiveComplexDirected, acd_pso_iterate, batch_diff
+from ...pso.ese_adaptive import ParticleSwarmAPSOESE, apso_ese_iterate
+
+
+targets = {
+    'sphere': -1e-4,
+    'rast': -1.,
+    'ackley': -1e-2,
+    'rosenbrock': -1e-2,
+    'griewank': -1e-2,
+    'schwefel': -1e-2,
+    'levy': -1e-2,
+    'zakharov': -1e-4
+}
+
+_CASE_KEYS = ('optimizer', 'test', 'dim', 'n_particles', 'n_iter', 'eval_delay', 'eval_work', 'dtype', 'storage', 'seed')
+
+
+def _iterate(
+    optim: str, 
+    test_name: str, 
+    dim: int, 
+    n_particles: int, 
+    n_iter: int, 
+    eval_delay: float, 
+    eval_work: int,
+    dtype: str,
+    storage: str
+) -> Iterator[IterationRecord]:
+    test = get_test(test_name, dim, eval_delay, eval_work)
+    fitness = test['fitness']
+    gradient = test['gradient_batch']
+    bounds = test['bounds']
+    bounds_vel = tuple(map(lambda x: 0.2 * x, bounds))
+    
+    pos_initializer = lambda n: uniform(n, *bounds)
+    vel_initializer = lambda n: uniform(n, *bounds)
+    
+    pos_bound_lower = repeat(bounds[0], dim)
+    pos_bound_upper = repeat(bounds[1], dim)
+    vel_bound_lower = repeat(bounds_vel[0], dim)
+    vel_bound_upper = repeat(bounds_vel[1], dim)
+    
+    if optim == 'pso':
+        swarm = ParticleSwarmBase(
+            n_particles=n_particles,
+            pos_len=dim,
+            pos_initializer=pos_initializer,
+            vel_initializer=vel_initializer,
+            c_initializer=(2., 2.),
+            storage=storage,
+            dtype=dtype
+        )
+        return pso_iterate(
+            swarm,
+            fitness_fn=fitness,
+            n_iter=n_iter,
+            bound_lower=pos_bound_lower,
+            bound_upper=pos_bound_upper,
+            vel_bound_lower=vel_bound_lower,
+            vel_bound_upper=vel_bound_upper,
+            topology_dist_fn='euclidean',
+            threshold=2.,
+            neighbor_search='auto',
+            vectorized=True
+        )
+    elif optim == 'acd_pso':
+        swarm = ParticleSwarmAdaptiveComplexDirected(
+            n_particles=n_particles,
+            pos_len=dim,
+            pos_initializer=pos_initializer,
+            vel_initializer=vel_initializer,
+            c_initializer=(2., 2.),
+            prob_rand_connection=0.1,
+            dist_threshold=2 * dim,
+            diff_eps=1e-8,
+            init_inertia=0.9,
+            final_inertia=0.4,
+            n_iter=n_iter,
+            fitness_fn=fitness,
+            dist_fn='euclidean',
+            diff_fn=batch_diff(lambda x, y: abs(x - y)),
+            storage=storage,
+            dtype=dtype
+        )
+        return acd_pso_iterate(
+            swarm=swarm,
+            bound_lower=pos_bound_lower,
+            bound_upper=pos_bound_upper,
+            vel_bound_lower=vel_bound_lower,
+            vel_bound_upper=vel_bound_upper
+        )
+    elif optim == 'ese_apso':
+        swarm = ParticleSwarmAPSOESE(
+            n_particles=n_particles,
+            pos_len=dim,
+            pos_initializer=pos_initializer,
+            vel_initializer=vel_initializer,
+            c_initializer=(2., 2.),
+            w_initializer=0.9,
+            storage=storage,
+            dtype=dtype
+        )
+        return apso_ese_iterate(
+            fitness_fn=fitness,
+            swarm=swarm,
+            n_iter=n_iter,
+            dist_fn='euclidean',
+            pos_bound_lower=pos_bound_lower,
+            pos_bound_upper=pos_bound_upper,
+            vel_bound_lower=vel_bound_lower,
+            vel_bound_upper=vel_bound_upper,
+            sigma_min=0.01,
+            sigma_max=1.0,
+            stagnation_shock_mult=1.01,
+            local_search_params={
+                'lr': 1e-3,
+                'choose_candidates': lambda swarm: elite(len(swarm)//4, swarm),
+                'gradient_fn': gradient
+            }
+        )
+    raise ValueError(f'unrecognized optimizer "{optim}"')
+
+
+def run_case(
+    optim: str, 
+    test_name: str, 
+    dim: int, 
+    n_particles: int, 
+    seed: int, 
+    n_iter: int, 
+    target: float, 
+    measure_memory: bool = True,
+    eval_delay: float = 0.,
+    eval_work: int = 0,
+    dtype: str = 'float64',
+    storage: str = 'array'
+) -> Dict[str, Any]:
+    np_seed(seed)
+    records = []
+    t_start = perf_counter()
+    for record in _iterate(optim, test_name, dim, n_particles, n_iter, eval_delay, eval_work, dtype, storage):
+        records.append(record)
+    wall_time = perf_counter() - t_start
+    
+    reached = [record for record in records if record.best_fitness is not None and record.best_fitness >= target]
+    last = records[-1]
+    out = {
+        'optimizer': optim,
+        'test': test_name,
+        'dim': dim,
+        'n_particles': n_particles,
+        'seed': seed,
+        'n_iter': len(records),
+        'eval_delay': eval_delay,
+        'eval_work': eval_work,
+        'dtype': dtype,
+        'storage': storage,
+        'target': target,
+        'wall_time': wall_time,
+        'iters_per_sec': len(records) / wall_time,
+        'evals_per_sec': last.n_evaluations / wall_time,
+        'time_to_target': reached[0].elapsed if len(reached) > 0 else None,
+        'iters_to_target': reached[0].iteration if len(reached) > 0 else None,
+        'evals_to_target': reached[0].n_evaluations if len(reached) > 0 else None,
+        'final_fitness': last.best_fitness,
+        'peak_memory_mb': None
+    }
+    
+    if measure_memory:
+        np_seed(seed)
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        for _ in _iterate(optim, test_name, dim, n_particles, n_iter, eval_delay, eval_work, dtype, storage):
+            pass
+        out['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        if started:
+            tracemalloc.stop()
+    
+    return out
+
+
+def _config_key(result: Dict[str, Any]) -> Tuple:
+    return tuple(result.get(key) for key in _CASE_KEYS if key != 'seed')
+
+
+def compare(
+    results: List[Dict[str, Any]], 
+    baseline: List[Dict[str, Any]], 
+    tolerance: float = 0.1, 
+    gate_throughput: bool = False
+) -> Tuple[List[str], List[str]]:
+    def _group(rows):
+        groups = {}
+        for row in rows:
+            groups.setdefault(_config_key(row), []).append(row)
+        return groups
+    
+    def _median(rows, name):
+        vals = [row[name] for row in rows if row.get(name) is not None]
+        return median(vals) if len(vals) > 0 else None
+    
+    regressions, warnings = [], []
+    baseline_groups = _group(baseline)
+    for config, rows in _group(results).items():
+        if config not in baseline_groups:
+            continue
+        base_rows = baseline_groups[config]
+        label = '/'.join(str(val) for val in config)
+        
+        # wall-clock throughput is noisy across machines and runs, so it only fails the comparison on request
+        for name in ['iters_per_sec', 'evals_per_sec']:
+            crnt, base = _median(rows, name), _median(base_rows, name)
+            if crnt is not None and base is not None and crnt < (1. - tolerance) * base:
+                (regressions if gate_throughput else warnings).append(f'{label}: {name} {crnt:.4g} < baseline {base:.4g}')
+        
+        crnt, base = _median(rows, 'peak_memory_mb'), _median(base_rows, 'peak_memory_mb')
+        if crnt is not None and base is not None and crnt > (1. + tolerance) * base:
+            regressions.append(f'{label}: peak_memory_mb {crnt:.4g} > baseline {base:.4g}')
+        
+        crnt, base = _median(rows, 'final_fitness'), _median(base_rows, 'final_fitness')
+        if crnt is not None and base is not None and crnt < base - tolerance * max(abs(base), 1.):
+            regressions.append(f'{label}: final_fitness {crnt:.6g} < baseline {base:.6g}')
+        
+        n_reached = sum(row['time_to_target'] is not None for row in rows)
+        n_reached_base = sum(row['time_to_target'] is not None for row in base_rows)
+        if n_reached < n_reached_base:
+            regressions.append(f'{label}: target reached in {n_reached} runs (baseline {n_reached_base})')
+    
+    return regressions, warnings
+
+
+def _summary(results: List[Dict[str, Any]]) -> str:
+    header = (
+        f'{"optimizer":<10} {"test":<13} {"dim":>5} {"n_part":>7} {"seed":>5} {"it/s":>10} '
+        f'{"evals/s":>12} {"mem (MiB)":>10} {"t_target":>10} {"final":>14}'
+    )
+    lines = [header, '-' * len(header)]
+    for row in results:
+        memory = '-' if row['peak_memory_mb'] is None else f'{row["peak_memory_mb"]:.2f}'
+        time_to_target = '-' if row['time_to_target'] is None else f'{row["time_to_target"]:.4f}'
+        lines.append(
+            f'{row["optimizer"]:<10} {row["test"]:<13} {row["dim"]:>5} {row["n_particles"]:>7} {row["seed"]:>5} '
+            f'{row["iters_per_sec"]:>10.2f} {row["evals_per_sec"]:>12.1f} {memory:>10} {time_to_target:>10} '
+            f'{row["final_fitness"]:>14.6g}'
+        )
+    return '\n'.join(lines)
+
+
+def main(args) -> int:
+    optimizers = args['optimizer']
+    test_names = args['test']
+    dims = args['dim']
+    swarm_sizes = args['n_particles']
+    seeds = args.get('seeds') or [0]
+    n_iter = args['n_iter'][0]
+    verbosity = (args.get('verbosity') or [0])[0]
+    measure_memory = not args.get('no_memory', False)
+    tolerance = (args.get('tolerance') or [0.1])[0]
+    gate_throughput = args.get('gate_throughput', False)
+    target_override = args.get('target')
+    eval_delay = (args.get('eval_delay') or [0.])[0]
+    eval_work = (args.get('eval_work') or [0])[0]
+    dtype = (args.get('dtype') or ['float64'])[0]
+    storage = (args.get('storage') or ['array'])[0]
+    out_fpath = (args.get('out') or [None])[0]
+    baseline_fpath = (args.get('baseline') or [None])[0]
+    
+    results = []
+    for optim, test_name, dim, n_particles, seed in product(optimizers, test_names, dims, swarm_sizes, seeds):
+        target = targets[test_name.replace('_sr', '')] if target_override is None else target_override[0]
+        if verbosity > 0:
+            print(f'Running {optim} on {test_name} (dim={dim}, n_particles={n_particles}, seed={seed})')
+        results.append(run_case(
+            optim, test_name, dim, n_particles, seed, n_iter, target, measure_memory, eval_delay, eval_work, dtype, storage
+        ))
+    
+    report = {
+        'meta': {
+            'timestamp': strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': python_version(),
+            'numpy': numpy.__version__,
+            'n_iter': n_iter,
+            'seeds': seeds
+        },
+        'results': results
+    }
+    if out_fpath is None:
+        print(dumps(report, indent=2))
+    else:
+        with open(out_fpath, 'w') as fp:
+            dump(report, fp, indent=2)
+        print(_summary(results))
+    
+    if baseline_fpath is not None:
+        with open(baseline_fpath, 'r') as fp:
+            baseline = load(fp)['results']
+        regressions, warnings = compare(results, baseline, tolerance, gate_throughput)
+        if len(warnings) > 0:
+            print(f'{len(warnings)} throughput warning(s) against {baseline_fpath} (pass --gate-throughput to fail on them):')
+            for warning in warnings:
+                print(f'  {warning}')
+        if len(regressions) > 0:
+            print(f'{len(regressions)} regression(s) against {baseline_fpath}:')
+            for regression in regressions:
+                print(f'  {regression}')
+            return 1
+        print(f'No regressions against {baseline_fpath}')
+    
+    return 0
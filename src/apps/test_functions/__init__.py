@@ -1,4 +1,4 @@
-from .test_runner import main as test_main
+from .test_runner import get_test, main as test_main, test_names
 
 if __name__=='__main__':
     pass
@@ -0,0 +1,35 @@
+from numpy import cos, e, exp, ndarray, pi, power, sin, sqrt, where
+
+from ...pso import ParticleInstance
+from ...pso.fitness import batch_fitness
+
+
+def fitness_ackley(x: ndarray) -> float:
+    dim = x.shape[-1]
+    r = sqrt(power(x, 2).sum(axis=-1) / dim)
+    c = cos(2. * pi * x).sum(axis=-1) / dim
+    return -1. * (-20. * exp(-0.2 * r) - exp(c) + 20. + e)
+
+
+fitness_ackley_batch = batch_fitness(fitness_ackley)
+
+
+def gradient_ackley(x: ndarray) -> ndarray:
+    dim = x.shape[-1]
+    r = sqrt(power(x, 2).sum(axis=-1, keepdims=True) / dim)
+    c = cos(2. * pi * x).sum(axis=-1, keepdims=True) / dim
+    safe_r = where(r > 0., r, 1.)
+    grad_r = where(r > 0., 4. * exp(-0.2 * r) * x / (dim * safe_r), 0.)
+    grad_c = 2. * pi * exp(c) * sin(2. * pi * x) / dim
+    return -1. * (grad_r + grad_c)
+
+
+def fitness_ackley_particle(particle: ParticleInstance):
+    return fitness_ackley(particle.solution)
+
+
+def gradient_ackley_particle(particle: ParticleInstance):
+    return gradient_ackley(particle.solution)
+
+
+bounds = (-32.768, 32.768)
@@ -0,0 +1,33 @@
+from numpy import arange, concatenate, cos, cumprod, ndarray, ones_like, power, sin, sqrt
+
+from ...pso import ParticleInstance
+from ...pso.fitness import batch_fitness
+
+
+def fitness_griewank(x: ndarray) -> float:
+    scale = sqrt(arange(1, x.shape[-1] + 1))
+    return -1. * (power(x, 2).sum(axis=-1) / 4000. - cos(x / scale).prod(axis=-1) + 1.)
+
+
+fitness_griewank_batch = batch_fitness(fitness_griewank)
+
+
+def gradient_griewank(x: ndarray) -> ndarray:
+    scale = sqrt(arange(1, x.shape[-1] + 1))
+    c = cos(x / scale)
+    # product of every other cosine term without dividing by c, which may be 0
+    ones = ones_like(c[..., :1])
+    left = concatenate([ones, cumprod(c[..., :-1], axis=-1)], axis=-1)
+    right = concatenate([cumprod(c[..., :0:-1], axis=-1)[..., ::-1], ones], axis=-1)
+    return -1. * (x / 2000. + sin(x / scale) / scale * left * right)
+
+
+def fitness_griewank_particle(particle: ParticleInstance):
+    return fitness_griewank(particle.solution)
+
+
+def gradient_griewank_particle(particle: ParticleInstance):
+    return gradient_griewank(particle.solution)
+
+
+bounds = (-600., 600.)
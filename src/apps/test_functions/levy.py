@@ -0,0 +1,44 @@
+from numpy import ndarray, pi, power, sin, zeros_like
+
+from ...pso import ParticleInstance
+from ...pso.fitness import batch_fitness
+
+
+def fitness_levy(x: ndarray) -> float:
+    w = 1. + (x - 1.) / 4.
+    head, last = w[..., :-1], w[..., -1]
+    return -1. * (
+        power(sin(pi * w[..., 0]), 2)
+        + (power(head - 1., 2) * (1. + 10. * power(sin(pi * head + 1.), 2))).sum(axis=-1)
+        + power(last - 1., 2) * (1. + power(sin(2. * pi * last), 2))
+    )
+
+
+fitness_levy_batch = batch_fitness(fitness_levy)
+
+
+def gradient_levy(x: ndarray) -> ndarray:
+    w = 1. + (x - 1.) / 4.
+    head, last = w[..., :-1], w[..., -1]
+    grad = zeros_like(w)
+    grad[..., 0] += pi * sin(2. * pi * w[..., 0])
+    grad[..., :-1] += (
+        2. * (head - 1.) * (1. + 10. * power(sin(pi * head + 1.), 2))
+        + 10. * pi * power(head - 1., 2) * sin(2. * (pi * head + 1.))
+    )
+    grad[..., -1] += (
+        2. * (last - 1.) * (1. + power(sin(2. * pi * last), 2))
+        + 2. * pi * power(last - 1., 2) * sin(4. * pi * last)
+    )
+    return -0.25 * grad
+
+
+def fitness_levy_particle(particle: ParticleInstance):
+    return fitness_levy(particle.solution)
+
+
+def gradient_levy_particle(particle: ParticleInstance):
+    return gradient_levy(particle.solution)
+
+
+bounds = (-10., 10.)
@@ -1,10 +1,14 @@
 from numpy import cos, ndarray, pi, power, sin
 
 from ...pso import ParticleInstance
+from ...pso.fitness import batch_fitness
 
 
 def fitness_rastrigin(x: ndarray) -> float:
-    return -1. * (power(x, 2) + 10. * cos(2. * pi * x) + 10.).sum()
+    return -1. * (power(x, 2) + 10. * cos(2. * pi * x) + 10.).sum(axis=-1)
+
+
+fitness_rastrigin_batch = batch_fitness(fitness_rastrigin)
 
 
 def gradient_fitness_rastrigin(x: ndarray) -> ndarray:
@@ -0,0 +1,32 @@
+from numpy import ndarray, power, zeros_like
+
+from ...pso import ParticleInstance
+from ...pso.fitness import batch_fitness
+
+
+def fitness_rosenbrock(x: ndarray) -> float:
+    head, tail = x[..., :-1], x[..., 1:]
+    return -1. * (100. * power(tail - power(head, 2), 2) + power(1. - head, 2)).sum(axis=-1)
+
+
+fitness_rosenbrock_batch = batch_fitness(fitness_rosenbrock)
+
+
+def gradient_rosenbrock(x: ndarray) -> ndarray:
+    head, tail = x[..., :-1], x[..., 1:]
+    diff = tail - power(head, 2)
+    grad = zeros_like(x)
+    grad[..., :-1] -= 400. * head * diff + 2. * (1. - head)
+    grad[..., 1:] += 200. * diff
+    return -1. * grad
+
+
+def fitness_rosenbrock_particle(particle: ParticleInstance):
+    return fitness_rosenbrock(particle.solution)
+
+
+def gradient_rosenbrock_particle(particle: ParticleInstance):
+    return gradient_rosenbrock(particle.solution)
+
+
+bounds = (-5., 10.)
@@ -0,0 +1,29 @@
+from numpy import abs, cos, ndarray, sin, sqrt
+
+from ...pso import ParticleInstance
+from ...pso.fitness import batch_fitness
+
+
+def fitness_schwefel(x: ndarray) -> float:
+    return -1. * (418.9828872724338 * x.shape[-1] - (x * sin(sqrt(abs(x)))).sum(axis=-1))
+
+
+fitness_schwefel_batch = batch_fitness(fitness_schwefel)
+
+
+def gradient_schwefel(x: ndarray) -> ndarray:
+    s = sqrt(abs(x))
+    return sin(s) + 0.5 * s * cos(s)
+
+
+def fitness_schwefel_particle(particle: ParticleInstance):
+    return fitness_schwefel(particle.solution)
+
+
+def gradient_schwefel_particle(particle: ParticleInstance):
+    return gradient_schwefel(particle.solution)
+
+
+bounds = (-500., 500.)
+# the optimum sits at this value in every coordinate
+optimum = 420.9687462275036
@@ -1,10 +1,14 @@
 from numpy import ndarray, power
 
 from ...pso import ParticleInstance
+from ...pso.fitness import batch_fitness
 
 
 def fitness_sphere(x: ndarray) -> float:
-    return -1. * power(x, 2).sum()
+    return -1. * power(x, 2).sum(axis=-1)
+
+
+fitness_sphere_batch = batch_fitness(fitness_sphere)
 
 
 def fitness_sphere_particle(particle: ParticleInstance):
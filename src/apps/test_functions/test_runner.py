@@ -1,12 +1,21 @@
 from numpy import repeat
 from scipy.spatial.distance import euclidean, cityblock
 
-from .rastrigin import fitness_rastrigin_particle, gradient_fitness_rastrigin_particle, bounds as rastrigin_bounds
-from .sphere import fitness_sphere_particle, gradient_sphere_particle, bounds as sphere_bounds
+from .ackley import fitness_ackley_batch, gradient_ackley, gradient_ackley_particle, bounds as ackley_bounds
+from .griewank import fitness_griewank_batch, gradient_griewank, gradient_griewank_particle, bounds as griewank_bounds
+from .levy import fitness_levy_batch, gradient_levy, gradient_levy_particle, bounds as levy_bounds
+from .rastrigin import fitness_rastrigin_batch, gradient_fitness_rastrigin, gradient_fitness_rastrigin_particle, bounds as rastrigin_bounds
+from .rosenbrock import fitness_rosenbrock_batch, gradient_rosenbrock, gradient_rosenbrock_particle, bounds as rosenbrock_bounds
+from .schwefel import fitness_schwefel_batch, gradient_schwefel, gradient_schwefel_particle, bounds as schwefel_bounds, optimum as schwefel_optimum
+from .sphere import fitness_sphere_batch, gradient_sphere, gradient_sphere_particle, bounds as sphere_bounds
+from .transforms import ShiftedRotated, with_cost
+from .zakharov import fitness_zakharov_batch, gradient_zakharov, gradient_zakharov_particle, bounds as zakharov_bounds
 from ...pso import ParticleInstance, ParticleSwarmBase, pso_maximize
+from ...pso.fitness import batch_fitness
+from ...pso.local_search import batch_gradient
 from ...pso.selectors import elite
 from ...pso.initializers import uniform
-from ...pso.adaptive_complex_directed import ParticleSwarmAdaptiveComplexDirected, acd_pso_maximize
+from ...pso.adaptive_complex_directed import ParticleSwarmAdaptiveComplexDirected, acd_pso_maximize, batch_diff
 from ...pso.ese_adaptive import ParticleSwarmAPSOESE, apso_ese_maximize
 
 
@@ -27,9 +36,10 @@ def main(args):
     verbosity = args['verbosity'][0]
     debug = args.get('debug') is not None and args.get('debug') > 0
     
-    fitness = tests[test_name]['fitness']
-    gradient = tests[test_name]['gradient']
-    bounds = tests[test_name]['bounds']
+    test = get_test(test_name, dim)
+    fitness = test['fitness']
+    gradient = test['gradient_batch']
+    bounds = test['bounds']
     bounds_vel = tuple(map(lambda x: 0.2 * x, bounds))
     
     pos_initializer = lambda n: uniform(n, *bounds)
@@ -49,7 +59,7 @@ def main(args):
                 
         swarm = ParticleSwarmBase(
             n_particles=n_particles,
-            pos_len=2*dim,
+            pos_len=dim,
             pos_initializer=pos_initializer,
             vel_initializer=vel_initializer,
             c_initializer=c_initializer,
@@ -64,7 +74,7 @@ def main(args):
             bound_upper=pos_bound_upper,
             vel_bound_lower=vel_bound_lower,
             vel_bound_upper=vel_bound_upper,
-            topology_dist_fn=particle_dist_euclidean,
+            topology_dist_fn='euclidean',
             threshold=2.,
             verbosity=verbosity
         )
@@ -82,8 +92,8 @@ def main(args):
             final_inertia=0.4,
             n_iter=n_iter,
             fitness_fn=fitness,
-            dist_fn=particle_dist_euclidean,
-            diff_fn=lambda x, y: abs(x - y)
+            dist_fn='euclidean',
+            diff_fn=batch_diff(lambda x, y: abs(x - y))
         )
         
         acd_pso_maximize(
@@ -108,7 +118,7 @@ def main(args):
             fitness_fn=fitness,
             swarm=swarm,
             n_iter=n_iter,
-            dist_fn=particle_dist_euclidean,
+            dist_fn='euclidean',
             pos_bound_lower=pos_bound_lower,
             pos_bound_upper=pos_bound_upper,
             vel_bound_lower=vel_bound_lower,
@@ -125,7 +135,9 @@ def main(args):
             local_search_params={
                 'lr': 1e-3,
                 'choose_candidates': lambda swarm: elite(len(swarm)//4, swarm),
-                'gradient_fn': gradient
+                'gradient_fn': gradient,
+                'method': args.get('local_search', ['gradient'])[0],
+                'n_steps': args.get('local_steps', [1])[0]
             },
             debug=debug
         )
@@ -134,13 +146,75 @@ def main(args):
 
 tests = {
     'rast': {
-        'fitness': fitness_rastrigin_particle,
+        'fitness': fitness_rastrigin_batch,
         'gradient': gradient_fitness_rastrigin_particle,
+        'gradient_batch': gradient_fitness_rastrigin,
         'bounds': rastrigin_bounds
     },
     'sphere': {
-        'fitness': fitness_sphere_particle,
+        'fitness': fitness_sphere_batch,
         'gradient': gradient_sphere_particle,
+        'gradient_batch': gradient_sphere,
         'bounds': sphere_bounds
+    },
+    'ackley': {
+        'fitness': fitness_ackley_batch,
+        'gradient': gradient_ackley_particle,
+        'gradient_batch': gradient_ackley,
+        'bounds': ackley_bounds
+    },
+    'rosenbrock': {
+        'fitness': fitness_rosenbrock_batch,
+        'gradient': gradient_rosenbrock_particle,
+        'gradient_batch': gradient_rosenbrock,
+        'bounds': rosenbrock_bounds
+    },
+    'griewank': {
+        'fitness': fitness_griewank_batch,
+        'gradient': gradient_griewank_particle,
+        'gradient_batch': gradient_griewank,
+        'bounds': griewank_bounds
+    },
+    'schwefel': {
+        'fitness': fitness_schwefel_batch,
+        'gradient': gradient_schwefel_particle,
+        'gradient_batch': gradient_schwefel,
+        'bounds': schwefel_bounds,
+        'optimum': schwefel_optimum
+    },
+    'levy': {
+        'fitness': fitness_levy_batch,
+        'gradient': gradient_levy_particle,
+        'gradient_batch': gradient_levy,
+        'bounds': levy_bounds
+    },
+    'zakharov': {
+        'fitness': fitness_zakharov_batch,
+        'gradient': gradient_zakharov_particle,
+        'gradient_batch': gradient_zakharov,
+        'bounds': zakharov_bounds
+    }
+}
+
+test_names = list(tests.keys()) + [f'{name}_sr' for name in tests.keys()]
+
+
+def get_test(test_name: str, dim: int, delay: float = 0., work: int = 0, seed: int = 0) -> dict:
+    if test_name.endswith('_sr') and test_name[:-3] in tests:
+        base = tests[test_name[:-3]]
+        shifted = ShiftedRotated(
+            base['fitness'].fn, base['gradient_batch'], dim, base['bounds'], seed=seed, base_optimum=base.get('optimum')
+        )
+        fn, gradient, gradient_batch = shifted.fitness, shifted.gradient_particle, shifted.gradient
+    elif test_name in tests:
+        base = tests[test_name]
+        fn, gradient, gradient_batch = base['fitness'].fn, base['gradient'], base['gradient_batch']
+    else:
+        raise ValueError(f'unrecognized test function "{test_name}"')
+    
+    return {
+        'fitness': batch_fitness(with_cost(fn, delay, work)),
+        'gradient': gradient,
+        'gradient_batch': batch_gradient(gradient_batch),
+        'bounds': base['bounds']
     }
-}
\ No newline at end of file
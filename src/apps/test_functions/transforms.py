@@ -0,0 +1,102 @@
+from time import perf_counter, sleep
+from typing import Callable, Optional, Tuple
+
+from numpy import asarray, broadcast_to, diag, ndarray, sign, sin, zeros
+from numpy.linalg import qr
+from numpy.random import default_rng
+
+from ...pso import ParticleInstance
+from ...pso.fitness import BatchFitness, batch_fitness
+
+
+def rotation_matrix(dim: int, seed: Optional[int] = None) -> ndarray:
+    q, r = qr(default_rng(seed).standard_normal((dim, dim)))
+    # fix column signs so the rotation is uniformly (Haar) distributed
+    return q * sign(diag(r))
+
+
+class ShiftedRotated(object):
+    def __init__(
+        self, 
+        fitness_fn: Callable[[ndarray], ndarray], 
+        gradient_fn: Callable[[ndarray], ndarray], 
+        dim: int, 
+        bounds: Tuple[float, float],
+        shift: Optional[ndarray] = None,
+        rotate: bool = True,
+        seed: Optional[int] = 0,
+        base_optimum: Optional[ndarray] = None
+    ) -> None:
+        super(ShiftedRotated, self).__init__()
+        rng = default_rng(seed)
+        base_optimum = zeros(dim) if base_optimum is None else broadcast_to(asarray(base_optimum, dtype=float), (dim,))
+        # a random shift places the base function's optimum, not its origin, inside the bounds
+        location = rng.uniform(0.8 * bounds[0], 0.8 * bounds[1], dim) if shift is None else None
+        rotation = rotation_matrix(dim, rng.integers(2**32)) if rotate else None
+        moved_optimum = base_optimum if rotation is None else base_optimum @ rotation
+        if shift is None:
+            shift = location - moved_optimum
+        shift = asarray(shift, dtype=float)
+        if shift.shape != (dim,):
+            raise ValueError(f'shift must have shape ({dim},) (found {shift.shape})')
+        self.fitness_fn = fitness_fn
+        self.gradient_fn = gradient_fn
+        self.bounds = bounds
+        self.shift = shift
+        self.rotation = rotation
+        self.optimum = shift + moved_optimum
+        self.batch = batch_fitness(self.fitness)
+
+    def transform(self, x: ndarray) -> ndarray:
+        z = x - self.shift
+        return z if self.rotation is None else z @ self.rotation.T
+
+    def fitness(self, x: ndarray) -> ndarray:
+        return self.fitness_fn(self.transform(x))
+
+    def gradient(self, x: ndarray) -> ndarray:
+        grad = self.gradient_fn(self.transform(x))
+        return grad if self.rotation is None else grad @ self.rotation
+
+    def fitness_particle(self, particle: ParticleInstance):
+        return self.fitness(particle.solution)
+
+    def gradient_particle(self, particle: ParticleInstance):
+        return self.gradient(particle.solution)
+
+
+class ArtificialCost(object):
+    def __init__(self, fn: Callable[[ndarray], ndarray], delay: float = 0., work: int = 0) -> None:
+        super(ArtificialCost, self).__init__()
+        if delay < 0.:
+            raise ValueError('evaluation delay must be non-negative')
+        if work < 0:
+            raise ValueError('evaluation work must be non-negative')
+        self.fn = fn
+        self.delay = delay
+        self.work = work
+
+    def __call__(self, x: ndarray) -> ndarray:
+        n_rows = len(x) if x.ndim > 1 else 1
+        if self.work > 0:
+            burn = x.copy()
+            for _ in range(self.work):
+                burn = sin(burn)
+        if self.delay > 0.:
+            # sleep for the bulk of the delay and spin for the rest, sleep alone overshoots short delays
+            t_end = perf_counter() + self.delay * n_rows
+            if self.delay * n_rows > 1e-3:
+                sleep(self.delay * n_rows - 1e-3)
+            while perf_counter() < t_end:
+                pass
+        return self.fn(x)
+
+
+def with_cost(fn: Callable[[ndarray], ndarray], delay: float = 0., work: int = 0) -> Callable[[ndarray], ndarray]:
+    if delay == 0. and work == 0:
+        return fn
+    return ArtificialCost(fn, delay, work)
+
+
+def costly_fitness(fn: Callable[[ndarray], ndarray], delay: float = 0., work: int = 0) -> BatchFitness:
+    return batch_fitness(with_cost(fn, delay, work))
@@ -0,0 +1,29 @@
+from numpy import arange, ndarray, power
+
+from ...pso import ParticleInstance
+from ...pso.fitness import batch_fitness
+
+
+def fitness_zakharov(x: ndarray) -> float:
+    s = (0.5 * arange(1, x.shape[-1] + 1) * x).sum(axis=-1)
+    return -1. * (power(x, 2).sum(axis=-1) + power(s, 2) + power(s, 4))
+
+
+fitness_zakharov_batch = batch_fitness(fitness_zakharov)
+
+
+def gradient_zakharov(x: ndarray) -> ndarray:
+    coef = 0.5 * arange(1, x.shape[-1] + 1)
+    s = (coef * x).sum(axis=-1, keepdims=True)
+    return -1. * (2. * x + (2. * s + 4. * power(s, 3)) * coef)
+
+
+def fitness_zakharov_particle(particle: ParticleInstance):
+    return fitness_zakharov(particle.solution)
+
+
+def gradient_zakharov_particle(particle: ParticleInstance):
+    return gradient_zakharov(particle.solution)
+
+
+bounds = (-5., 10.)
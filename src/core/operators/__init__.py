@@ -1,4 +1,7 @@
-from .operators_base import PopulationOperatorBase, PopulationOperatorForEach, SequentialOperator
+from .operators_base import (
+    CompiledOperator, FusedForEach, PopulationOperatorBase, PopulationOperatorForEach, SequentialOperator
+)
+from .profiling import OperatorProfiler, count_evaluations
 
 
 if __name__=="__main__":
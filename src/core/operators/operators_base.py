@@ -1,6 +1,8 @@
 from abc import abstractmethod
 from operator import __add__, __mul__
+from typing import List, Optional
 
+from . import profiling
 from .generics import Population
 
 
@@ -9,11 +11,32 @@ class PopulationOperatorBase(object):
         pass
 
     def __call__(self, pop: Population) -> None:
-        self.op(pop)
+        if profiling.active is None:
+            self.op(pop)
+        else:
+            profiling.active.run(self, pop)
 
     def __add__(self, other: "PopulationOperatorBase") -> "SequentialOperator":
         return SequentialOperator(self, other)
 
+    def stages(self) -> List["PopulationOperatorBase"]:
+        return [self]
+
+    def fuse(self, other: "PopulationOperatorBase") -> Optional["PopulationOperatorBase"]:
+        return None
+
+    def compile(self) -> "PopulationOperatorBase":
+        stages = []
+        for stage in self.stages():
+            fused = stages[-1].fuse(stage) if len(stages) > 0 else None
+            if fused is None:
+                stages.append(stage)
+            else:
+                stages[-1] = fused
+        if len(stages) == 1:
+            return stages[0]
+        return CompiledOperator(stages)
+
     @classmethod
     @abstractmethod
     def op(self, pop: Population) -> None:
@@ -30,15 +53,62 @@ class PopulationOperatorForEach(PopulationOperatorBase):
         for instance in pop:
             self.op_single(instance)
 
+    def fuse(self, other: PopulationOperatorBase) -> Optional[PopulationOperatorBase]:
+        if isinstance(other, PopulationOperatorForEach):
+            return FusedForEach(self.stages() + other.stages())
+        return None
+
+
+class FusedForEach(PopulationOperatorForEach):
+    def __init__(self, operators: List[PopulationOperatorForEach]):
+        self.operators = operators
+
+    def op_single(self, instance) -> None:
+        for operator in self.operators:
+            operator.op_single(instance)
+
+    def stages(self) -> List[PopulationOperatorBase]:
+        return list(self.operators)
+
 
 class SequentialOperator(PopulationOperatorBase):
     def __init__(self, first: PopulationOperatorBase, second: PopulationOperatorBase):
         self.first = first
         self.second = second
 
+    def __call__(self, pop: Population) -> None:
+        self.op(pop)
+
     def __add__(self, other: "PopulationOperatorBase") -> "SequentialOperator":
         return super().__add__(other)
 
+    def stages(self) -> List[PopulationOperatorBase]:
+        stages = []
+        pending = [self]
+        while len(pending) > 0:
+            operator = pending.pop()
+            if isinstance(operator, SequentialOperator):
+                pending.append(operator.second)
+                pending.append(operator.first)
+            else:
+                stages.extend(operator.stages())
+        return stages
+
     def op(self, arg: Population) -> None:
         self.first(arg)
         self.second(arg)
+
+
+class CompiledOperator(PopulationOperatorBase):
+    def __init__(self, stages: List[PopulationOperatorBase]):
+        self._stages = stages
+
+    def __call__(self, pop: Population) -> None:
+        self.op(pop)
+
+    def stages(self) -> List[PopulationOperatorBase]:
+        return list(self._stages)
+
+    def op(self, pop: Population) -> None:
+        for stage in self._stages:
+            stage(pop)
@@ -0,0 +1,149 @@
+from json import dump
+from os import getpid
+from threading import get_ident
+from time import perf_counter_ns
+from typing import Dict, List
+import tracemalloc
+
+
+active = None
+
+
+def count_evaluations(n: int) -> None:
+    if active is not None:
+        active.count_evaluations(n)
+
+
+class OperatorStats(object):
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.total_ns = 0
+        self.evaluations = 0
+        self.alloc_net = 0
+        self.alloc_peak = 0
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.calls if self.calls > 0 else 0.
+
+
+class OperatorProfiler(object):
+    def __init__(self, track_memory: bool = False, record_trace: bool = True) -> None:
+        self.track_memory = track_memory
+        self.record_trace = record_trace
+        self.stats: Dict[str, OperatorStats] = {}
+        self.events: List[dict] = []
+        self.top_level_ns = 0
+        self._stack = []
+        self._t0 = None
+        self._started_tracemalloc = False
+        self._previous = None
+
+    def __enter__(self) -> "OperatorProfiler":
+        global active
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if self._t0 is None:
+            self._t0 = perf_counter_ns()
+        self._previous = active
+        active = self
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global active
+        active = self._previous
+        self._previous = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def count_evaluations(self, n: int) -> None:
+        if len(self._stack) > 0:
+            self._stack[-1][2] += n
+
+    def run(self, operator, pop) -> None:
+        name = getattr(operator, 'name', None) or type(operator).__name__
+        if self.track_memory:
+            mem_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        else:
+            mem_start = 0
+        frame = [name, perf_counter_ns(), 0, mem_start, 0]
+        self._stack.append(frame)
+        try:
+            operator.op(pop)
+        finally:
+            t_end = perf_counter_ns()
+            self._stack.pop()
+            self._record(frame, t_end)
+
+    def _record(self, frame: list, t_end: int) -> None:
+        name, t_start, n_evals, mem_start, child_peak = frame
+        alloc_net = alloc_peak = 0
+        if self.track_memory:
+            mem_end, mem_peak = tracemalloc.get_traced_memory()
+            mem_peak = max(mem_peak, child_peak)
+            alloc_net = mem_end - mem_start
+            alloc_peak = mem_peak - mem_start
+
+        if len(self._stack) == 0:
+            self.top_level_ns += t_end - t_start
+        else:
+            parent = self._stack[-1]
+            parent[2] += n_evals
+            if self.track_memory:
+                parent[4] = max(parent[4], mem_peak)
+
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = OperatorStats(name)
+        stats.calls += 1
+        stats.total_ns += t_end - t_start
+        stats.evaluations += n_evals
+        stats.alloc_net += alloc_net
+        stats.alloc_peak = max(stats.alloc_peak, alloc_peak)
+
+        if self.record_trace:
+            args = {'evaluations': n_evals}
+            if self.track_memory:
+                args['alloc_net_bytes'] = alloc_net
+                args['alloc_peak_bytes'] = alloc_peak
+            self.events.append({
+                'name': name,
+                'cat': 'operator',
+                'ph': 'X',
+                'ts': (t_start - self._t0) / 1e3,
+                'dur': (t_end - t_start) / 1e3,
+                'pid': getpid(),
+                'tid': get_ident(),
+                'args': args
+            })
+
+    def summary(self) -> str:
+        rows = sorted(self.stats.values(), key=lambda stats: stats.total_ns, reverse=True)
+        total_ns = self.top_level_ns or 1
+
+        header = f'{"operator":<32} {"calls":>8} {"total (s)":>11} {"mean (ms)":>11} {"% time":>7} {"evals":>10}'
+        if self.track_memory:
+            header += f' {"net (KiB)":>11} {"peak (KiB)":>11}'
+        lines = [header, '-' * len(header)]
+        for stats in rows:
+            line = (
+                f'{stats.name:<32} {stats.calls:>8} {stats.total_ns / 1e9:>11.4f} {stats.mean_ns / 1e6:>11.4f} '
+                f'{100. * stats.total_ns / total_ns:>6.1f}% {stats.evaluations:>10}'
+            )
+            if self.track_memory:
+                line += f' {stats.alloc_net / 1024.:>11.1f} {stats.alloc_peak / 1024.:>11.1f}'
+            lines.append(line)
+
+        return '\n'.join(lines)
+
+    def to_chrome_trace(self) -> dict:
+        return {'traceEvents': list(self.events), 'displayTimeUnit': 'ms'}
+
+    def save_trace(self, fpath: str) -> None:
+        with open(fpath, 'w') as fp:
+            dump(self.to_chrome_trace(), fp)
+
@@ -1,6 +1,24 @@
 from .population import ParticleSwarmBase
 from .instance import ParticleInstance
-from .optimize import pso_maximize
+from .optimize import build_pso_step, pso_iterate, pso_maximize, pso_maximize_async
+from .history import History, IterationRecord
+from .islands import IslandModel, island_maximize
+from .fitness import async_fitness, batch_fitness, cached_fitness, run_async
+from .local_search import batch_gradient
+from .budget import Budget, BudgetExhausted
+from .rng import SwarmRandom
+from .stopping import (
+    AllOf, 
+    AnyOf, 
+    Condition, 
+    DiameterCollapse, 
+    DiversityCollapse, 
+    RelativeImprovement, 
+    Stagnation, 
+    StoppingCriterion, 
+    TargetFitness, 
+    VelocityCollapse
+)
 
 if __name__=="__main__":
     pass
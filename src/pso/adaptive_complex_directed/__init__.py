@@ -1,5 +1,7 @@
 from .population import ParticleSwarmAdaptiveComplexDirected
-from .optimize import acd_pso_maximize
+from .optimize import acd_pso_iterate, acd_pso_maximize, acd_pso_maximize_async, build_acd_pso_step
+from .stopping import DegreeCollapse
+from .util import batch_diff
 
 if __name__=='__main__':
     pass
@@ -1,71 +1,77 @@
-from numpy import maximum, minimum, ndarray, where, zeros_like
-from numpy.random import rand
+from typing import Optional
 
-from .util import test_power_law
+from numpy import asarray, maximum, minimum, ndarray
+
+from .util import build_network, normalize_network, test_power_law
+from ..budget import Budget
+from ..dtypes import as_dtype
+from ..evaluators import SerialEvaluator, evaluate_swarm
 from ..instance import ParticleInstance
+from ..topology import CSRTopology
 from .population import ParticleSwarmAdaptiveComplexDirected
 from ...core.operators import PopulationOperatorBase
 
 
 class EvalFitness(PopulationOperatorBase):
-    def __init__(self):
+    def __init__(self, evaluator: Optional[SerialEvaluator] = None, track_dirty: bool = False):
         super(EvalFitness, self).__init__()
+        self.evaluator = evaluator
+        self.track_dirty = track_dirty
         
     def op(self, swarm: ParticleSwarmAdaptiveComplexDirected) -> None:
-        for particle in swarm:
-            fitness = swarm.fitness_fn(particle)
-            if fitness > swarm.best_fitness:
-                swarm.best_fitness = fitness
-                swarm.best_pos = particle.solution
-            if fitness > particle.meta.best_fitness:
-                particle.meta.best_fitness = fitness
-                particle.meta.best_pos = particle.solution
-            particle.meta.fitness = fitness
+        evaluator = swarm.evaluator if self.evaluator is None else self.evaluator
+        swarm.record_fitness(evaluate_swarm(evaluator, swarm.fitness_fn, swarm, self.track_dirty))
+        if swarm.adjacency is None:
+            w, a = build_network(swarm, mirror_weights=True)
+            normalize_network(swarm, w, a)
                 
                 
 class VelocityUpdate(PopulationOperatorBase):
-    def __init__(self, bound_lower: ndarray, bound_upper: ndarray):
+    def __init__(self, bound_lower: ndarray, bound_upper: ndarray, budget: Optional[Budget] = None):
         self.bound_lower = bound_lower
         self.bound_upper = bound_upper
+        self.budget = budget
     
     def op(self, swarm: ParticleSwarmAdaptiveComplexDirected) -> None:
         if True:
         # if test_power_law(swarm.in_degrees):
-            w = (swarm.init_inertia - swarm.final_inertia) * (swarm.n_iter - swarm.crnt_iter) + swarm.final_inertia
+            remaining = swarm.n_iter - swarm.crnt_iter
+            if self.budget is not None:
+                remaining = min(remaining, swarm.n_iter * (1. - self.budget.fraction_used))
+            w = (swarm.init_inertia - swarm.final_inertia) * remaining + swarm.final_inertia
+            weight_sums = asarray(swarm.topology.sum(axis=1)).ravel()
+            neighbors_best_ix = self._neighbors_best_ix(swarm)
+            coefficients = swarm.random_coefficients()
+            lower, upper = as_dtype(self.bound_lower, swarm.dtype), as_dtype(self.bound_upper, swarm.dtype)
             for ix, particle in enumerate(swarm):
-                c2 = (1. + swarm.topology[ix, :].sum()) * particle.meta.c1
-                p_best = self._neighbors_p_best(ix, swarm)
-                particle.meta.vel = w * particle.meta.vel + self._velocity_increment(
+                c2 = float((1. + weight_sums[ix]) * particle.meta.c1)
+                p_best = swarm[neighbors_best_ix[ix]].meta.best_pos
+                particle.meta.vel = float(w) * particle.meta.vel + self._velocity_increment(
                     particle.solution,
                     particle.meta.best_pos,
                     p_best,
-                    particle.meta.c1,
-                    c2
+                    float(particle.meta.c1),
+                    c2,
+                    coefficients[:, ix]
                 )
-                particle.meta.vel = maximum(particle.meta.vel, self.bound_lower)
-                particle.meta.vel = minimum(particle.meta.vel, self.bound_upper)
+                particle.meta.vel = maximum(particle.meta.vel, lower)
+                particle.meta.vel = minimum(particle.meta.vel, upper)
             
     @staticmethod
-    def _velocity_increment(pos: ndarray, p_best_self: ndarray, p_best: ndarray, c1: float, c2: ndarray) -> ndarray:
-        return c1 * rand(*pos.shape) * (p_best_self - pos) + c2 * rand(*pos.shape) * (p_best - pos)
+    def _velocity_increment(
+        pos: ndarray, 
+        p_best_self: ndarray, 
+        p_best: ndarray, 
+        c1: float, 
+        c2: ndarray, 
+        coefficients: ndarray
+    ) -> ndarray:
+        return c1 * coefficients[0] * (p_best_self - pos) + c2 * coefficients[1] * (p_best - pos)
         
-    def _neighbors_p_best(self, particle_ix: int, swarm: ParticleSwarmAdaptiveComplexDirected) -> ndarray:
-        neighbors = where(swarm.adjacency[particle_ix, :] == 1.)[0]
-        
-        if len(neighbors) == 0:
-            fitness_best = swarm[particle_ix].meta.best_fitness
-            p_best = swarm[particle_ix].meta.best_pos
-        else:
-            fitness_best = swarm[neighbors[0]].meta.best_fitness
-            p_best = swarm[neighbors[0]].meta.best_pos
-        for ix in neighbors[1:]:
-            if swarm[ix].meta.best_fitness > fitness_best:
-                p_best = swarm[ix].meta.best_pos
-                fitness_best = swarm[ix].meta.best_fitness
-
-        out = p_best
-                
-        return out
+    @staticmethod
+    def _neighbors_best_ix(swarm: ParticleSwarmAdaptiveComplexDirected) -> ndarray:
+        neighbors = CSRTopology(swarm.adjacency.indptr, swarm.adjacency.indices)
+        return neighbors.neighbors_best(swarm.best_fitnesses)
       
         
 class PositionUpdate(PopulationOperatorBase):
@@ -76,10 +82,12 @@ class PositionUpdate(PopulationOperatorBase):
     def op(self, swarm: ParticleSwarmAdaptiveComplexDirected) -> None:
         if True:
         #if test_power_law(swarm.in_degrees):
+            lower, upper = as_dtype(self.bound_lower, swarm.dtype), as_dtype(self.bound_upper, swarm.dtype)
             for particle in swarm:
                 particle.solution += particle.meta.vel
-                particle.solution = maximum(particle.solution, self.bound_lower)
-                particle.solution = minimum(particle.solution, self.bound_upper)
+                particle.solution = maximum(particle.solution, lower)
+                particle.solution = minimum(particle.solution, upper)
+            swarm.mark_moved()
                 
                 
 class UpdateTopology(PopulationOperatorBase):
@@ -87,27 +95,10 @@ class UpdateTopology(PopulationOperatorBase):
         super(UpdateTopology, self).__init__()
         
     def op(self, swarm: ParticleSwarmAdaptiveComplexDirected):
-        w = zeros_like(swarm.topology)
-        a = zeros_like(swarm.adjacency)
-        for ix in range(len(swarm)):
-            for ix_other in range(ix):
-                dist = swarm.dist_fn(swarm[ix], swarm[ix_other])
-                diff_fitness = swarm.diff_fn(swarm[ix].meta.fitness, swarm[ix_other].meta.fitness)
-                diff_fitness_op = swarm.diff_fn(swarm[ix_other].meta.fitness, swarm[ix].meta.fitness)
-                if (dist < swarm.dist_threshold) and (abs(diff_fitness) > swarm.diff_eps):
-                    w[ix, ix_other] = diff_fitness
-                    w[ix_other, ix] = diff_fitness_op
-                    a[ix, ix_other] = 1.
-                    a[ix_other, ix] = 1.
-                elif rand() < swarm.prob_rand_connection:
-                    w[ix, ix_other] = diff_fitness
-                    w[ix_other, ix] = diff_fitness_op
-                    a[ix, ix_other] = 1.
-                    a[ix_other, ix] = 1.
-        
-        w_normalized = w / w.sum()
-        
-        swarm.topology = w_normalized
-        swarm.adjacency = a
-        swarm.in_degrees = w_normalized.sum(axis=1)
-        swarm.out_degrees = w_normalized.sum(axis=0)
+        w, a = build_network(swarm)
+        normalize_network(swarm, w, a)
+
+
+class AdvanceIteration(PopulationOperatorBase):
+    def op(self, swarm: ParticleSwarmAdaptiveComplexDirected) -> None:
+        swarm.crnt_iter += 1
@@ -1,23 +1,29 @@
-from typing import Optional
+from time import perf_counter
+from typing import Iterator, Optional, Sequence, Union
 
 from numpy import ndarray
 
+from ..budget import Budget, BudgetExhausted, as_budget
+from ..checkpoint import Checkpointer, load_checkpoint
+from ..evaluators import SerialEvaluator
+from ..fitness import run_async
+from ..history import History, IterationRecord, iteration_record
+from ..stopping import StoppingCriterion, as_stopping_criterion
 from .population import ParticleSwarmAdaptiveComplexDirected
-from .operators import EvalFitness, VelocityUpdate, PositionUpdate, UpdateTopology
+from .operators import AdvanceIteration, EvalFitness, VelocityUpdate, PositionUpdate, UpdateTopology
+from .stopping import DegreeCollapse
+from ...core.operators import PopulationOperatorBase
 
-def acd_pso_maximize(
+def build_acd_pso_step(
     swarm: ParticleSwarmAdaptiveComplexDirected, 
     bound_lower: ndarray,
     bound_upper: ndarray,
     vel_bound_lower: Optional[ndarray],
     vel_bound_upper: Optional[ndarray],
-    term_weight_k: Optional[float] = None,
-    eps: float = 1e-8,
-    verbosity: int = 0
-) -> None:
-    if term_weight_k is not None and term_weight_k < 0.:
-        raise ValueError('term_weight_k must be positive')
-    
+    evaluator: Optional[SerialEvaluator] = None,
+    track_dirty: bool = False,
+    budget: Optional[Budget] = None
+) -> PopulationOperatorBase:
     if (bound_upper < bound_lower).any():
         raise ValueError('lower bounds must all be less than or equal to upper bounds')
     
@@ -29,25 +35,155 @@ def acd_pso_maximize(
     if (vel_bound_upper < vel_bound_lower).any():
         raise ValueError('velocity lower bounds must all be less than or equal to velocity upper bounds')
     
-    if verbosity > 0:
-        print("Beginning optimization")
-    
-    eval_fitness = EvalFitness()
-    velocity_upd = VelocityUpdate(vel_bound_lower, vel_bound_upper)
+    eval_fitness = EvalFitness(evaluator, track_dirty)
+    velocity_upd = VelocityUpdate(vel_bound_lower, vel_bound_upper, budget)
     pos_upd = PositionUpdate(bound_lower, bound_upper)
     topology_upd = UpdateTopology()
     
-    pso_step = eval_fitness + velocity_upd + pos_upd + topology_upd
-        
-    for iter_n in range(swarm.n_iter):
-        if verbosity > 1:
-            print(f'  Iteration {iter_n + 1}')
-        pso_step(swarm)
-        swarm.crnt_iter += 1
-        if term_weight_k is not None:
-            if (swarm.in_degrees.max() > term_weight_k) and (swarm.out_degrees.max() < eps):
+    return (eval_fitness + velocity_upd + pos_upd + topology_upd + AdvanceIteration()).compile()
+
+
+def acd_pso_iterate(
+    swarm: ParticleSwarmAdaptiveComplexDirected, 
+    bound_lower: ndarray,
+    bound_upper: ndarray,
+    vel_bound_lower: Optional[ndarray],
+    vel_bound_upper: Optional[ndarray],
+    term_weight_k: Optional[float] = None,
+    eps: float = 1e-8,
+    *,
+    stopping: Optional[Union[StoppingCriterion, Sequence[StoppingCriterion]]] = None,
+    max_evaluations: Optional[int] = None,
+    deadline: Optional[float] = None,
+    evaluator: Optional[SerialEvaluator] = None,
+    track_dirty: bool = False,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: int = 1,
+    resume_from: Optional[str] = None,
+    history: Optional[History] = None,
+    record_diversity: bool = True
+) -> Iterator[IterationRecord]:
+    budget = as_budget(max_evaluations, deadline)
+    pso_step = build_acd_pso_step(
+        swarm, 
+        bound_lower, 
+        bound_upper, 
+        vel_bound_lower, 
+        vel_bound_upper, 
+        evaluator, 
+        track_dirty,
+        budget
+    )
+    history = History() if history is None else history
+    stopping = as_stopping_criterion(stopping)
+    if term_weight_k is not None:
+        degree_collapse = DegreeCollapse(term_weight_k, eps)
+        stopping = degree_collapse if stopping is None else degree_collapse | stopping
+    # diversity costs a pass over all positions, so it is only computed when recorded or needed to stop
+    record_diversity = record_diversity or (stopping is not None and stopping.uses_diversity)
+    swarm.termination_reason = None
+    
+    start_iter = 0
+    if resume_from is not None:
+        checkpoint = load_checkpoint(resume_from)
+        checkpoint.restore(swarm)
+        start_iter = checkpoint.iteration
+        if budget is not None and checkpoint.extra.get('budget') is not None:
+            budget.set_state(checkpoint.extra['budget'])
+        if stopping is not None and checkpoint.extra.get('stopping') is not None:
+            stopping.set_state(checkpoint.extra['stopping'])
+    checkpointer = None if checkpoint_path is None else Checkpointer(checkpoint_path, checkpoint_interval)
+    
+    t_start = perf_counter()
+    evals_start = swarm.fitness_fn.n_evaluations
+    swarm.fitness_fn.set_budget(budget)
+    try:
+        for iter_n in range(start_iter, swarm.n_iter):
+            pso_step(swarm)
+            record = iteration_record(
+                swarm, 
+                iter_n + 1, 
+                swarm.fitness_fn.n_evaluations - evals_start, 
+                perf_counter() - t_start, 
+                diversity=record_diversity
+            )
+            terminate = stopping is not None and stopping(swarm, record)
+            if checkpointer is not None and not terminate:
+                checkpointer.maybe_save(
+                    swarm, 
+                    iter_n + 1, 
+                    {
+                        'budget': None if budget is None else budget.get_state(),
+                        'stopping': None if stopping is None else stopping.get_state()
+                    }
+                )
+            yield history.append(record)
+            if terminate:
+                swarm.termination_reason = stopping.reason
                 break
+        else:
+            swarm.termination_reason = 'maximum number of iterations reached'
+    except BudgetExhausted as e:
+        # the swarm keeps the best position and fitness from the last completed evaluation,
+        # including the prefix of a batch that still fit the budget
+        if e.fitnesses is not None:
+            swarm.record_fitness(e.fitnesses)
+        swarm.termination_reason = str(e)
+    finally:
+        swarm.fitness_fn.set_budget(None)
+        if checkpointer is not None:
+            checkpointer.close()
+
+
+def acd_pso_maximize(
+    swarm: ParticleSwarmAdaptiveComplexDirected, 
+    bound_lower: ndarray,
+    bound_upper: ndarray,
+    vel_bound_lower: Optional[ndarray],
+    vel_bound_upper: Optional[ndarray],
+    term_weight_k: Optional[float] = None,
+    eps: float = 1e-8,
+    verbosity: int = 0,
+    *,
+    stopping: Optional[Union[StoppingCriterion, Sequence[StoppingCriterion]]] = None,
+    max_evaluations: Optional[int] = None,
+    deadline: Optional[float] = None,
+    evaluator: Optional[SerialEvaluator] = None,
+    track_dirty: bool = False,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: int = 1,
+    resume_from: Optional[str] = None
+) -> None:
+    if verbosity > 0:
+        print("Beginning optimization")
+    
+    for record in acd_pso_iterate(
+        swarm=swarm,
+        bound_lower=bound_lower,
+        bound_upper=bound_upper,
+        vel_bound_lower=vel_bound_lower,
+        vel_bound_upper=vel_bound_upper,
+        term_weight_k=term_weight_k,
+        eps=eps,
+        stopping=stopping,
+        max_evaluations=max_evaluations,
+        deadline=deadline,
+        evaluator=evaluator,
+        track_dirty=track_dirty,
+        checkpoint_path=checkpoint_path,
+        checkpoint_interval=checkpoint_interval,
+        resume_from=resume_from,
+        record_diversity=False
+    ):
         if verbosity > 1:
-            print(f'    Current best fitness: {swarm.best_fitness}')
+            print(f'  Iteration {record.iteration}')
+            print(f'    Current best fitness: {record.best_fitness}')
         if verbosity > 2:
-            print(swarm)
\ No newline at end of file
+            print(swarm)
+
+    if verbosity > 0:
+        print(f'Optimization Complete -- {swarm.termination_reason}\n  Final best fitness: {swarm.best_fitness}')
+
+
+async def acd_pso_maximize_async(*args, **kwargs) -> None:
+    await run_async(acd_pso_maximize, *args, **kwargs)
@@ -1,13 +1,23 @@
-from typing import Callable, Tuple, Union
+from typing import Callable, Optional, Tuple, Union
 
-from numpy import ndarray, zeros
-from numpy.random import rand
+from numpy import float64, ndarray, zeros
+from numpy.random import SeedSequence
+from numpy.typing import DTypeLike
 
 from ..population import ParticleSwarmBase
+from ..rng import SwarmRandom
+from ..distance import MetricBase, as_metric
+from ..evaluators import SerialEvaluator
+from ..fitness import FitnessBase, as_fitness
 from ..instance import ParticleInstance
+from .util import DiffBase, as_diff
     
     
 class ParticleSwarmAdaptiveComplexDirected(ParticleSwarmBase):
+    state_fields = ParticleSwarmBase.state_fields + (
+        'crnt_inertia', 'crnt_iter', 'adjacency', 'in_degrees', 'out_degrees'
+    )
+
     def __init__(
         self, 
         n_particles: int, 
@@ -21,16 +31,29 @@ class ParticleSwarmAdaptiveComplexDirected(ParticleSwarmBase):
         init_inertia: float,
         final_inertia: float,
         n_iter: int,
-        fitness_fn: Callable[[ParticleInstance], float],
-        dist_fn: Callable[[ParticleInstance, ParticleInstance], float],
-        diff_fn: Callable[[float, float], float],
+        fitness_fn: Union[FitnessBase, Callable[[ParticleInstance], float]],
+        dist_fn: Union[str, MetricBase, Callable[[ParticleInstance, ParticleInstance], float]],
+        diff_fn: Union[DiffBase, Callable[[float, float], float]],
+        storage: str = 'list',
+        dist_block_size: Optional[int] = None,
+        neighbor_search: str = 'auto',
+        evaluator: Optional[SerialEvaluator] = None,
+        rng: Optional[Union[int, SeedSequence, SwarmRandom]] = None,
+        dtype: DTypeLike = float64,
+        mmap_dir: Optional[str] = None,
+        memory_budget: int = 2**28
     ) -> None:
         super(ParticleSwarmAdaptiveComplexDirected, self).__init__(
             n_particles,
             pos_len, 
             pos_initializer, 
             vel_initializer, 
-            c_initializer
+            c_initializer,
+            storage=storage,
+            rng=rng,
+            dtype=dtype,
+            mmap_dir=mmap_dir,
+            memory_budget=memory_budget
         )
         self.prob_rand_connection = prob_rand_connection
         self.dist_threshold = dist_threshold
@@ -40,44 +63,13 @@ class ParticleSwarmAdaptiveComplexDirected(ParticleSwarmBase):
         self.crnt_inertia = init_inertia
         self.n_iter = n_iter
         self.crnt_iter = 1
-        self.fitness_fn = fitness_fn
-        self.dist_fn = dist_fn
-        self.diff_fn = diff_fn
+        self.fitness_fn = as_fitness(fitness_fn)
+        self.dist_fn = as_metric(dist_fn)
+        self.dist_block_size = dist_block_size
+        self.neighbor_search = neighbor_search
+        self.evaluator = SerialEvaluator() if evaluator is None else evaluator
+        self.diff_fn = as_diff(diff_fn)
         self.in_degrees = zeros((n_particles,))
         self.out_degrees = zeros((n_particles,))
-        
-        for particle in self:
-            particle.meta.fitness = self.fitness_fn(particle)
-            particle.meta.best_fitness = particle.meta.fitness
-            particle.meta.best_pos = particle.solution
-            if self.best_fitness is None:
-                self.best_fitness = particle.meta.fitness
-                self.best_pos = particle.solution
-            elif particle.meta.fitness > self.best_fitness:
-                self.best_fitness = particle.meta.fitness
-                self.best_pos = particle.solution
-            else:
-                pass
-        w = zeros((n_particles, n_particles))
-        a = zeros((n_particles, n_particles))
-        for ix in range(len(self)):
-            for ix_other in range(ix):
-                dist = self.dist_fn(self[ix], self[ix_other])
-                diff_fitness = self.diff_fn(self[ix].meta.fitness, self[ix_other].meta.fitness)
-                if (dist < self.dist_threshold) and (abs(diff_fitness) > self.diff_eps):
-                    w[ix, ix_other] = diff_fitness
-                    w[ix_other, ix] = diff_fitness
-                    a[ix, ix_other] = 1.
-                    a[ix_other, ix] = 1.
-                elif rand() < self.prob_rand_connection:
-                    w[ix, ix_other] = diff_fitness
-                    w[ix_other, ix] = diff_fitness
-                    a[ix, ix_other] = 1.
-                    a[ix_other, ix] = 1.
-        
-        w_normalized = w / w.sum()
-        
-        self.topology = w_normalized
-        self.adjacency = a
-        self.in_degrees = w_normalized.sum(axis=1)
-        self.out_degrees = w_normalized.sum(axis=0)
+        # the network needs fitnesses, so it is built by the first evaluation where the run's budget is charged
+        self.adjacency = None
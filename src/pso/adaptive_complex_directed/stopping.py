@@ -0,0 +1,20 @@
+from ..history import IterationRecord
+from ..stopping import StoppingCriterion
+
+
+class DegreeCollapse(StoppingCriterion):
+    uses_diversity = False
+
+    def __init__(self, term_weight_k: float, eps: float = 1e-8) -> None:
+        super(DegreeCollapse, self).__init__()
+        if term_weight_k < 0.:
+            raise ValueError('term_weight_k must be positive')
+        self.term_weight_k = term_weight_k
+        self.eps = eps
+
+    def update(self, swarm, record: IterationRecord) -> bool:
+        max_in, max_out = swarm.in_degrees.max(), swarm.out_degrees.max()
+        if max_in <= self.term_weight_k or max_out >= self.eps:
+            return False
+        self.reason = f'topology collapsed (max in-degree {max_in:.3g}, max out-degree {max_out:.3g})'
+        return True
@@ -1,6 +1,15 @@
-from numpy import ndarray
+from typing import Callable, Tuple, Union
+
+from numpy import abs, asarray, concatenate, float64, floor, fromiter, int64, ndarray, ones, sqrt, unique, zeros
+from scipy.sparse import csr_matrix
 from scipy.stats import powerlaw, kstest
 
+from ..distance import radius_pairs
+from ..rng import SwarmRandom
+
+
+_BLOCK_ELEMENTS = 2 ** 22
+
 
 def test_power_law(xs: ndarray, p: float = 0.85) -> bool:
     a, loc, scale = powerlaw.fit(xs)
@@ -9,3 +18,106 @@ def test_power_law(xs: ndarray, p: float = 0.85) -> bool:
     test_result = kstest(xs, sample)
     
     return test_result.pvalue > p
+
+
+class DiffBase(object):
+    def __call__(self, fitnesses_a: ndarray, fitnesses_b: ndarray) -> ndarray:
+        raise NotImplementedError
+
+
+class PairDiff(DiffBase):
+    def __init__(self, fn: Callable[[float, float], float]) -> None:
+        super(PairDiff, self).__init__()
+        self.fn = fn
+
+    def __call__(self, fitnesses_a: ndarray, fitnesses_b: ndarray) -> ndarray:
+        return fromiter(
+            (self.fn(a, b) for a, b in zip(fitnesses_a.tolist(), fitnesses_b.tolist())), 
+            dtype=float64, 
+            count=len(fitnesses_a)
+        )
+
+
+class BatchDiff(DiffBase):
+    def __init__(self, fn: Callable[[ndarray, ndarray], ndarray]) -> None:
+        super(BatchDiff, self).__init__()
+        self.fn = fn
+
+    def __call__(self, fitnesses_a: ndarray, fitnesses_b: ndarray) -> ndarray:
+        out = asarray(self.fn(fitnesses_a, fitnesses_b), dtype=float64)
+        if out.shape != fitnesses_a.shape:
+            raise ValueError(f'batch diff must return shape {fitnesses_a.shape} (found {out.shape})')
+        return out
+
+
+def batch_diff(fn: Callable[[ndarray, ndarray], ndarray]) -> BatchDiff:
+    return BatchDiff(fn)
+
+
+def as_diff(fn: Union[DiffBase, Callable[[float, float], float]]) -> DiffBase:
+    # plain callables keep the scalar (fitness, fitness) -> float contract and are applied pair by pair
+    if isinstance(fn, DiffBase):
+        return fn
+    return PairDiff(fn)
+
+
+def _random_pairs(n_particles: int, prob: float, rng: SwarmRandom) -> Tuple[ndarray, ndarray]:
+    n_pairs = n_particles * (n_particles - 1) // 2
+    n_connections = rng.binomial(n_pairs, prob) if n_pairs > 0 else 0
+    if n_connections == 0:
+        return zeros((0,), dtype=int64), zeros((0,), dtype=int64)
+    # drawn without replacement so the binomial connection count is kept exactly
+    pair_ix = rng.choice(n_pairs, size=n_connections, replace=False).astype(int64)
+    rows = floor((1. + sqrt(1. + 8. * pair_ix)) / 2.).astype(int64)
+    rows -= (rows * (rows - 1)) // 2 > pair_ix
+    rows += ((rows + 1) * rows) // 2 <= pair_ix
+    cols = pair_ix - (rows * (rows - 1)) // 2
+    
+    return rows, cols
+
+
+def build_network(swarm, mirror_weights: bool = False) -> Tuple[csr_matrix, csr_matrix]:
+    n_particles = len(swarm)
+    fitnesses = swarm.fitnesses
+    positions = swarm.positions
+    block_size = swarm.dist_block_size
+    if block_size is None:
+        block_size = max(1, _BLOCK_ELEMENTS // max(n_particles, 1))
+        if swarm.block_size is not None:
+            block_size = min(block_size, swarm.block_size)
+    
+    rows, cols = radius_pairs(positions, swarm.dist_threshold, swarm.dist_fn, swarm.neighbor_search, block_size)
+    keep = abs(swarm.diff_fn(fitnesses[rows], fitnesses[cols])) > swarm.diff_eps
+    rows, cols = [rows[keep]], [cols[keep]]
+    
+    rand_rows, rand_cols = _random_pairs(n_particles, swarm.prob_rand_connection, swarm.rng)
+    rows.append(rand_rows)
+    cols.append(rand_cols)
+    
+    pair_ix = unique(concatenate(rows) * n_particles + concatenate(cols))
+    rows, cols = pair_ix // n_particles, pair_ix % n_particles
+    
+    weights = swarm.diff_fn(fitnesses[rows], fitnesses[cols])
+    if mirror_weights:
+        weights_op = weights
+    else:
+        weights_op = swarm.diff_fn(fitnesses[cols], fitnesses[rows])
+    
+    all_rows = concatenate([rows, cols])
+    all_cols = concatenate([cols, rows])
+    w = csr_matrix((concatenate([weights, weights_op]), (all_rows, all_cols)), shape=(n_particles, n_particles))
+    a = csr_matrix((ones(len(all_rows)), (all_rows, all_cols)), shape=(n_particles, n_particles))
+    w.sort_indices()
+    a.sort_indices()
+    
+    return w, a
+
+
+def normalize_network(swarm, w: csr_matrix, a: csr_matrix) -> None:
+    total = w.sum()
+    w_normalized = w / total if total != 0. else w
+    
+    swarm.topology = w_normalized
+    swarm.adjacency = a
+    swarm.in_degrees = asarray(w_normalized.sum(axis=1)).ravel()
+    swarm.out_degrees = asarray(w_normalized.sum(axis=0)).ravel()
@@ -0,0 +1,72 @@
+from time import perf_counter
+from typing import Any, Dict, Optional
+
+from numpy import ndarray
+
+
+class BudgetExhausted(Exception):
+    def __init__(self, message: str, fitnesses: Optional[ndarray] = None) -> None:
+        super(BudgetExhausted, self).__init__(message)
+        # fitnesses of the batch prefix that still fit the budget, -inf for the rows left unevaluated
+        self.fitnesses = fitnesses
+
+
+class Budget(object):
+    def __init__(self, max_evaluations: Optional[int] = None, deadline: Optional[float] = None) -> None:
+        if max_evaluations is not None and max_evaluations < 1:
+            raise ValueError('max_evaluations must be at least 1')
+        if deadline is not None and deadline <= 0.:
+            raise ValueError('deadline must be positive')
+        self.max_evaluations = max_evaluations
+        self.deadline = deadline
+        self.start()
+
+    def start(self) -> None:
+        self.n_evaluations = 0
+        self._t_start = perf_counter()
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'n_evaluations': self.n_evaluations, 'elapsed': self.elapsed}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        # carry the spent evaluations and time over from a checkpoint so a resumed run keeps its limits
+        self.n_evaluations = int(state['n_evaluations'])
+        self._t_start = perf_counter() - float(state['elapsed'])
+
+    @property
+    def elapsed(self) -> float:
+        return perf_counter() - self._t_start
+
+    @property
+    def fraction_used(self) -> float:
+        fraction = 0.
+        if self.max_evaluations is not None:
+            fraction = self.n_evaluations / self.max_evaluations
+        if self.deadline is not None:
+            fraction = max(fraction, self.elapsed / self.deadline)
+        return min(fraction, 1.)
+
+    def affordable(self, n: int) -> int:
+        if self.max_evaluations is None:
+            return n
+        return max(min(n, self.max_evaluations - self.n_evaluations), 0)
+
+    def exhausted(self, n: int, fitnesses: Optional[ndarray] = None) -> BudgetExhausted:
+        return BudgetExhausted(
+            f'evaluation budget exhausted ({self.n_evaluations} of {self.max_evaluations} used, {n} requested)', 
+            fitnesses
+        )
+
+    def charge(self, n: int) -> None:
+        # refuse the whole request up front so a batch is never evaluated past the budget
+        if self.deadline is not None and self.elapsed >= self.deadline:
+            raise BudgetExhausted(f'deadline of {self.deadline}s reached')
+        if self.max_evaluations is not None and self.n_evaluations + n > self.max_evaluations:
+            raise self.exhausted(n)
+        self.n_evaluations += n
+
+
+def as_budget(max_evaluations: Optional[int] = None, deadline: Optional[float] = None) -> Optional[Budget]:
+    if max_evaluations is None and deadline is None:
+        return None
+    return Budget(max_evaluations, deadline)
@@ -0,0 +1,172 @@
+from json import dumps, loads
+from os import fsync, replace
+from threading import Thread
+from typing import Any, Dict, Optional
+
+from numpy import array, load, ndarray, savez
+from numpy.random import get_state, set_state
+from scipy.sparse import csr_matrix, issparse
+
+from .topology import CSRTopology
+
+
+def _encode(key: str, val: Any, arrays: Dict[str, ndarray], manifest: Dict[str, str]) -> None:
+    if val is None:
+        manifest[key] = 'none'
+    elif isinstance(val, ndarray):
+        manifest[key] = 'array'
+        arrays[key] = val
+    elif isinstance(val, CSRTopology):
+        manifest[key] = 'csr_topology'
+        arrays[f'{key}.indptr'] = val.indptr
+        arrays[f'{key}.indices'] = val.indices
+    elif issparse(val):
+        val = val.tocsr()
+        manifest[key] = 'sparse'
+        arrays[f'{key}.data'] = val.data
+        arrays[f'{key}.indices'] = val.indices
+        arrays[f'{key}.indptr'] = val.indptr
+        arrays[f'{key}.shape'] = array(val.shape)
+    elif isinstance(val, dict):
+        manifest[key] = 'dict'
+        arrays[f'{key}.keys'] = array(list(val.keys()), dtype=str)
+        for name, item in val.items():
+            _encode(f'{key}.{name}', item, arrays, manifest)
+    elif isinstance(val, tuple):
+        manifest[key] = f'tuple:{len(val)}'
+        for ix, item in enumerate(val):
+            _encode(f'{key}.{ix}', item, arrays, manifest)
+    elif isinstance(val, list):
+        if len(val) > 0 and all(isinstance(row, (list, ndarray)) for row in val):
+            rows = [array(row) for row in val]
+            manifest[key] = 'ragged'
+            arrays[f'{key}.indptr'] = array([0] + [len(row) for row in rows]).cumsum()
+            arrays[f'{key}.values'] = array([x for row in rows for x in row.tolist()])
+        else:
+            manifest[key] = 'list'
+            arrays[key] = array(val)
+    else:
+        manifest[key] = 'scalar'
+        arrays[key] = array(val)
+
+
+def _decode(key: str, arrays: Dict[str, ndarray], manifest: Dict[str, str]) -> Any:
+    kind = manifest[key]
+    if kind == 'none':
+        return None
+    if kind == 'array':
+        return arrays[key]
+    if kind == 'csr_topology':
+        return CSRTopology(arrays[f'{key}.indptr'], arrays[f'{key}.indices'])
+    if kind == 'sparse':
+        return csr_matrix(
+            (arrays[f'{key}.data'], arrays[f'{key}.indices'], arrays[f'{key}.indptr']),
+            shape=tuple(arrays[f'{key}.shape'])
+        )
+    if kind == 'dict':
+        return {name: _decode(f'{key}.{name}', arrays, manifest) for name in arrays[f'{key}.keys'].tolist()}
+    if kind.startswith('tuple:'):
+        return tuple(_decode(f'{key}.{ix}', arrays, manifest) for ix in range(int(kind.split(':')[1])))
+    if kind == 'ragged':
+        indptr, values = arrays[f'{key}.indptr'], arrays[f'{key}.values'].tolist()
+        return [values[start:stop] for start, stop in zip(indptr[:-1], indptr[1:])]
+    if kind == 'list':
+        return arrays[key].tolist()
+    if kind == 'scalar':
+        return arrays[key].item()
+    raise ValueError(f'unrecognized checkpoint entry kind "{kind}"')
+
+
+class Checkpoint(object):
+    def __init__(self, iteration: int, swarm_state: Dict[str, Any], rng_state: tuple, extra: Dict[str, Any]) -> None:
+        self.iteration = iteration
+        self.swarm_state = swarm_state
+        self.rng_state = rng_state
+        self.extra = extra
+
+    @classmethod
+    def capture(cls, swarm, iteration: int, extra: Optional[Dict[str, Any]] = None) -> "Checkpoint":
+        return cls(iteration, swarm.get_state(), get_state(), {} if extra is None else dict(extra))
+
+    def restore(self, swarm) -> None:
+        swarm.set_state(self.swarm_state)
+        set_state(self.rng_state)
+
+    def save(self, fpath: str) -> None:
+        arrays, manifest = {}, {}
+        _encode('iteration', self.iteration, arrays, manifest)
+        _encode('swarm', self.swarm_state, arrays, manifest)
+        _encode('rng', self.rng_state, arrays, manifest)
+        _encode('extra', self.extra, arrays, manifest)
+        arrays['manifest'] = array(dumps(manifest))
+
+        tmp_fpath = f'{fpath}.tmp'
+        with open(tmp_fpath, 'wb') as fp:
+            # entries are written in bounded chunks, so memmap snapshots stream from disk into the archive
+            savez(fp, **arrays)
+            fp.flush()
+            fsync(fp.fileno())
+        replace(tmp_fpath, fpath)
+
+    @classmethod
+    def load(cls, fpath: str) -> "Checkpoint":
+        with load(fpath, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        manifest = loads(arrays['manifest'].item())
+        return cls(
+            _decode('iteration', arrays, manifest),
+            _decode('swarm', arrays, manifest),
+            _decode('rng', arrays, manifest),
+            _decode('extra', arrays, manifest)
+        )
+
+
+class Checkpointer(object):
+    def __init__(self, fpath: str, interval: int = 1, background: bool = True) -> None:
+        if interval < 1:
+            raise ValueError('checkpoint interval must be at least 1')
+        self.fpath = fpath
+        self.interval = interval
+        self.background = background
+        self._thread = None
+        self._error = None
+
+    def __enter__(self) -> "Checkpointer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def save(self, swarm, iteration: int, extra: Optional[Dict[str, Any]] = None) -> None:
+        checkpoint = Checkpoint.capture(swarm, iteration, extra)
+        self.wait()
+        if self.background:
+            self._thread = Thread(target=self._write, args=(checkpoint,), daemon=True)
+            self._thread.start()
+        else:
+            checkpoint.save(self.fpath)
+
+    def maybe_save(self, swarm, iteration: int, extra: Optional[Dict[str, Any]] = None) -> None:
+        if iteration % self.interval == 0:
+            self.save(swarm, iteration, extra)
+
+    def _write(self, checkpoint: Checkpoint) -> None:
+        try:
+            checkpoint.save(self.fpath)
+        except Exception as e:
+            self._error = e
+
+    def wait(self) -> None:
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self) -> None:
+        self.wait()
+
+
+def load_checkpoint(fpath: str) -> Checkpoint:
+    return Checkpoint.load(fpath)
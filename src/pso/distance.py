@@ -0,0 +1,239 @@
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
+
+from numpy import abs, arange, concatenate, einsum, empty, float64, inf, maximum, ndarray, nonzero, sqrt, where, zeros
+from numpy.random import choice
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import cdist, pdist
+
+from .instance import ParticleInstance, PositionParticle
+from .rng import SwarmRandom
+
+
+class MetricBase(object):
+    scipy_name = None
+
+    def __call__(self, xs_a: ndarray, xs_b: ndarray) -> ndarray:
+        raise NotImplementedError
+
+    def square(self, xs: ndarray) -> ndarray:
+        return self(xs, xs)
+
+
+class PairwiseMetric(MetricBase):
+    def __init__(self, fn: Callable[[ndarray, ndarray], ndarray], scipy_name: Optional[str] = None) -> None:
+        self.fn = fn
+        self.scipy_name = scipy_name
+
+    def __call__(self, xs_a: ndarray, xs_b: ndarray) -> ndarray:
+        return self.fn(xs_a, xs_b)
+
+
+class ParticleMetric(MetricBase):
+    def __init__(self, fn: Callable[[ParticleInstance, ParticleInstance], float]) -> None:
+        self.fn = fn
+
+    def __call__(self, xs_a: ndarray, xs_b: ndarray) -> ndarray:
+        particles_b = [PositionParticle(x) for x in xs_b]
+        out = empty((xs_a.shape[0], xs_b.shape[0]))
+        for ix, x in enumerate(xs_a):
+            particle = PositionParticle(x)
+            for ix_other, particle_other in enumerate(particles_b):
+                out[ix, ix_other] = self.fn(particle, particle_other)
+        return out
+
+    def square(self, xs: ndarray) -> ndarray:
+        particles = [PositionParticle(x) for x in xs]
+        out = zeros((xs.shape[0], xs.shape[0]))
+        for ix, particle in enumerate(particles):
+            for ix_other in range(ix):
+                out[ix, ix_other] = self.fn(particle, particles[ix_other])
+                out[ix_other, ix] = out[ix, ix_other]
+        return out
+
+
+metrics: Dict[str, MetricBase] = {}
+
+
+def register_metric(name: str, fn: Union[MetricBase, Callable[[ndarray, ndarray], ndarray]]) -> None:
+    metrics[name] = fn if isinstance(fn, MetricBase) else PairwiseMetric(fn)
+
+
+def pairwise_metric(fn: Callable[[ndarray, ndarray], ndarray]) -> PairwiseMetric:
+    return PairwiseMetric(fn)
+
+
+def sqeuclidean_mixed(xs_a: ndarray, xs_b: ndarray) -> ndarray:
+    # inner products run in the input precision, norms and their combination accumulate in float64;
+    # centering first keeps the cancellation error relative to the spread of the points, not their offset
+    center = xs_b.mean(axis=0, dtype=float64).astype(xs_b.dtype)
+    xs_a, xs_b = xs_a - center, xs_b - center
+    sq_a = einsum('ij,ij->i', xs_a, xs_a, dtype=float64)
+    sq_b = einsum('ij,ij->i', xs_b, xs_b, dtype=float64)
+    out = -2. * (xs_a @ xs_b.T).astype(float64)
+    out += sq_a[:, None]
+    out += sq_b[None, :]
+    return maximum(out, 0., out=out)
+
+
+def _cdist(xs_a: ndarray, xs_b: ndarray, name: str) -> ndarray:
+    if name in ['euclidean', 'sqeuclidean'] and (xs_a.dtype.itemsize < 8 or xs_b.dtype.itemsize < 8):
+        out = sqeuclidean_mixed(xs_a, xs_b)
+        return out if name == 'sqeuclidean' else sqrt(out, out=out)
+    return cdist(xs_a, xs_b, metric=name)
+
+
+for _name in ['euclidean', 'sqeuclidean', 'cityblock', 'chebyshev', 'cosine']:
+    register_metric(_name, PairwiseMetric(lambda xs_a, xs_b, name=_name: _cdist(xs_a, xs_b, name), _name))
+
+
+def as_metric(
+    metric: Union[str, MetricBase, Callable[[ParticleInstance, ParticleInstance], float]]
+) -> MetricBase:
+    if isinstance(metric, MetricBase):
+        return metric
+    if isinstance(metric, str):
+        if metric not in metrics:
+            raise ValueError(f'unrecognized distance metric "{metric}"')
+        return metrics[metric]
+    return ParticleMetric(metric)
+
+
+def distance_blocks(
+    xs: ndarray,
+    metric: MetricBase,
+    block_size: Optional[int] = None
+) -> Iterator[Tuple[int, int, ndarray]]:
+    n = xs.shape[0]
+    if block_size is None or block_size >= n:
+        yield 0, n, metric.square(xs)
+        return
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        # columns are blocked too so that only block_size rows of xs are ever read at once
+        block = empty((stop - start, n))
+        for col_start in range(0, n, block_size):
+            col_stop = min(col_start + block_size, n)
+            block[:, col_start:col_stop] = metric(xs[start:stop], xs[col_start:col_stop])
+        yield start, stop, block
+
+
+def pairwise_distances(
+    xs: ndarray,
+    metric: MetricBase,
+    block_size: Optional[int] = None,
+    condensed: bool = False
+) -> ndarray:
+    n = xs.shape[0]
+    if condensed:
+        if metric.scipy_name is not None and block_size is None:
+            return pdist(xs, metric=metric.scipy_name)
+        out = empty((n * (n - 1) // 2,))
+        for start, stop, block in distance_blocks(xs, metric, block_size):
+            for ix in range(start, stop):
+                offset = ix * n - ix * (ix + 1) // 2
+                out[offset:offset + n - ix - 1] = block[ix - start, ix + 1:]
+        return out
+
+    if block_size is None:
+        return metric.square(xs)
+    out = empty((n, n))
+    for start, stop, block in distance_blocks(xs, metric, block_size):
+        out[start:stop] = block
+    return out
+
+
+def mean_distances(xs: ndarray, metric: MetricBase, block_size: Optional[int] = None) -> ndarray:
+    n = xs.shape[0]
+    out = zeros((n,))
+    for start, stop, block in distance_blocks(xs, metric, block_size):
+        block[arange(stop - start), arange(start, stop)] = 0.
+        out[start:stop] = block.sum(axis=1, dtype=float64)
+    return out / (n - 1)
+
+
+def mean_distances_sqeuclidean(xs: ndarray) -> ndarray:
+    n = xs.shape[0]
+    centered = xs - xs.mean(axis=0, dtype=float64)
+    sq_norms = einsum('ij,ij->i', centered, centered, dtype=float64)
+    return n * (sq_norms + sq_norms.mean()) / (n - 1)
+
+
+def mean_distances_sampled(
+    xs: ndarray, 
+    metric: MetricBase, 
+    n_anchors: int, 
+    rng: Optional[SwarmRandom] = None
+) -> Tuple[ndarray, ndarray]:
+    n = xs.shape[0]
+    n_anchors = min(n_anchors, n)
+    anchors = (choice if rng is None else rng.choice)(n, size=n_anchors, replace=False)
+    dists = metric(xs, xs[anchors])
+    
+    is_self = zeros(dists.shape, dtype=bool)
+    is_self[anchors, arange(n_anchors)] = True
+    counts = n_anchors - is_self.sum(axis=1)
+    dists[is_self] = 0.
+    means = dists.sum(axis=1, dtype=float64) / counts
+    
+    sq_devs = where(is_self, 0., (dists - means[:, None]) ** 2).sum(axis=1)
+    variances = sq_devs / maximum(counts - 1, 1)
+    fpc = maximum(n - 1 - counts, 0) / max(n - 2, 1)
+    std_errs = sqrt(variances / counts * fpc)
+    
+    return means, std_errs
+
+
+_TREE_METRICS = {'euclidean': 2., 'sqeuclidean': 2., 'cityblock': 1., 'chebyshev': inf}
+_TREE_MAX_DIM = 32
+_TREE_MIN_PARTICLES = 256
+
+
+def _tree_distance(diffs: ndarray, name: str) -> ndarray:
+    if name == 'cityblock':
+        return diffs.sum(axis=1)
+    elif name == 'chebyshev':
+        return diffs.max(axis=1)
+    sq_dists = einsum('ij,ij->i', diffs, diffs)
+    return sq_dists if name == 'sqeuclidean' else sqrt(sq_dists)
+
+
+def use_tree(n_particles: int, pos_len: int, metric: MetricBase) -> bool:
+    return (
+        metric.scipy_name in _TREE_METRICS 
+        and pos_len <= _TREE_MAX_DIM 
+        and n_particles >= _TREE_MIN_PARTICLES
+    )
+
+
+def radius_pairs(
+    xs: ndarray,
+    radius: float,
+    metric: MetricBase,
+    method: str = 'auto',
+    block_size: Optional[int] = None
+) -> Tuple[ndarray, ndarray]:
+    n = xs.shape[0]
+    if method == 'auto':
+        method = 'tree' if use_tree(n, xs.shape[1], metric) else 'brute'
+    
+    if method == 'tree':
+        if metric.scipy_name not in _TREE_METRICS:
+            raise ValueError(f'tree radius search does not support the metric "{metric.scipy_name}"')
+        tree_radius = sqrt(radius) if metric.scipy_name == 'sqeuclidean' else radius
+        pairs = cKDTree(xs).query_pairs(tree_radius, p=_TREE_METRICS[metric.scipy_name], output_type='ndarray')
+        rows, cols = pairs.max(axis=1), pairs.min(axis=1)
+        keep = zeros((len(rows),), dtype=bool)
+        for start in range(0, len(rows), 4096):
+            diffs = abs(xs[rows[start:start + 4096]] - xs[cols[start:start + 4096]])
+            keep[start:start + 4096] = _tree_distance(diffs, metric.scipy_name) < radius
+        return rows[keep], cols[keep]
+    elif method == 'brute':
+        rows, cols = [], []
+        for start, stop, block in distance_blocks(xs, metric, block_size):
+            within = (block < radius) & (arange(n)[None, :] < arange(start, stop)[:, None])
+            block_rows, block_cols = nonzero(within)
+            rows.append(block_rows + start)
+            cols.append(block_cols)
+        return concatenate(rows), concatenate(cols)
+    else:
+        raise ValueError(f'unrecognized radius search method "{method}"')
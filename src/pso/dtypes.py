@@ -0,0 +1,15 @@
+from typing import Optional
+
+from numpy import asarray, dtype, floating, issubdtype, ndarray
+from numpy.typing import DTypeLike
+
+
+def float_dtype(val: DTypeLike) -> dtype:
+    out = dtype(val)
+    if not issubdtype(out, floating):
+        raise ValueError(f'swarm dtype must be a floating point type (found {out})')
+    return out
+
+
+def as_dtype(xs: Optional[ndarray], val: dtype) -> Optional[ndarray]:
+    return None if xs is None else asarray(xs, dtype=val)
@@ -1,5 +1,5 @@
 from .population import ParticleSwarmAPSOESE
-from .optimize import apso_ese_maximize
+from .optimize import apso_ese_iterate, apso_ese_maximize, apso_ese_maximize_async, build_apso_ese_step
 
 if __name__=='__main__':
     pass
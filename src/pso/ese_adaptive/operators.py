@@ -1,8 +1,12 @@
-from typing import Callable, Optional, Sequence, Tuple
+from typing import Callable, Optional, Sequence, Tuple, Union
 
-from numpy import abs, all, argmax, argmin, min, max, mean, ndarray, exp, minimum, maximum, where
-from numpy.random import choice, rand, randn, randint
+from numpy import abs, all, argmax, min, max, mean, ndarray, exp, minimum, maximum, where
 
+from ..budget import Budget
+from ..distance import MetricBase, as_metric, mean_distances, mean_distances_sampled, mean_distances_sqeuclidean
+from ..dtypes import as_dtype
+from ..evaluators import SerialEvaluator, evaluate_swarm
+from ..fitness import FitnessBase, as_fitness
 from ..instance import ParticleInstance
 from .population import ParticleSwarmAPSOESE
 from ...core.operators import PopulationOperatorBase
@@ -11,20 +15,35 @@ from ...core.operators import PopulationOperatorBase
 class EvalFitness(PopulationOperatorBase):
     def __init__(
         self, 
-        fitness_fn: Callable[[ParticleInstance], float], 
-        dist_fn: Callable[[ParticleInstance, ParticleInstance], float],
+        fitness_fn: Union[FitnessBase, Callable[[ParticleInstance], float]], 
+        dist_fn: Union[str, MetricBase, Callable[[ParticleInstance, ParticleInstance], float]],
         delta: Optional[float] = None,
         c_bounds: Tuple[float, float] = (1.5, 2.5),
         c_sum_bounds: Tuple[float, float] = (3., 4.),
         c_inc_mult: float = 0.1,
         elite_perturb_dims: int = 1,
+        dist_block_size: Optional[int] = None,
+        diversity: str = 'exact',
+        n_anchors: int = 32,
+        evaluator: Optional[SerialEvaluator] = None,
+        track_dirty: bool = False,
         debug: bool = False
     ) -> None:
         super(EvalFitness, self).__init__()
-        self.fitness_fn = fitness_fn
-        self.dist_fn = dist_fn
-        if delta is None:
-            delta = 0.05 + 0.05 * rand()
+        self.fitness_fn = as_fitness(fitness_fn)
+        self.evaluator = SerialEvaluator() if evaluator is None else evaluator
+        self.track_dirty = track_dirty
+        self.dist_fn = as_metric(dist_fn)
+        self.dist_block_size = dist_block_size
+        if diversity not in ['exact', 'closed_form', 'sampled']:
+            raise ValueError(f'unrecognized diversity estimator "{diversity}"')
+        if diversity == 'closed_form' and self.dist_fn.scipy_name != 'sqeuclidean':
+            raise ValueError('closed-form diversity estimator requires the sqeuclidean metric')
+        if n_anchors < 2:
+            raise ValueError('number of anchors must be at least 2')
+        self.diversity = diversity
+        self.n_anchors = n_anchors
+        # without an explicit delta one is drawn from the swarm's generator on the first evaluation
         self.delta = delta
         self.c_lower, self.c_upper = c_bounds
         self.c_sum_lower, self.c_sum_upper = c_sum_bounds
@@ -33,38 +52,25 @@ class EvalFitness(PopulationOperatorBase):
         self.debug = debug
         
     def op(self, swarm: ParticleSwarmAPSOESE) -> None:
-        fitnesses = []
-        for ix, particle in enumerate(swarm):
-            fitness = self.fitness_fn(particle)
-            fitnesses.append(fitness)
-            if swarm.best_fitness is None or fitness > swarm.best_fitness:
-                swarm.best_fitness = fitness
-                swarm.best_pos = particle.solution
-                swarm.best_ix = ix
-                swarm.stagnation = 0
-                swarm.shock_mult = 1.
-                swarm.elite_perturb_dims = self.elite_perturb_dims
-            if particle.meta.best_fitness is None or fitness > particle.meta.best_fitness:
-                particle.meta.best_fitness = fitness
-                particle.meta.best_pos = particle.solution.copy()
-            particle.meta.fitness = fitness
+        if self.delta is None:
+            self.delta = 0.05 + 0.05 * swarm.rng.random()
+        fitnesses = evaluate_swarm(self.evaluator, self.fitness_fn, swarm, self.track_dirty)
+        if swarm.record_fitness(fitnesses) is not None:
+            swarm.stagnation = 0
+            swarm.shock_mult = 1.
+            swarm.elite_perturb_dims = self.elite_perturb_dims
         
-        new_best_ix = argmax(fitnesses)
-        if new_best_ix != swarm.best_ix:
-            swarm.best_ix = argmax(fitnesses)
+        swarm.best_ix = int(argmax(fitnesses))
             
         if self.debug:
             print(f'    Best Index: {swarm.best_ix}')
         
-        mean_dists = [0. for _ in range(len(swarm))]
-        for ix, particle in enumerate(swarm):
-            for ix_other in range(ix):
-                particle_other = swarm[ix_other]
-                dist = self.dist_fn(particle, particle_other)
-                mean_dists[ix] += dist
-                mean_dists[ix_other] += dist
-
-        mean_dists = [mean_dist / (len(swarm) - 1) for mean_dist in mean_dists]
+        if self.diversity == 'exact':
+            mean_dists = mean_distances(swarm.positions, self.dist_fn, self.dist_block_size or swarm.block_size)
+        elif self.diversity == 'closed_form':
+            mean_dists = mean_distances_sqeuclidean(swarm.positions)
+        else:
+            mean_dists, std_errs = mean_distances_sampled(swarm.positions, self.dist_fn, self.n_anchors, swarm.rng)
         
         d_min = min(mean_dists)
         d_max = max(mean_dists)
@@ -72,11 +78,17 @@ class EvalFitness(PopulationOperatorBase):
         
         f = (d_best - d_min) / (d_max - d_min)
         
+        swarm.evo_factor = f
+        if self.diversity == 'sampled':
+            swarm.evo_factor_error = self._evo_factor_error(f, d_max - d_min, std_errs)
+        
         if self.debug:
             print(f'    d_min: {d_min}')
             print(f'    d_max: {d_max}')
             print(f'    d_best: {d_best}')
             print(f'    f: {f}')
+            if self.diversity == 'sampled':
+                print(f'    f error bound: {swarm.evo_factor_error}')
         
         states = [
             'exploration',
@@ -102,19 +114,19 @@ class EvalFitness(PopulationOperatorBase):
         w_new = 1. / (1. + 1.5 * exp(-2.6 * f))
         
         if swarm.crnt_state == 'exploration':
-            increment = self.delta * (self.c_inc_mult + rand() * (1. - self.c_inc_mult))
+            increment = self.delta * (self.c_inc_mult + swarm.rng.random() * (1. - self.c_inc_mult))
             c1_increment = increment
             c2_increment = -1. * increment
         elif swarm.crnt_state == 'exploitation':
-            increment = self.delta * self.c_inc_mult * rand()
+            increment = self.delta * self.c_inc_mult * swarm.rng.random()
             c1_increment = increment
             c2_increment = -1. * increment
         elif swarm.crnt_state == 'convergence':
-            increment = self.delta * self.c_inc_mult * rand()
+            increment = self.delta * self.c_inc_mult * swarm.rng.random()
             c1_increment = increment
             c2_increment = increment
         elif swarm.crnt_state == 'jumping_out':
-            increment = self.delta * (self.c_inc_mult + rand() * (1. - self.c_inc_mult))
+            increment = self.delta * (self.c_inc_mult + swarm.rng.random() * (1. - self.c_inc_mult))
             c1_increment = -1. * increment
             c2_increment = increment
         
@@ -136,6 +148,13 @@ class EvalFitness(PopulationOperatorBase):
             print(f'    c1: {swarm[0].meta.c1}')
             print(f'    c2: {swarm[0].meta.c2}')
     
+    @staticmethod
+    def _evo_factor_error(f: float, d_range: float, std_errs: ndarray, z: float = 3.) -> float:
+        err = z * max(std_errs)
+        if d_range <= 2. * err:
+            return 1.
+        return float(minimum(2. * err * (1. + f) / (d_range - 2. * err), 1.))
+    
     @staticmethod
     def _membership_exploration(f: float) -> float:
         out = None
@@ -207,42 +226,54 @@ class ParameterUpdate(PopulationOperatorBase):
         vel_bound_upper: ndarray, 
         pos_bound_lower: ndarray, 
         pos_bound_upper: ndarray, 
-        fitness_fn: Callable[[ParticleInstance], float], 
-        max_iter: int,
+        fitness_fn: Union[FitnessBase, Callable[[ParticleInstance], float]], 
+        max_iter: Optional[int],
         sigma_min: float = 0.1, 
         sigma_max: float = 1.0,
         stagnation_shock_prob = 0.1,
         stagnation_shock_mult = 1.1,
-        elite_perturb_dims = 1
+        elite_perturb_dims = 1,
+        budget: Optional[Budget] = None
     ):
         self.vel_bound_lower = vel_bound_lower
         self.vel_bound_upper = vel_bound_upper
         self.pos_bound_lower = pos_bound_lower
         self.pos_bound_upper = pos_bound_upper
-        self.fitness_fn = fitness_fn
+        self.fitness_fn = as_fitness(fitness_fn)
         self.max_iter = max_iter
         self.sigma_min = sigma_min
         self.sigma_max = sigma_max
         self.stagnation_shock_mult = stagnation_shock_mult
         self.stagnation_shock_prob = stagnation_shock_prob
         self.elite_perturb_dims = elite_perturb_dims
+        self.budget = budget
+
+    def progress(self, swarm: ParticleSwarmAPSOESE) -> float:
+        # anneal by whichever of the iteration count or the evaluation/time budget runs out first
+        progress = 0. if self.max_iter is None else swarm.crnt_iter / self.max_iter
+        if self.budget is not None:
+            progress = max([progress, self.budget.fraction_used])
+        return progress
     
     def op(self, swarm: ParticleSwarmAPSOESE) -> None:
+        coefficients = swarm.random_coefficients()
+        vel_lower, vel_upper = as_dtype(self.vel_bound_lower, swarm.dtype), as_dtype(self.vel_bound_upper, swarm.dtype)
+        pos_lower, pos_upper = as_dtype(self.pos_bound_lower, swarm.dtype), as_dtype(self.pos_bound_upper, swarm.dtype)
         for ix, particle in enumerate(swarm):
             if ix == swarm.best_ix:
-                sigma = self.sigma_max - (self.sigma_max - self.sigma_min) * swarm.crnt_iter / self.max_iter
-                if swarm.stagnation > 0 and any(rand(swarm.stagnation) < self.stagnation_shock_prob):
+                sigma = self.sigma_max - (self.sigma_max - self.sigma_min) * self.progress(swarm)
+                if swarm.stagnation > 0 and any(swarm.rng.random(swarm.stagnation) < self.stagnation_shock_prob):
                     sigma = self.sigma_max * swarm.shock_mult
                     if sigma >= max(self.pos_bound_upper - self.pos_bound_lower) / 9.:
                         sigma = max(self.pos_bound_upper - self.pos_bound_lower) / 9.
                     else:
                         swarm.shock_mult *= self.stagnation_shock_mult
                 
-                d = choice(len(particle.solution), size=self.elite_perturb_dims, replace=False)
-                inc = (self.pos_bound_upper[d] - self.pos_bound_upper[d]) * sigma * randn(len(d))
+                d = swarm.rng.choice(len(particle.solution), size=self.elite_perturb_dims, replace=False)
+                inc = (self.pos_bound_upper[d] - self.pos_bound_upper[d]) * sigma * swarm.rng.normal(size=len(d))
                 particle.solution[d] += inc
                 fitness = self.fitness_fn(particle)
-                particle.meta.fitness = fitness
+                swarm.set_fitness(ix, fitness)
                 if fitness > particle.meta.best_fitness:
                     particle.meta.best_fitness = fitness
                     particle.meta.best_pos = particle.solution.copy()
@@ -254,26 +285,35 @@ class ParameterUpdate(PopulationOperatorBase):
                     swarm.shock_mult = 1.
                     swarm.elite_perturb_dims = self.elite_perturb_dims
                 else:
-                    worst_ix = argmin([particle.meta.fitness for particle in swarm])
+                    worst_ix = swarm.fitness_index.worst()
                     swarm[worst_ix] = particle.copy()
                     swarm.elite_perturb_dims += 1
                     swarm.elite_perturb_dims = min([swarm.elite_perturb_dims, len(swarm[0].solution)])
             else:
-                particle.meta.vel = particle.meta.w * particle.meta.vel + self._velocity_increment(
+                particle.meta.vel = float(particle.meta.w) * particle.meta.vel + self._velocity_increment(
                     particle.solution,
                     particle.meta.best_pos,
                     swarm.best_pos,
-                    particle.meta.c1,
-                    particle.meta.c2
+                    float(particle.meta.c1),
+                    float(particle.meta.c2),
+                    coefficients[:, ix]
                 )
-                particle.meta.vel = minimum(maximum(particle.meta.vel, self.vel_bound_lower), self.vel_bound_upper)
+                particle.meta.vel = minimum(maximum(particle.meta.vel, vel_lower), vel_upper)
                 
                 particle.solution += particle.meta.vel
-                particle.solution = minimum(maximum(particle.solution, self.pos_bound_lower), self.pos_bound_upper)
+                particle.solution = minimum(maximum(particle.solution, pos_lower), pos_upper)
+        swarm.mark_moved()
                 
         swarm.crnt_iter += 1
         swarm.stagnation += 1
 
     @staticmethod
-    def _velocity_increment(pos: ndarray, p_best_self: ndarray, p_best: ndarray, c1: float, c2: ndarray) -> ndarray:
-        return c1 * rand(*pos.shape) * (p_best_self - pos) + c2 * rand(*pos.shape) * (p_best - pos)
+    def _velocity_increment(
+        pos: ndarray, 
+        p_best_self: ndarray, 
+        p_best: ndarray, 
+        c1: float, 
+        c2: ndarray, 
+        coefficients: ndarray
+    ) -> ndarray:
+        return c1 * coefficients[0] * (p_best_self - pos) + c2 * coefficients[1] * (p_best - pos)
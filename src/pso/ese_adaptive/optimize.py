@@ -1,17 +1,27 @@
-from typing import Any, Callable, Dict, Optional, Tuple
+from itertools import count
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple, Union
 
 from numpy import ndarray
 
+from ..budget import Budget, BudgetExhausted, as_budget
+from ..checkpoint import Checkpointer, load_checkpoint
+from ..distance import MetricBase
+from ..evaluators import SerialEvaluator
+from ..fitness import FitnessBase, as_fitness, run_async
+from ..history import History, IterationRecord, iteration_record
+from ..stopping import StoppingCriterion, as_stopping_criterion
 from .population import ParticleSwarmAPSOESE
 from .operators import EvalFitness, ParameterUpdate
 from ..instance import ParticleInstance
 from ..operators import LocalSearch
+from ...core.operators import PopulationOperatorBase
 
-def apso_ese_maximize(
-    fitness_fn: Callable[[ParticleInstance], float],
+def build_apso_ese_step(
+    fitness_fn: Union[FitnessBase, Callable[[ParticleInstance], float]],
     swarm: ParticleSwarmAPSOESE, 
-    n_iter: int,
-    dist_fn: Callable[[ParticleInstance, ParticleInstance], float],
+    n_iter: Optional[int],
+    dist_fn: Union[str, MetricBase, Callable[[ParticleInstance, ParticleInstance], float]],
     pos_bound_lower: ndarray,
     pos_bound_upper: ndarray,
     vel_bound_lower: ndarray,
@@ -26,10 +36,17 @@ def apso_ese_maximize(
     stagnation_shock_mult: float = 1.1,
     elite_perturb_dims: int = 1,
     local_search_params: Optional[Dict[str, Any]] = None,
-    verbosity: int = 0,
+    dist_block_size: Optional[int] = None,
+    diversity: str = 'exact',
+    n_anchors: int = 32,
+    evaluator: Optional[SerialEvaluator] = None,
+    track_dirty: bool = False,
+    budget: Optional[Budget] = None,
     debug: bool = False
-) -> None:
-    if n_iter < 1:
+) -> Tuple[PopulationOperatorBase, EvalFitness]:
+    if n_iter is None and budget is None:
+        raise ValueError('number of iterations is required without an evaluation budget or deadline')
+    if n_iter is not None and n_iter < 1:
         raise ValueError('number of iterations must be at least 1')
     if (pos_bound_upper < pos_bound_lower).any():
         raise ValueError('lower bounds must all be less than or equal to upper bounds')
@@ -52,10 +69,9 @@ def apso_ese_maximize(
     if elite_perturb_dims < 1:
         raise ValueError('number of elite perturbation dimensions must be at least 1')
     
-    
-    if verbosity > 0:
-        print("Beginning optimization")
-    
+    fitness_fn = as_fitness(fitness_fn)
+    if delta is None:
+        delta = 0.05 + 0.05 * swarm.rng.random()
     eval_fitness = EvalFitness(
         fitness_fn=fitness_fn,
         dist_fn=dist_fn,
@@ -63,6 +79,11 @@ def apso_ese_maximize(
         c_bounds=c_bounds,
         c_sum_bounds=c_sum_bounds,
         c_inc_mult=c_inc_mult,
+        dist_block_size=dist_block_size,
+        diversity=diversity,
+        n_anchors=n_anchors,
+        evaluator=evaluator,
+        track_dirty=track_dirty,
         debug=debug
     )
     param_upd = ParameterUpdate(
@@ -76,28 +97,234 @@ def apso_ese_maximize(
         sigma_max=sigma_max,
         stagnation_shock_prob=stagnation_shock_prob,
         stagnation_shock_mult=stagnation_shock_mult,
-        elite_perturb_dims=elite_perturb_dims
+        elite_perturb_dims=elite_perturb_dims,
+        budget=budget
     )
     
     if local_search_params is not None:
-        local_search = LocalSearch(**local_search_params)
-        pso_step = eval_fitness + param_upd + local_search
+        # refined elites are projected onto the search box and scored with the swarm's own fitness unless overridden
+        local_search = LocalSearch(**{
+            'fitness_fn': fitness_fn, 
+            'bound_lower': pos_bound_lower, 
+            'bound_upper': pos_bound_upper, 
+            **local_search_params
+        })
+        pso_step = (eval_fitness + param_upd + local_search).compile()
     else:
-        pso_step = eval_fitness + param_upd
+        pso_step = (eval_fitness + param_upd).compile()
     
-    for iter_n in range(n_iter):
-        if verbosity > 1:
-            print(f'  Iteration {iter_n + 1}')
-        pso_step(swarm)
-        
+    return pso_step, eval_fitness
+
+
+def apso_ese_iterate(
+    fitness_fn: Union[FitnessBase, Callable[[ParticleInstance], float]],
+    swarm: ParticleSwarmAPSOESE, 
+    n_iter: Optional[int],
+    dist_fn: Union[str, MetricBase, Callable[[ParticleInstance, ParticleInstance], float]],
+    pos_bound_lower: ndarray,
+    pos_bound_upper: ndarray,
+    vel_bound_lower: ndarray,
+    vel_bound_upper: ndarray,
+    sigma_min: float = 0.1,
+    sigma_max: float = 1.0,
+    c_bounds: Tuple[float, float] = (1.5, 2.5),
+    c_sum_bounds: Tuple[float, float] = (3., 4.),
+    c_inc_mult: float = 0.1,
+    delta: Optional[float] = None,
+    stagnation_shock_prob: float = 0.1,
+    stagnation_shock_mult: float = 1.1,
+    elite_perturb_dims: int = 1,
+    local_search_params: Optional[Dict[str, Any]] = None,
+    debug: bool = False,
+    *,
+    dist_block_size: Optional[int] = None,
+    diversity: str = 'exact',
+    n_anchors: int = 32,
+    stopping: Optional[Union[StoppingCriterion, Sequence[StoppingCriterion]]] = None,
+    max_evaluations: Optional[int] = None,
+    deadline: Optional[float] = None,
+    evaluator: Optional[SerialEvaluator] = None,
+    track_dirty: bool = False,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: int = 1,
+    resume_from: Optional[str] = None,
+    history: Optional[History] = None,
+    record_diversity: bool = True
+) -> Iterator[IterationRecord]:
+    budget = as_budget(max_evaluations, deadline)
+    checkpoint = None if resume_from is None else load_checkpoint(resume_from)
+    if checkpoint is not None:
+        delta = checkpoint.extra['delta']
+    
+    pso_step, eval_fitness = build_apso_ese_step(
+        fitness_fn=fitness_fn,
+        swarm=swarm,
+        n_iter=n_iter,
+        dist_fn=dist_fn,
+        pos_bound_lower=pos_bound_lower,
+        pos_bound_upper=pos_bound_upper,
+        vel_bound_lower=vel_bound_lower,
+        vel_bound_upper=vel_bound_upper,
+        sigma_min=sigma_min,
+        sigma_max=sigma_max,
+        c_bounds=c_bounds,
+        c_sum_bounds=c_sum_bounds,
+        c_inc_mult=c_inc_mult,
+        delta=delta,
+        stagnation_shock_prob=stagnation_shock_prob,
+        stagnation_shock_mult=stagnation_shock_mult,
+        elite_perturb_dims=elite_perturb_dims,
+        local_search_params=local_search_params,
+        dist_block_size=dist_block_size,
+        diversity=diversity,
+        n_anchors=n_anchors,
+        evaluator=evaluator,
+        track_dirty=track_dirty,
+        budget=budget,
+        debug=debug
+    )
+    history = History() if history is None else history
+    stopping = as_stopping_criterion(stopping)
+    # diversity costs a pass over all positions, so it is only computed when recorded or needed to stop
+    record_diversity = record_diversity or (stopping is not None and stopping.uses_diversity)
+    swarm.termination_reason = None
+    
+    start_iter = 0
+    if checkpoint is not None:
+        checkpoint.restore(swarm)
+        start_iter = checkpoint.iteration
+        if budget is not None and checkpoint.extra.get('budget') is not None:
+            budget.set_state(checkpoint.extra['budget'])
+        if stopping is not None and checkpoint.extra.get('stopping') is not None:
+            stopping.set_state(checkpoint.extra['stopping'])
+    checkpointer = None if checkpoint_path is None else Checkpointer(checkpoint_path, checkpoint_interval)
+    
+    t_start = perf_counter()
+    evals_start = eval_fitness.fitness_fn.n_evaluations
+    eval_fitness.fitness_fn.set_budget(budget)
+    try:
+        for iter_n in count(start_iter) if n_iter is None else range(start_iter, n_iter):
+            pso_step(swarm)
+            record = iteration_record(
+                swarm, 
+                iter_n + 1, 
+                eval_fitness.fitness_fn.n_evaluations - evals_start, 
+                perf_counter() - t_start, 
+                swarm.crnt_state, 
+                diversity=record_diversity
+            )
+            terminate = stopping is not None and stopping(swarm, record)
+            if checkpointer is not None and not terminate:
+                checkpointer.maybe_save(
+                    swarm, 
+                    iter_n + 1, 
+                    {
+                        'delta': eval_fitness.delta, 
+                        'budget': None if budget is None else budget.get_state(),
+                        'stopping': None if stopping is None else stopping.get_state()
+                    }
+                )
+            yield history.append(record)
+            if terminate:
+                swarm.termination_reason = stopping.reason
+                break
+        else:
+            swarm.termination_reason = 'maximum number of iterations reached'
+    except BudgetExhausted as e:
+        # the swarm keeps the best position and fitness from the last completed evaluation,
+        # including the prefix of a batch that still fit the budget
+        if e.fitnesses is not None:
+            swarm.record_fitness(e.fitnesses)
+        swarm.termination_reason = str(e)
+    finally:
+        eval_fitness.fitness_fn.set_budget(None)
+        if checkpointer is not None:
+            checkpointer.close()
+
+
+def apso_ese_maximize(
+    fitness_fn: Union[FitnessBase, Callable[[ParticleInstance], float]],
+    swarm: ParticleSwarmAPSOESE, 
+    n_iter: Optional[int],
+    dist_fn: Union[str, MetricBase, Callable[[ParticleInstance, ParticleInstance], float]],
+    pos_bound_lower: ndarray,
+    pos_bound_upper: ndarray,
+    vel_bound_lower: ndarray,
+    vel_bound_upper: ndarray,
+    sigma_min: float = 0.1,
+    sigma_max: float = 1.0,
+    c_bounds: Tuple[float, float] = (1.5, 2.5),
+    c_sum_bounds: Tuple[float, float] = (3., 4.),
+    c_inc_mult: float = 0.1,
+    delta: Optional[float] = None,
+    stagnation_shock_prob: float = 0.1,
+    stagnation_shock_mult: float = 1.1,
+    elite_perturb_dims: int = 1,
+    local_search_params: Optional[Dict[str, Any]] = None,
+    verbosity: int = 0,
+    debug: bool = False,
+    *,
+    dist_block_size: Optional[int] = None,
+    diversity: str = 'exact',
+    n_anchors: int = 32,
+    stopping: Optional[Union[StoppingCriterion, Sequence[StoppingCriterion]]] = None,
+    max_evaluations: Optional[int] = None,
+    deadline: Optional[float] = None,
+    evaluator: Optional[SerialEvaluator] = None,
+    track_dirty: bool = False,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: int = 1,
+    resume_from: Optional[str] = None
+) -> None:
+    if verbosity > 0:
+        print("Beginning optimization")
+    
+    for record in apso_ese_iterate(
+        fitness_fn=fitness_fn,
+        swarm=swarm,
+        n_iter=n_iter,
+        dist_fn=dist_fn,
+        pos_bound_lower=pos_bound_lower,
+        pos_bound_upper=pos_bound_upper,
+        vel_bound_lower=vel_bound_lower,
+        vel_bound_upper=vel_bound_upper,
+        sigma_min=sigma_min,
+        sigma_max=sigma_max,
+        c_bounds=c_bounds,
+        c_sum_bounds=c_sum_bounds,
+        c_inc_mult=c_inc_mult,
+        delta=delta,
+        stagnation_shock_prob=stagnation_shock_prob,
+        stagnation_shock_mult=stagnation_shock_mult,
+        elite_perturb_dims=elite_perturb_dims,
+        local_search_params=local_search_params,
+        dist_block_size=dist_block_size,
+        diversity=diversity,
+        n_anchors=n_anchors,
+        stopping=stopping,
+        max_evaluations=max_evaluations,
+        deadline=deadline,
+        evaluator=evaluator,
+        track_dirty=track_dirty,
+        checkpoint_path=checkpoint_path,
+        checkpoint_interval=checkpoint_interval,
+        resume_from=resume_from,
+        record_diversity=False,
+        debug=debug
+    ):
         if verbosity > 1:
-            print(f'    Best fitness: {swarm.best_fitness}')
-            best_fitness = max([particle.meta.fitness for particle in swarm])
-            print(f'    Current best fitness: {best_fitness}')
+            print(f'  Iteration {record.iteration}')
+            print(f'    Best fitness: {record.best_fitness}')
+            print(f'    Current best fitness: {record.current_best_fitness}')
             
         if verbosity > 2:
-            print(f'    Current state:        {swarm.crnt_state}')
-            #print(swarm)
+            print(f'    Current state:        {record.state}')
+            if diversity == 'sampled':
+                print(f'    Evolutionary factor:  {swarm.evo_factor} (+/- {swarm.evo_factor_error})')
             
     if verbosity > 1:
-        print('Terminating -- maximum number of iterations reached')
\ No newline at end of file
+        print(f'Terminating -- {swarm.termination_reason}')
+
+
+async def apso_ese_maximize_async(*args, **kwargs) -> None:
+    await run_async(apso_ese_maximize, *args, **kwargs)
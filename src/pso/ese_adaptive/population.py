@@ -1,11 +1,18 @@
 from typing import Callable, Tuple, Union, Optional
 
-from numpy import ndarray
+from numpy import float64, ndarray
+from numpy.random import SeedSequence
+from numpy.typing import DTypeLike
 
 from ..population import ParticleSwarmBase
+from ..rng import SwarmRandom
     
     
 class ParticleSwarmAPSOESE(ParticleSwarmBase):
+    state_fields = ParticleSwarmBase.state_fields + (
+        'crnt_state', 'best_ix', 'crnt_iter', 'stagnation', 'shock_mult', 'elite_perturb_dims', 'evo_factor', 'evo_factor_error'
+    )
+
     def __init__(
         self, 
         n_particles: int, 
@@ -13,7 +20,12 @@ class ParticleSwarmAPSOESE(ParticleSwarmBase):
         pos_initializer: Callable[[int], ndarray], 
         vel_initializer: Callable[[int], ndarray], 
         c_initializer: Union[Tuple[float, float], Callable[[], Tuple[float, float]]] = (2., 2.),
-        w_initializer: Union[float, Callable[[], float]] = 0.9
+        w_initializer: Union[float, Callable[[], float]] = 0.9,
+        storage: str = 'list',
+        rng: Optional[Union[int, SeedSequence, SwarmRandom]] = None,
+        dtype: DTypeLike = float64,
+        mmap_dir: Optional[str] = None,
+        memory_budget: int = 2**28
     ) -> None:
         super(ParticleSwarmAPSOESE, self).__init__(
             n_particles,
@@ -21,7 +33,12 @@ class ParticleSwarmAPSOESE(ParticleSwarmBase):
             pos_initializer, 
             vel_initializer, 
             c_initializer,
-            w_initializer
+            w_initializer,
+            storage=storage,
+            rng=rng,
+            dtype=dtype,
+            mmap_dir=mmap_dir,
+            memory_budget=memory_budget
         )
         self.crnt_state = 'exploration'
         self.best_ix = None
@@ -29,3 +46,5 @@ class ParticleSwarmAPSOESE(ParticleSwarmBase):
         self.stagnation = 0
         self.shock_mult = 1.
         self.elite_perturb_dims = 1
+        self.evo_factor = None
+        self.evo_factor_error = 0.
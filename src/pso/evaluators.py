@@ -0,0 +1,198 @@
+from mmap import mmap
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from os import cpu_count
+from typing import Any, Dict, Optional, Tuple
+from weakref import finalize
+
+from numpy import arange, concatenate, dtype, flatnonzero, full, inf, memmap, ndarray
+
+from .fitness import CachedFitness, FitnessBase
+
+
+class SerialEvaluator(object):
+    def __call__(self, fitness_fn: FitnessBase, swarm) -> ndarray:
+        block_size = getattr(swarm, 'block_size', None)
+        if block_size is None or not fitness_fn.batched:
+            return fitness_fn.evaluate(swarm)
+        positions = swarm.positions
+        return concatenate([
+            fitness_fn.evaluate_positions(positions[start:start + block_size]) 
+            for start in range(0, len(positions), block_size)
+        ])
+
+    def evaluate_positions(self, fitness_fn: FitnessBase, xs: ndarray) -> ndarray:
+        return fitness_fn.evaluate_positions(xs)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_worker_fitness_fn = None
+
+
+def _init_worker(fitness_fn: FitnessBase) -> None:
+    # each worker unpickles the fitness once, instead of once per chunk
+    global _worker_fitness_fn
+    _worker_fitness_fn = fitness_fn
+
+
+def _evaluate_mapped_chunk(args: Tuple[str, int, Tuple[int, int], str, int, int]) -> ndarray:
+    fpath, offset, shape, dtype_str, start, stop = args
+    positions = memmap(fpath, dtype=dtype(dtype_str), mode='r', offset=offset, shape=shape)
+    try:
+        out = _worker_fitness_fn.evaluate_positions(positions[start:stop])
+    finally:
+        del positions
+
+    return out
+
+
+def _evaluate_chunk(args: Tuple[str, Tuple[int, int], str, int, int]) -> ndarray:
+    shm_name, shape, dtype_str, start, stop = args
+    shm = SharedMemory(name=shm_name)
+    try:
+        positions = ndarray(shape, dtype=dtype(dtype_str), buffer=shm.buf)
+        out = _worker_fitness_fn.evaluate_positions(positions[start:stop])
+        del positions
+    finally:
+        shm.close()
+
+    return out
+
+
+def _release_pool(resources: Dict[str, Any], terminate: bool = False) -> None:
+    pool = resources.pop('pool', None)
+    if pool is not None:
+        if terminate:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+    resources.pop('fitness_fn', None)
+
+
+def _release_shared(resources: Dict[str, Any]) -> None:
+    shm = resources.pop('shm', None)
+    if shm is not None:
+        # the array view must go before its buffer can be closed
+        resources.pop('positions', None)
+        shm.close()
+        shm.unlink()
+
+
+def _release(resources: Dict[str, Any]) -> None:
+    # also runs when an evaluator is garbage collected without being closed
+    _release_pool(resources, terminate=True)
+    _release_shared(resources)
+
+
+class ProcessPoolEvaluator(SerialEvaluator):
+    def __init__(self, n_workers: Optional[int] = None, chunk_size: Optional[int] = None) -> None:
+        if n_workers is not None and n_workers < 1:
+            raise ValueError('number of workers must be at least 1')
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError('chunk size must be at least 1')
+        self.n_workers = cpu_count() if n_workers is None else n_workers
+        self.chunk_size = chunk_size
+        self._resources = {}
+        finalize(self, _release, self._resources)
+
+    def __call__(self, fitness_fn: FitnessBase, swarm) -> ndarray:
+        return self.evaluate_positions(fitness_fn, swarm.positions, getattr(swarm, 'block_size', None))
+
+    def evaluate_positions(self, fitness_fn: FitnessBase, xs: ndarray, block_size: Optional[int] = None) -> ndarray:
+        n_particles = xs.shape[0]
+        chunk_size = self.chunk_size
+        if chunk_size is None:
+            chunk_size = max(1, -(-n_particles // (4 * self.n_workers)))
+        if block_size is not None:
+            chunk_size = min(chunk_size, block_size)
+
+        if isinstance(xs, memmap) and isinstance(xs.base, mmap):
+            # workers map the same file instead of copying a possibly larger-than-memory matrix into shared memory
+            evaluate_chunk = _evaluate_mapped_chunk
+            tasks = [
+                (xs.filename, xs.offset, xs.shape, xs.dtype.str, start, min(start + chunk_size, n_particles))
+                for start in range(0, n_particles, chunk_size)
+            ]
+        else:
+            positions = self._share(xs)
+            evaluate_chunk = _evaluate_chunk
+            tasks = [
+                (self._resources['shm'].name, positions.shape, positions.dtype.str, start, min(start + chunk_size, n_particles))
+                for start in range(0, n_particles, chunk_size)
+            ]
+
+        pool = self._pool(fitness_fn)
+        fitness_fn.add_evaluations(n_particles)
+
+        return concatenate(pool.map(evaluate_chunk, tasks, chunksize=1))
+
+    def _pool(self, fitness_fn: FitnessBase) -> Pool:
+        # the workers hold one fitness function, so the pool is only rebuilt when a different one is evaluated
+        if self._resources.get('fitness_fn') is not fitness_fn:
+            _release_pool(self._resources)
+            self._resources['pool'] = Pool(self.n_workers, initializer=_init_worker, initargs=(fitness_fn,))
+            self._resources['fitness_fn'] = fitness_fn
+        return self._resources['pool']
+
+    def _share(self, positions: ndarray) -> ndarray:
+        shared = self._resources.get('positions')
+        if shared is None or shared.shape != positions.shape or shared.dtype != positions.dtype:
+            _release_shared(self._resources)
+            shm = SharedMemory(create=True, size=max(positions.nbytes, 1))
+            shared = ndarray(positions.shape, dtype=positions.dtype, buffer=shm.buf)
+            self._resources['shm'], self._resources['positions'] = shm, shared
+        shared[:] = positions
+
+        return shared
+
+    def close(self) -> None:
+        _release_pool(self._resources)
+        _release_shared(self._resources)
+
+
+def _evaluate_positions(evaluator: SerialEvaluator, fitness_fn: FitnessBase, xs: ndarray) -> ndarray:
+    if isinstance(fitness_fn, CachedFitness):
+        return fitness_fn.cached(xs, lambda misses: evaluator.evaluate_positions(fitness_fn.fitness_fn, misses))
+    return evaluator.evaluate_positions(fitness_fn, xs)
+
+
+def evaluate_swarm(evaluator: SerialEvaluator, fitness_fn: FitnessBase, swarm, track_dirty: bool = False) -> ndarray:
+    rows = None
+    if track_dirty:
+        dirty = swarm.dirty
+        if not dirty.all():
+            rows = flatnonzero(dirty)
+
+    budget = fitness_fn.budget
+    n_rows = len(swarm) if rows is None else len(rows)
+    n_affordable = n_rows if budget is None else budget.affordable(n_rows)
+    if 0 < n_affordable < n_rows:
+        # evaluate the prefix that still fits the budget and stop with it instead of discarding the whole batch;
+        # cache hits are not known up front, so a cached fitness may stop a batch that would have fit
+        fitnesses = full((len(swarm),), -inf) if rows is None else swarm.fitnesses.copy()
+        rows = arange(len(swarm)) if rows is None else rows
+        fitnesses[rows[n_affordable:]] = -inf
+        fitnesses[rows[:n_affordable]] = _evaluate_positions(evaluator, fitness_fn, swarm.positions[rows[:n_affordable]])
+        raise budget.exhausted(n_rows - n_affordable, fitnesses)
+
+    if rows is not None:
+        fitnesses = swarm.fitnesses.copy()
+        if len(rows) > 0:
+            fitnesses[rows] = _evaluate_positions(evaluator, fitness_fn, swarm.positions[rows])
+    elif isinstance(fitness_fn, CachedFitness):
+        fitnesses = _evaluate_positions(evaluator, fitness_fn, swarm.positions)
+    else:
+        fitnesses = evaluator(fitness_fn, swarm)
+    # only mark rows clean once their fitnesses exist, so a failed evaluation is retried
+    if track_dirty:
+        swarm.mark_evaluated()
+    return fitnesses
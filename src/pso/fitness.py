@@ -0,0 +1,250 @@
+from asyncio import Semaphore, gather, get_running_loop, run, run_coroutine_threadsafe
+from collections import OrderedDict
+from inspect import iscoroutinefunction
+from os import getpid
+from threading import local
+from typing import Any, Awaitable, Callable, Coroutine, Iterable, Optional, Union
+
+from numpy import asarray, empty, fromiter, int64, ndarray, rint
+
+from .budget import Budget
+from .instance import ParticleInstance, PositionParticle
+from ..core.operators import count_evaluations
+
+
+class FitnessBase(object):
+    batched = False
+    n_evaluations = 0
+    budget = None
+
+    def __init__(self, fn: Callable) -> None:
+        self.fn = fn
+
+    def __getstate__(self) -> dict:
+        # worker copies must not charge a budget the parent process already charged
+        state = self.__dict__.copy()
+        state.pop('budget', None)
+        return state
+
+    def set_budget(self, budget: Optional[Budget]) -> None:
+        self.budget = budget
+
+    def add_evaluations(self, n: int) -> None:
+        if self.budget is not None:
+            self.budget.charge(n)
+        self.n_evaluations += n
+        count_evaluations(n)
+
+    def __call__(self, particle: ParticleInstance) -> float:
+        raise NotImplementedError
+
+    def evaluate(self, swarm) -> ndarray:
+        raise NotImplementedError
+
+    def evaluate_positions(self, xs: ndarray) -> ndarray:
+        raise NotImplementedError
+
+
+class ParticleFitness(FitnessBase):
+    def __call__(self, particle: ParticleInstance) -> float:
+        self.add_evaluations(1)
+        return self.fn(particle)
+
+    def evaluate(self, swarm) -> ndarray:
+        self.add_evaluations(len(swarm))
+        return fromiter((self.fn(particle) for particle in swarm), dtype=float, count=len(swarm))
+
+    def evaluate_positions(self, xs: ndarray) -> ndarray:
+        self.add_evaluations(len(xs))
+        return fromiter((self.fn(PositionParticle(x)) for x in xs), dtype=float, count=len(xs))
+
+
+class BatchFitness(FitnessBase):
+    batched = True
+
+    def __call__(self, particle: ParticleInstance) -> float:
+        self.add_evaluations(1)
+        return float(self.fn(particle.solution[None, :])[0])
+
+    def evaluate(self, swarm) -> ndarray:
+        return self.evaluate_positions(swarm.positions)
+
+    def evaluate_positions(self, xs: ndarray) -> ndarray:
+        self.add_evaluations(len(xs))
+        out = asarray(self.fn(xs), dtype=float)
+        if out.shape != (len(xs),):
+            raise ValueError(f'batch fitness must return shape ({len(xs)},) (found {out.shape})')
+        return out
+
+
+_bound_loop = local()
+
+
+def _run_coroutine(coro: Coroutine) -> Any:
+    binding = getattr(_bound_loop, 'binding', None)
+    if binding is not None and binding[0] == getpid():
+        return run_coroutine_threadsafe(coro, binding[1]).result()
+    try:
+        get_running_loop()
+    except RuntimeError:
+        return run(coro)
+    coro.close()
+    raise RuntimeError(
+        'async fitness cannot be evaluated synchronously inside a running event loop (use run_async or an *_async optimizer)'
+    )
+
+
+class AsyncFitness(FitnessBase):
+    def __init__(self, fn: Callable[[ParticleInstance], Awaitable[float]], max_concurrency: Optional[int] = None) -> None:
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+        super(AsyncFitness, self).__init__(fn)
+        self.max_concurrency = max_concurrency
+
+    def __call__(self, particle: ParticleInstance) -> float:
+        self.add_evaluations(1)
+        return _run_coroutine(self.fn(particle))
+
+    def evaluate(self, swarm) -> ndarray:
+        return _run_coroutine(self.evaluate_async(swarm))
+
+    def evaluate_positions(self, xs: ndarray) -> ndarray:
+        return _run_coroutine(self.evaluate_async(PositionParticle(x) for x in xs))
+
+    async def evaluate_async(self, particles: Iterable[ParticleInstance]) -> ndarray:
+        particles = list(particles)
+        self.add_evaluations(len(particles))
+        if self.max_concurrency is None:
+            out = await gather(*(self.fn(particle) for particle in particles))
+        else:
+            semaphore = Semaphore(self.max_concurrency)
+
+            async def bounded(particle: ParticleInstance) -> float:
+                async with semaphore:
+                    return await self.fn(particle)
+
+            out = await gather(*(bounded(particle) for particle in particles))
+
+        return asarray(out, dtype=float)
+
+
+class CachedFitness(FitnessBase):
+    def __init__(
+        self, 
+        fitness_fn: Union[FitnessBase, Callable[[ParticleInstance], float]], 
+        maxsize: int = 4096, 
+        tol: Optional[float] = None
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError('cache size must be at least 1')
+        if tol is not None and tol <= 0.:
+            raise ValueError('cache tolerance must be positive')
+        fitness_fn = as_fitness(fitness_fn)
+        super(CachedFitness, self).__init__(fitness_fn.fn)
+        self.fitness_fn = fitness_fn
+        self.maxsize = maxsize
+        self.tol = tol
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+
+    @property
+    def n_evaluations(self) -> int:
+        return self.fitness_fn.n_evaluations
+
+    @property
+    def budget(self) -> Optional[Budget]:
+        return self.fitness_fn.budget
+
+    def set_budget(self, budget: Optional[Budget]) -> None:
+        self.fitness_fn.set_budget(budget)
+
+    @property
+    def hit_rate(self) -> float:
+        n_lookups = self.hits + self.misses
+        return self.hits / n_lookups if n_lookups > 0 else 0.
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _keys(self, xs: ndarray) -> list:
+        if self.tol is None:
+            return [x.tobytes() for x in xs]
+        return [x.tobytes() for x in rint(xs / self.tol).astype(int64)]
+
+    def cached(self, xs: ndarray, evaluate: Callable[[ndarray], ndarray]) -> ndarray:
+        cache = self._cache
+        out = empty((len(xs),))
+        keys = self._keys(xs)
+        misses = {}
+        for ix, key in enumerate(keys):
+            if key in cache:
+                cache.move_to_end(key)
+                out[ix] = cache[key]
+            else:
+                misses.setdefault(key, []).append(ix)
+        self.hits += len(xs) - len(misses)
+        self.misses += len(misses)
+
+        if len(misses) > 0:
+            first_ix = [ixs[0] for ixs in misses.values()]
+            for (key, ixs), fitness in zip(misses.items(), evaluate(xs[first_ix])):
+                out[ixs] = fitness
+                cache[key] = float(fitness)
+                if len(cache) > self.maxsize:
+                    cache.popitem(last=False)
+
+        return out
+
+    def __call__(self, particle: ParticleInstance) -> float:
+        return float(self.evaluate_positions(particle.solution[None, :])[0])
+
+    def evaluate(self, swarm) -> ndarray:
+        return self.evaluate_positions(swarm.positions)
+
+    def evaluate_positions(self, xs: ndarray) -> ndarray:
+        return self.cached(xs, self.fitness_fn.evaluate_positions)
+
+
+def batch_fitness(fn: Callable[[ndarray], ndarray]) -> BatchFitness:
+    return BatchFitness(fn)
+
+
+def as_fitness(fn: Union[FitnessBase, Callable[[ParticleInstance], float]]) -> FitnessBase:
+    if isinstance(fn, FitnessBase):
+        return fn
+    if iscoroutinefunction(fn):
+        return AsyncFitness(fn)
+    return ParticleFitness(fn)
+
+
+def async_fitness(
+    fn: Optional[Callable[[ParticleInstance], Awaitable[float]]] = None, 
+    max_concurrency: Optional[int] = None
+) -> Union[AsyncFitness, Callable[[Callable[[ParticleInstance], Awaitable[float]]], AsyncFitness]]:
+    if fn is None:
+        return lambda fn: AsyncFitness(fn, max_concurrency)
+    return AsyncFitness(fn, max_concurrency)
+
+
+def cached_fitness(
+    fn: Union[FitnessBase, Callable[[ParticleInstance], float]], 
+    maxsize: int = 4096, 
+    tol: Optional[float] = None
+) -> CachedFitness:
+    return CachedFitness(fn, maxsize, tol)
+
+
+async def run_async(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    loop = get_running_loop()
+
+    def bound() -> Any:
+        _bound_loop.binding = (getpid(), loop)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _bound_loop.binding = None
+
+    return await loop.run_in_executor(None, bound)
@@ -0,0 +1,116 @@
+from heapq import heapify, heappop, heappush
+from typing import List, Optional, Tuple
+
+from numpy import argpartition, argsort, array, empty, float64, full, inf, int64, isnan, log, ndarray, where, zeros
+
+from .rng import SwarmRandom
+
+
+class FitnessIndex(object):
+    def __init__(self, fitnesses: Optional[ndarray] = None) -> None:
+        self.rebuild(empty((0,)) if fitnesses is None else fitnesses)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def rebuild(self, fitnesses: ndarray) -> None:
+        # unevaluated particles rank below everything else
+        fitnesses = array(fitnesses, dtype=float64)
+        self.keys = where(isnan(fitnesses), -inf, fitnesses)
+        self._versions = zeros((len(fitnesses),), dtype=int64)
+        # heaps are only built once a best/worst query needs them
+        self._min_heap = None
+        self._max_heap = None
+
+    def update(self, ix: int, fitness: Optional[float]) -> None:
+        key = -inf if fitness is None or isnan(fitness) else float(fitness)
+        self.keys[ix] = key
+        self._versions[ix] += 1
+        if self._min_heap is not None:
+            version = int(self._versions[ix])
+            heappush(self._min_heap, (key, ix, version))
+            heappush(self._max_heap, (-key, ix, version))
+            if len(self._min_heap) > 2 * len(self.keys) + 16:
+                self._build_heaps()
+
+    def _build_heaps(self) -> None:
+        versions = self._versions.tolist()
+        keys = self.keys.tolist()
+        self._min_heap = [(key, ix, version) for ix, (key, version) in enumerate(zip(keys, versions))]
+        self._max_heap = [(-key, ix, version) for ix, (key, version) in enumerate(zip(keys, versions))]
+        heapify(self._min_heap)
+        heapify(self._max_heap)
+
+    def _top(self, heap: List[Tuple[float, int, int]]) -> int:
+        # entries superseded by a later update are discarded lazily
+        while heap[0][2] != self._versions[heap[0][1]]:
+            heappop(heap)
+        return heap[0][1]
+
+    def best(self) -> int:
+        if len(self.keys) == 0:
+            raise ValueError('fitness index is empty')
+        if self._max_heap is None:
+            self._build_heaps()
+        return self._top(self._max_heap)
+
+    def worst(self) -> int:
+        if len(self.keys) == 0:
+            raise ValueError('fitness index is empty')
+        if self._min_heap is None:
+            self._build_heaps()
+        return self._top(self._min_heap)
+
+    def top_k(self, k: int) -> ndarray:
+        # ascending by fitness, so the best particle comes last
+        k = self._check_k(k)
+        if k == 0:
+            return empty((0,), dtype=int64)
+        ixs = argpartition(self.keys, len(self.keys) - k)[len(self.keys) - k:]
+        return ixs[argsort(self.keys[ixs], kind='stable')]
+
+    def bottom_k(self, k: int) -> ndarray:
+        # ascending by fitness, so the worst particle comes first
+        k = self._check_k(k)
+        if k == 0:
+            return empty((0,), dtype=int64)
+        ixs = argpartition(self.keys, k - 1)[:k]
+        return ixs[argsort(self.keys[ixs], kind='stable')]
+
+    def roulette(self, k: int, rng: SwarmRandom) -> ndarray:
+        k = self._check_k(k)
+        valid = self.keys > -inf
+        weights = zeros((len(self.keys),))
+        if valid.any():
+            weights[valid] = self.keys[valid]
+            low = weights[valid].min()
+            if low < 0.:
+                # shift so fitness-proportional selection also works for negated (minimization) objectives
+                weights[valid] -= low
+            if not (weights > 0.).any():
+                weights[valid] = 1.
+        else:
+            weights[:] = 1.
+        if k == 0:
+            return empty((0,), dtype=int64)
+        # the k largest log(u) / w form a weighted sample without replacement (Efraimidis-Spirakis)
+        scores = full((len(weights),), -inf)
+        positive = weights > 0.
+        scores[positive] = log(rng.random(int(positive.sum()))) / weights[positive]
+        return argpartition(scores, len(scores) - k)[len(scores) - k:]
+
+    def tournament(self, k: int, rng: SwarmRandom, size: int = 2) -> ndarray:
+        if k < 0:
+            raise ValueError('number of selections must be non-negative')
+        if size < 1:
+            raise ValueError('tournament size must be at least 1')
+        if len(self.keys) == 0:
+            raise ValueError('fitness index is empty')
+        contestants = rng.integers(0, len(self.keys), size=(k, size))
+        winners = self.keys[contestants].argmax(axis=1)
+        return contestants[range(k), winners]
+
+    def _check_k(self, k: int) -> int:
+        if k < 0 or k > len(self.keys):
+            raise ValueError(f'cannot select {k} of {len(self.keys)} particles')
+        return k
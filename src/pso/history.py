@@ -0,0 +1,101 @@
+from typing import Dict, NamedTuple, Optional
+
+from numpy import float64, full, isnan, nan, ndarray, roll, sqrt
+
+
+ESE_STATES = ('exploration', 'exploitation', 'convergence', 'jumping_out')
+
+
+class IterationRecord(NamedTuple):
+    iteration: int
+    best_fitness: float
+    current_best_fitness: float
+    diversity: float
+    state: Optional[str]
+    n_evaluations: int
+    elapsed: float
+
+
+class RingBuffer(object):
+    def __init__(self, capacity: int, n_fields: int) -> None:
+        if capacity < 1:
+            raise ValueError('ring buffer capacity must be at least 1')
+        self.data = full((capacity, n_fields), nan)
+        self.n_appended = 0
+
+    def __len__(self):
+        return min(self.n_appended, len(self.data))
+
+    @property
+    def capacity(self) -> int:
+        return len(self.data)
+
+    def append(self, row) -> None:
+        self.data[self.n_appended % len(self.data)] = row
+        self.n_appended += 1
+
+    def to_array(self) -> ndarray:
+        if self.n_appended <= len(self.data):
+            return self.data[:self.n_appended].copy()
+        return roll(self.data, -(self.n_appended % len(self.data)), axis=0)
+
+
+class History(RingBuffer):
+    fields = ('iteration', 'best_fitness', 'current_best_fitness', 'diversity', 'state', 'n_evaluations', 'elapsed')
+
+    def __init__(self, capacity: int = 1024) -> None:
+        super(History, self).__init__(capacity, len(self.fields))
+
+    def append(self, record: IterationRecord) -> IterationRecord:
+        state = nan if record.state is None else ESE_STATES.index(record.state)
+        super(History, self).append((
+            record.iteration,
+            nan if record.best_fitness is None else record.best_fitness,
+            record.current_best_fitness,
+            record.diversity,
+            state,
+            record.n_evaluations,
+            record.elapsed
+        ))
+        return record
+
+    def as_dict(self) -> Dict[str, ndarray]:
+        data = self.to_array()
+        return {name: data[:, ix] for ix, name in enumerate(self.fields)}
+
+    def __getitem__(self, name: str) -> ndarray:
+        return self.to_array()[:, self.fields.index(name)]
+
+
+def centroid_diversity(positions: ndarray, block_size: Optional[int] = None) -> float:
+    if len(positions) == 0:
+        return nan
+    if block_size is None:
+        block_size = len(positions)
+    centroid = positions.mean(axis=0, dtype=float64)
+    total = 0.
+    for start in range(0, len(positions), block_size):
+        offsets = positions[start:start + block_size] - centroid
+        total += sqrt((offsets * offsets).sum(axis=1)).sum()
+    return float(total / len(positions))
+
+
+def iteration_record(
+    swarm, 
+    iteration: int, 
+    n_evaluations: int, 
+    elapsed: float, 
+    state: Optional[str] = None,
+    diversity: bool = True
+) -> IterationRecord:
+    fitnesses = swarm.fitnesses
+    valid = fitnesses[~isnan(fitnesses)]
+    return IterationRecord(
+        iteration,
+        swarm.best_fitness,
+        float(valid.max()) if len(valid) > 0 else nan,
+        centroid_diversity(swarm.positions, getattr(swarm, 'block_size', None)) if diversity else nan,
+        state,
+        n_evaluations,
+        elapsed
+    )
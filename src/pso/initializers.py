@@ -1,23 +1,27 @@
+from typing import Optional
+
 from numpy import exp, log, ndarray, repeat
 from numpy.random import rand, randn
 
+from .rng import SwarmRandom
+
 
-def uniform(dim: int, lo: float = 0., hi: float = 1.) -> ndarray:
-    return lo + (hi - lo) * rand(dim)
+def uniform(dim: int, lo: float = 0., hi: float = 1., rng: Optional[SwarmRandom] = None) -> ndarray:
+    return lo + (hi - lo) * (rand(dim) if rng is None else rng.random(dim))
 
 
-def normal(dim: int, mean: float = 0., std: float = 1.) -> ndarray:
-    return mean + std * randn(dim)
+def normal(dim: int, mean: float = 0., std: float = 1., rng: Optional[SwarmRandom] = None) -> ndarray:
+    return mean + std * (randn(dim) if rng is None else rng.normal(size=dim))
 
 
-def loguniform(dim: int, lo: float = 1e-10, hi: float = 1.) -> ndarray:
+def loguniform(dim: int, lo: float = 1e-10, hi: float = 1., rng: Optional[SwarmRandom] = None) -> ndarray:
     lo_ = log(lo)
     hi_ = log(hi)
-    return exp(uniform(dim, lo_, hi_))
+    return exp(uniform(dim, lo_, hi_, rng))
 
 
-def lognormal(dim: int, mean: float = 0., std: float = 1.) -> ndarray:
-    return exp(normal(dim, mean, std))
+def lognormal(dim: int, mean: float = 0., std: float = 1., rng: Optional[SwarmRandom] = None) -> ndarray:
+    return exp(normal(dim, mean, std, rng))
 
 
 def constant(dim: int, val: float) -> ndarray:
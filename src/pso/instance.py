@@ -1,6 +1,6 @@
 from typing import Callable, Union, Tuple, Optional
 
-from numpy import ndarray
+from numpy import isnan, nan, ndarray
 
 from ..core.instance import InstanceBase
 
@@ -110,4 +110,95 @@ class ParticleInstance(InstanceBase):
         out.meta.best_fitness = self.meta.best_fitness
         out.meta.best_pos = self.meta.best_pos.copy()
         
-        return out
\ No newline at end of file
+        return out
+
+def _scalar_or_none(val: float) -> Optional[float]:
+    return None if isnan(val) else float(val)
+
+
+class ParticleMetaView(ParticleMeta):
+    def __init__(self, state, ix: int) -> None:
+        self._state = state
+        self._ix = ix
+
+    @property
+    def vel(self) -> ndarray:
+        return self._state.vel[self._ix]
+
+    @vel.setter
+    def vel(self, val: ndarray) -> None:
+        self._state.vel[self._ix] = val
+
+    @property
+    def c1(self) -> float:
+        return float(self._state.c1[self._ix])
+
+    @c1.setter
+    def c1(self, val: float) -> None:
+        self._state.c1[self._ix] = val
+
+    @property
+    def c2(self) -> float:
+        return float(self._state.c2[self._ix])
+
+    @c2.setter
+    def c2(self, val: float) -> None:
+        self._state.c2[self._ix] = val
+
+    @property
+    def w(self) -> Optional[float]:
+        return _scalar_or_none(self._state.w[self._ix])
+
+    @w.setter
+    def w(self, val: Optional[float]) -> None:
+        self._state.w[self._ix] = nan if val is None else val
+
+    @property
+    def fitness(self) -> Optional[float]:
+        return _scalar_or_none(self._state.fitness[self._ix])
+
+    @fitness.setter
+    def fitness(self, val: Optional[float]) -> None:
+        self._state.fitness[self._ix] = nan if val is None else val
+
+    @property
+    def best_fitness(self) -> Optional[float]:
+        return _scalar_or_none(self._state.best_fitness[self._ix])
+
+    @best_fitness.setter
+    def best_fitness(self, val: Optional[float]) -> None:
+        self._state.best_fitness[self._ix] = nan if val is None else val
+
+    @property
+    def best_pos(self) -> Optional[ndarray]:
+        if isnan(self._state.best_fitness[self._ix]):
+            return None
+        return self._state.best_pos[self._ix]
+
+    @best_pos.setter
+    def best_pos(self, val: Optional[ndarray]) -> None:
+        if val is not None:
+            self._state.best_pos[self._ix] = val
+
+
+class ParticleView(ParticleInstance):
+    def __init__(self, state, ix: int) -> None:
+        self._state = state
+        self._ix = ix
+        self.meta = ParticleMetaView(state, ix)
+
+    @property
+    def solution(self) -> ndarray:
+        return self._state.pos[self._ix]
+
+    @solution.setter
+    def solution(self, val: ndarray) -> None:
+        self._state.pos[self._ix] = val
+
+
+class PositionParticle(object):
+    __slots__ = ('solution', 'meta')
+
+    def __init__(self, solution: ndarray) -> None:
+        self.solution = solution
+        self.meta = None
@@ -0,0 +1,231 @@
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from os import cpu_count
+from traceback import format_exc
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from numpy import argsort, concatenate, isnan, inf, ndarray, where
+from numpy.random import SeedSequence, seed as np_seed
+
+from .population import ParticleSwarmBase
+from .rng import SwarmRandom
+from .topology import CSRTopology, fully_connected, random_k, ring
+from ..core.population import PopulationBase
+
+
+IslandFactory = Callable[[int], Tuple[ParticleSwarmBase, Callable[[ParticleSwarmBase], None]]]
+
+_TOPOLOGIES = {
+    'ring': lambda rng: ring(1),
+    'fully_connected': lambda rng: fully_connected(),
+    'random': lambda rng: random_k(1, rng)
+}
+
+
+def emigrants(swarm: ParticleSwarmBase, n_migrants: int) -> Tuple[ndarray, ndarray]:
+    best_fitnesses = where(isnan(swarm.best_fitnesses), -inf, swarm.best_fitnesses)
+    top = argsort(best_fitnesses)[::-1][:n_migrants]
+    return swarm.best_positions[top].copy(), best_fitnesses[top].copy()
+
+
+def accept_migrants(swarm: ParticleSwarmBase, xs: ndarray, fitnesses: ndarray) -> None:
+    worst = swarm.fitness_index.bottom_k(min(len(xs), len(swarm)))
+    for ix, x, fitness in zip(worst.tolist(), xs, fitnesses):
+        fitness = float(fitness)
+        particle = swarm[ix]
+        particle.solution = x.copy()
+        swarm.set_fitness(ix, fitness)
+        swarm.mark_evaluated([ix])
+        particle.meta.best_fitness = fitness
+        particle.meta.best_pos = x.copy()
+        if swarm.best_fitness is None or fitness > swarm.best_fitness:
+            swarm.best_fitness = fitness
+            swarm.best_pos = x.copy()
+
+
+def _island_worker(conn: Connection, make_island: IslandFactory, island_ixs: Sequence[int], entropy: int) -> None:
+    try:
+        islands = {}
+        for ix in island_ixs:
+            seed_seq = SeedSequence(entropy, spawn_key=(ix,))
+            np_seed(seed_seq.generate_state(1)[0])
+            swarm, step = make_island(ix)
+            # each island draws from its own stream, so results do not depend on the worker count
+            swarm.rng = SwarmRandom(seed_seq)
+            islands[ix] = (swarm, step)
+        conn.send(None)
+        
+        while True:
+            msg = conn.recv()
+            if msg is None:
+                break
+            n_steps, immigrants, n_migrants = msg
+            out = {}
+            for ix, (swarm, step) in islands.items():
+                if ix in immigrants:
+                    accept_migrants(swarm, *immigrants[ix])
+                for _ in range(n_steps):
+                    step(swarm)
+                out[ix] = emigrants(swarm, n_migrants) + (swarm.best_pos, swarm.best_fitness)
+            conn.send(out)
+    except Exception:
+        conn.send(RuntimeError(f'island worker failed:\n{format_exc()}'))
+    finally:
+        conn.close()
+
+
+class Island(object):
+    def __init__(self, ix: int) -> None:
+        self.ix = ix
+        self.best_pos = None
+        self.best_fitness = None
+        self.emigrant_pos = None
+        self.emigrant_fitness = None
+
+    def __str__(self):
+        return f'Island({self.ix}, best_fitness={self.best_fitness})'
+
+
+class IslandModel(PopulationBase):
+    def __init__(
+        self, 
+        make_island: IslandFactory,
+        n_islands: int,
+        topology: Union[str, CSRTopology, Callable[[Sequence[Island]], CSRTopology]] = 'ring',
+        n_workers: Optional[int] = None,
+        seed: Optional[int] = None
+    ) -> None:
+        if n_islands < 1:
+            raise ValueError('number of islands must be at least 1')
+        if n_workers is not None and n_workers < 1:
+            raise ValueError('number of workers must be at least 1')
+        self.entropy = SeedSequence(seed).entropy
+        if isinstance(topology, str):
+            if topology not in _TOPOLOGIES:
+                raise ValueError(f'unrecognized island topology "{topology}"')
+            topology = _TOPOLOGIES[topology](SwarmRandom(SeedSequence(self.entropy, spawn_key=(n_islands,))))
+        self.make_island = make_island
+        self.n_workers = min(n_islands, cpu_count() if n_workers is None else n_workers)
+        self.topology_fn = None if isinstance(topology, CSRTopology) else topology
+        
+        super(IslandModel, self).__init__(
+            None, 
+            subpopulations=[Island(ix) for ix in range(n_islands)], 
+            topology=topology
+        )
+        self.best_pos = None
+        self.best_fitness = None
+        self.crnt_iter = 0
+        self._workers: List[Tuple[Process, Connection]] = []
+        self._immigrants: Dict[int, Tuple[ndarray, ndarray]] = {}
+
+    def __enter__(self) -> "IslandModel":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        if len(self._workers) > 0:
+            return
+        for worker_ix in range(self.n_workers):
+            conn, worker_conn = Pipe()
+            island_ixs = list(range(worker_ix, len(self), self.n_workers))
+            process = Process(
+                target=_island_worker, 
+                args=(worker_conn, self.make_island, island_ixs, self.entropy), 
+                daemon=True
+            )
+            process.start()
+            worker_conn.close()
+            self._workers.append((process, conn))
+        for _, conn in self._workers:
+            self._recv(conn)
+
+    def close(self) -> None:
+        for process, conn in self._workers:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+            process.join()
+        self._workers = []
+
+    def _recv(self, conn: Connection):
+        out = conn.recv()
+        if isinstance(out, Exception):
+            self.close()
+            raise out
+        return out
+
+    def step(self, n_steps: int, n_migrants: int = 1) -> None:
+        self.start()
+        for worker_ix, (_, conn) in enumerate(self._workers):
+            immigrants = {
+                ix: self._immigrants[ix] for ix in range(worker_ix, len(self), self.n_workers) if ix in self._immigrants
+            }
+            conn.send((n_steps, immigrants, n_migrants))
+        for _, conn in self._workers:
+            for ix, (emigrant_pos, emigrant_fitness, best_pos, best_fitness) in self._recv(conn).items():
+                island = self[ix]
+                island.emigrant_pos, island.emigrant_fitness = emigrant_pos, emigrant_fitness
+                island.best_pos, island.best_fitness = best_pos, best_fitness
+                if best_fitness is not None and (self.best_fitness is None or best_fitness > self.best_fitness):
+                    self.best_fitness = best_fitness
+                    self.best_pos = best_pos
+        self.crnt_iter += n_steps
+        self._immigrants = self._migrate(n_migrants)
+
+    def _migrate(self, n_migrants: int) -> Dict[int, Tuple[ndarray, ndarray]]:
+        if self.topology_fn is not None:
+            self.topology = self.topology_fn(self.subpopulations)
+        out = {}
+        for ix, neighbors in enumerate(self.topology):
+            sources = [self[other_ix] for other_ix in neighbors if other_ix != ix]
+            if len(sources) == 0:
+                continue
+            xs = concatenate([island.emigrant_pos for island in sources])
+            fitnesses = concatenate([island.emigrant_fitness for island in sources])
+            top = argsort(fitnesses)[::-1][:n_migrants]
+            out[ix] = (xs[top], fitnesses[top])
+        return out
+
+
+def island_maximize(
+    make_island: IslandFactory,
+    n_islands: int,
+    n_iter: int,
+    migration_interval: int = 10,
+    n_migrants: int = 1,
+    topology: Union[str, CSRTopology, Callable[[Sequence[Island]], CSRTopology]] = 'ring',
+    n_workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    verbosity: int = 0
+) -> IslandModel:
+    if n_iter < 1:
+        raise ValueError('n_iter must be at least 1')
+    if migration_interval < 1:
+        raise ValueError('migration interval must be at least 1')
+    if n_migrants < 1:
+        raise ValueError('number of migrants must be at least 1')
+    
+    if verbosity > 0:
+        print("Beginning optimization")
+    
+    model = IslandModel(make_island, n_islands, topology, n_workers, seed)
+    with model:
+        while model.crnt_iter < n_iter:
+            model.step(min(migration_interval, n_iter - model.crnt_iter), n_migrants)
+            if verbosity > 1:
+                print(f'  Iteration {model.crnt_iter}')
+                print(f'    Current best fitness: {model.best_fitness}')
+            if verbosity > 2:
+                for island in model:
+                    print(f'    {island}')
+    
+    if verbosity > 0:
+        print(f'Optimization Complete\n  Final best fitness: {model.best_fitness}')
+    
+    return model
@@ -0,0 +1,157 @@
+from typing import Callable, Optional, Tuple, Union
+
+from numpy import array, asarray, clip, einsum, float64, ndarray, ones, roll, sqrt, where, zeros
+
+from .fitness import FitnessBase
+from .instance import ParticleInstance, PositionParticle
+
+
+class GradientBase(object):
+    batched = False
+    n_evaluations = 0
+
+    def __init__(self, fn: Callable) -> None:
+        self.fn = fn
+
+    def evaluate_positions(self, xs: ndarray) -> ndarray:
+        raise NotImplementedError
+
+
+class ParticleGradient(GradientBase):
+    def evaluate_positions(self, xs: ndarray) -> ndarray:
+        self.n_evaluations += len(xs)
+        return array([self.fn(PositionParticle(x)) for x in xs], dtype=float64).reshape(xs.shape)
+
+
+class BatchGradient(GradientBase):
+    batched = True
+
+    def evaluate_positions(self, xs: ndarray) -> ndarray:
+        self.n_evaluations += len(xs)
+        out = asarray(self.fn(xs), dtype=float64)
+        if out.shape != xs.shape:
+            raise ValueError(f'batch gradient must return shape {xs.shape} (found {out.shape})')
+        return out
+
+
+def batch_gradient(fn: Callable[[ndarray], ndarray]) -> BatchGradient:
+    return BatchGradient(fn)
+
+
+def as_gradient(fn: Union[GradientBase, Callable[[ParticleInstance], ndarray]]) -> GradientBase:
+    if isinstance(fn, GradientBase):
+        return fn
+    return ParticleGradient(fn)
+
+
+def project(xs: ndarray, bound_lower: Optional[ndarray], bound_upper: Optional[ndarray]) -> ndarray:
+    if bound_lower is None and bound_upper is None:
+        return xs
+    return clip(xs, bound_lower, bound_upper)
+
+
+# all routines below maximize, matching the fitness convention, and refine every candidate row at once
+
+def gradient_ascent(
+    xs: ndarray,
+    gradient_fn: GradientBase,
+    lr: float,
+    n_steps: int,
+    bound_lower: Optional[ndarray] = None,
+    bound_upper: Optional[ndarray] = None
+) -> ndarray:
+    for _ in range(n_steps):
+        xs = project(xs + lr * gradient_fn.evaluate_positions(xs), bound_lower, bound_upper)
+    return xs
+
+
+def adam_ascent(
+    xs: ndarray,
+    gradient_fn: GradientBase,
+    lr: float,
+    n_steps: int,
+    bound_lower: Optional[ndarray] = None,
+    bound_upper: Optional[ndarray] = None,
+    betas: Tuple[float, float] = (0.9, 0.999),
+    eps: float = 1e-8
+) -> ndarray:
+    beta1, beta2 = betas
+    m, v = zeros(xs.shape), zeros(xs.shape)
+    for step in range(1, n_steps + 1):
+        grad = gradient_fn.evaluate_positions(xs)
+        m = beta1 * m + (1. - beta1) * grad
+        v = beta2 * v + (1. - beta2) * grad * grad
+        m_hat, v_hat = m / (1. - beta1 ** step), v / (1. - beta2 ** step)
+        xs = project(xs + lr * m_hat / (sqrt(v_hat) + eps), bound_lower, bound_upper)
+    return xs
+
+
+def _lbfgs_direction(grad: ndarray, s_hist: ndarray, y_hist: ndarray, rho: ndarray, lr: float) -> ndarray:
+    # two-loop recursion on the negated objective; empty history slots have rho == 0 and drop out
+    q = grad.copy()
+    alphas = zeros(rho.shape)
+    for j in reversed(range(rho.shape[1])):
+        alphas[:, j] = rho[:, j] * einsum('ij,ij->i', s_hist[:, j], q)
+        q -= alphas[:, j, None] * y_hist[:, j]
+    s_new, y_new = s_hist[:, -1], y_hist[:, -1]
+    yy = einsum('ij,ij->i', y_new, y_new)
+    gamma = where(rho[:, -1] > 0., einsum('ij,ij->i', s_new, y_new) / where(yy > 0., yy, 1.), lr)
+    r = gamma[:, None] * q
+    for j in range(rho.shape[1]):
+        beta = rho[:, j] * einsum('ij,ij->i', y_hist[:, j], r)
+        r += s_hist[:, j] * (alphas[:, j] - beta)[:, None]
+    return -r
+
+
+def lbfgs_ascent(
+    xs: ndarray,
+    fitnesses: ndarray,
+    fitness_fn: FitnessBase,
+    gradient_fn: GradientBase,
+    lr: float,
+    n_steps: int,
+    bound_lower: Optional[ndarray] = None,
+    bound_upper: Optional[ndarray] = None,
+    history_size: int = 5,
+    max_line_search: int = 10,
+    armijo: float = 1e-4
+) -> Tuple[ndarray, ndarray]:
+    n, dim = xs.shape
+    s_hist, y_hist = zeros((n, history_size, dim)), zeros((n, history_size, dim))
+    rho = zeros((n, history_size))
+    # minimize the negated fitness so the textbook recursion applies unchanged
+    values, grad = -fitnesses, -gradient_fn.evaluate_positions(xs)
+    for _ in range(n_steps):
+        direction = _lbfgs_direction(grad, s_hist, y_hist, rho, lr)
+        # fall back to steepest descent where the curvature model stopped giving a descent direction
+        uphill = einsum('ij,ij->i', grad, direction) >= 0.
+        direction[uphill] = -lr * grad[uphill]
+
+        step, accepted = ones((n,)), zeros((n,), dtype=bool)
+        xs_new, values_new = xs.copy(), values.copy()
+        for _ in range(max_line_search):
+            rows = (~accepted).nonzero()[0]
+            if len(rows) == 0:
+                break
+            trial = project(xs[rows] + step[rows, None] * direction[rows], bound_lower, bound_upper)
+            trial_values = -fitness_fn.evaluate_positions(trial)
+            ok = trial_values <= values[rows] + armijo * einsum('ij,ij->i', grad[rows], trial - xs[rows])
+            xs_new[rows[ok]], values_new[rows[ok]] = trial[ok], trial_values[ok]
+            accepted[rows[ok]] = True
+            step[rows[~ok]] *= 0.5
+        if not accepted.any():
+            break
+
+        rows = accepted.nonzero()[0]
+        grad_new = grad.copy()
+        grad_new[rows] = -gradient_fn.evaluate_positions(xs_new[rows])
+        s, y = xs_new - xs, grad_new - grad
+        sy = einsum('ij,ij->i', s, y)
+        # skip pairs without positive curvature so the inverse Hessian estimate stays positive definite
+        keep = accepted & (sy > 1e-12)
+        s_hist[keep] = roll(s_hist[keep], -1, axis=1)
+        y_hist[keep] = roll(y_hist[keep], -1, axis=1)
+        rho[keep] = roll(rho[keep], -1, axis=1)
+        s_hist[keep, -1], y_hist[keep, -1], rho[keep, -1] = s[keep], y[keep], 1. / sy[keep]
+        xs, values, grad = xs_new, values_new, grad_new
+    return xs, -values
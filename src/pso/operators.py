@@ -1,28 +1,35 @@
-from typing import Callable, Optional, Sequence
+from typing import Callable, List, Optional, Sequence, Tuple, Union
 
-from numpy import ndarray, maximum, minimum
-from numpy.random import rand
+from numpy import arange, argmax, array, asarray, concatenate, clip, float64, floating, inf, integer, isnan, ndarray, maximum, minimum, where
 
+from .distance import MetricBase, as_metric, pairwise_distances, radius_pairs
+from .dtypes import as_dtype
+from .evaluators import SerialEvaluator, evaluate_swarm
+from .fitness import FitnessBase, as_fitness
 from .instance import ParticleInstance
+from .local_search import GradientBase, adam_ascent, as_gradient, gradient_ascent, lbfgs_ascent
 from .population import ParticleSwarmBase
+from .topology import CSRTopology
 from ..core.operators import PopulationOperatorBase
 
 
+_FUSED_BLOCK_ELEMENTS = 2 ** 15
+
+
 class EvalFitness(PopulationOperatorBase):
-    def __init__(self, fitness_fn: Callable[[ParticleInstance], float]):
+    def __init__(
+        self, 
+        fitness_fn: Union[FitnessBase, Callable[[ParticleInstance], float]],
+        evaluator: Optional[SerialEvaluator] = None,
+        track_dirty: bool = False
+    ):
         super(EvalFitness, self).__init__()
-        self.fitness_fn = fitness_fn
+        self.fitness_fn = as_fitness(fitness_fn)
+        self.evaluator = SerialEvaluator() if evaluator is None else evaluator
+        self.track_dirty = track_dirty
         
     def op(self, swarm: ParticleSwarmBase) -> None:
-        for particle in swarm:
-            fitness = self.fitness_fn(particle)
-            if swarm.best_fitness is None or fitness > swarm.best_fitness:
-                swarm.best_fitness = fitness
-                swarm.best_pos = particle.solution
-            if particle.meta.best_fitness is None or fitness > particle.meta.best_fitness:
-                particle.meta.best_fitness = fitness
-                particle.meta.best_pos = particle.solution
-            particle.meta.fitness = fitness
+        swarm.record_fitness(evaluate_swarm(self.evaluator, self.fitness_fn, swarm, self.track_dirty))
                 
                 
 class VelocityUpdate(PopulationOperatorBase):
@@ -31,50 +38,87 @@ class VelocityUpdate(PopulationOperatorBase):
         self.bound_upper = bound_upper
         self.threshold = threshold        
     
+ 
     def op(self, swarm: ParticleSwarmBase) -> None:
+        neighbors_best_ix = self._neighbors_best_ix(swarm)
+        coefficients = swarm.random_coefficients()
         for ix, particle in enumerate(swarm):
-            if swarm.topology is not None:
-                p_best = self._neighbors_p_best(ix, swarm)
-            else:
-                p_best = swarm.best_pos
-            particle.meta.vel += self._velocity_increment(
-                particle.solution,
-                particle.meta.best_pos,
-                p_best,
-                particle.meta.c1,
-                particle.meta.c2
-            )
-            
-            particle.meta.vel = maximum(particle.meta.vel, self.bound_lower)
-            particle.meta.vel = minimum(particle.meta.vel, self.bound_upper)
+            self._update_particle(ix, particle, swarm, neighbors_best_ix, coefficients[:, ix])
+
+    def fuse(self, other: PopulationOperatorBase) -> Optional[PopulationOperatorBase]:
+        if type(self) is VelocityUpdate and type(other) is PositionUpdate:
+            return FusedVelocityPositionUpdate(self, other)
+        return None
+
+    @staticmethod
+    def _neighbors_best_ix(swarm: ParticleSwarmBase) -> Optional[ndarray]:
+        if isinstance(swarm.topology, CSRTopology):
+            return swarm.topology.neighbors_best(swarm.best_fitnesses)
+        return None
+
+    def _update_particle(
+        self, 
+        ix: int, 
+        particle: ParticleInstance, 
+        swarm: ParticleSwarmBase, 
+        neighbors_best_ix: Optional[ndarray],
+        coefficients: ndarray
+    ) -> None:
+        if neighbors_best_ix is not None:
+            p_best = swarm[neighbors_best_ix[ix]].meta.best_pos
+        elif swarm.topology is not None:
+            p_best = self._neighbors_p_best(ix, swarm)
+        else:
+            p_best = swarm.best_pos
+        increment = self._velocity_increment(
+            particle.solution,
+            particle.meta.best_pos,
+            p_best,
+            float(particle.meta.c1),
+            float(particle.meta.c2),
+            coefficients
+        )
+        if particle.meta.w is None:
+            particle.meta.vel += increment
+        else:
+            particle.meta.vel = float(particle.meta.w) * particle.meta.vel + increment
+        
+        dtype = particle.meta.vel.dtype
+        particle.meta.vel = maximum(particle.meta.vel, as_dtype(self.bound_lower, dtype))
+        particle.meta.vel = minimum(particle.meta.vel, as_dtype(self.bound_upper, dtype))
             
     @staticmethod
-    def _velocity_increment(pos: ndarray, p_best_self: ndarray, p_best: ndarray, c1: float, c2: float) -> ndarray:
-        return c1 * rand(*pos.shape) * (p_best_self - pos) + c2 * rand(*pos.shape) * (p_best - pos)
+    def _velocity_increment(
+        pos: ndarray, 
+        p_best_self: ndarray, 
+        p_best: ndarray, 
+        c1: float, 
+        c2: float, 
+        coefficients: ndarray
+    ) -> ndarray:
+        return c1 * coefficients[0] * (p_best_self - pos) + c2 * coefficients[1] * (p_best - pos)
         
     def _neighbors_p_best(self, particle_ix: int, swarm: ParticleSwarmBase) -> ndarray:
         neighbors = swarm.topology[particle_ix]
         if len(neighbors) == 0:
-            out = swarm.topology[particle_ix].meta.best_pos
-        elif sum(neighbors) == 0:
-            out = swarm.topology[particle_ix].meta.best_pos
+            out = swarm[particle_ix].meta.best_pos
+        elif isinstance(neighbors[0], float) and sum(neighbors) == 0:
+            out = swarm[particle_ix].meta.best_pos
         elif isinstance(neighbors[0], float):
             if self.threshold is None:
                 out = swarm.best_pos
             else:
+                p_best = swarm[particle_ix].meta.best_pos
                 fitness_best = None
                 for ix, dist in enumerate(neighbors):
-                    if ix == 0:
-                        p_best = swarm[ix].meta.best_pos
-                        fitness_best = swarm[ix].meta.best_fitness
-                    elif dist < self.threshold:
-                        if swarm[ix].meta.best_fitness > fitness_best:
+                    if dist < self.threshold:
+                        if fitness_best is None or swarm[ix].meta.best_fitness > fitness_best:
                             p_best = swarm[ix].meta.best_pos
                             fitness_best = swarm[ix].meta.best_fitness
                     else:
                         pass
                 out = p_best
-        elif isinstance(neighbors[0], int):
+        elif isinstance(neighbors[0], (int, integer)):
             fitness_best = swarm[neighbors[0]].meta.best_fitness
             p_best = swarm[neighbors[0]].meta.best_pos
             for ix in neighbors[1:]:
@@ -97,52 +141,314 @@ class PositionUpdate(PopulationOperatorBase):
         
     def op(self, swarm: ParticleSwarmBase) -> None:
         for particle in swarm:
-            particle.solution += particle.meta.vel
-            particle.solution = maximum(particle.solution, self.bound_lower)
-            particle.solution = minimum(particle.solution, self.bound_upper)
+            self._update_particle(particle)
+        swarm.mark_moved()
+
+    def _update_particle(self, particle: ParticleInstance) -> None:
+        dtype = particle.solution.dtype
+        particle.solution += particle.meta.vel
+        particle.solution = maximum(particle.solution, as_dtype(self.bound_lower, dtype))
+        particle.solution = minimum(particle.solution, as_dtype(self.bound_upper, dtype))
+
+
+class FusedVelocityPositionUpdate(PopulationOperatorBase):
+    def __init__(self, velocity_upd: VelocityUpdate, pos_upd: PositionUpdate):
+        super(FusedVelocityPositionUpdate, self).__init__()
+        self.velocity_upd = velocity_upd
+        self.pos_upd = pos_upd
+
+    def stages(self) -> List[PopulationOperatorBase]:
+        return [self.velocity_upd, self.pos_upd]
+
+    def op(self, swarm: ParticleSwarmBase) -> None:
+        neighbors_best_ix = self.velocity_upd._neighbors_best_ix(swarm)
+        coefficients = swarm.random_coefficients()
+        for ix, particle in enumerate(swarm):
+            self.velocity_upd._update_particle(ix, particle, swarm, neighbors_best_ix, coefficients[:, ix])
+            self.pos_upd._update_particle(particle)
+        swarm.mark_moved()
+                
+                
+class VelocityUpdateVectorized(VelocityUpdate):
+    def op(self, swarm: ParticleSwarmBase) -> None:
+        self._update(swarm, block_size=swarm.block_size)
+
+    def fuse(self, other: PopulationOperatorBase) -> Optional[PopulationOperatorBase]:
+        if type(other) is PositionUpdateVectorized:
+            return FusedVelocityPositionUpdateVectorized(self, other)
+        return None
+
+    def _update(
+        self, 
+        swarm: ParticleSwarmBase, 
+        pos_upd: Optional["PositionUpdateVectorized"] = None, 
+        block_size: Optional[int] = None
+    ) -> None:
+        state = swarm.state
+        n_particles, pos_len = state.pos.shape
+        
+        # indices into best_pos, with -1 standing for the swarm best; gathered per block so that
+        # memory-mapped swarms never materialize a full (n_particles, pos_len) neighbor-best matrix
+        p_best_ix = None if swarm.topology is None else self._neighbors_p_best_ix_all(swarm)
+        w = None if isnan(state.w).all() else where(isnan(state.w), 1., state.w)
+        vel_lower, vel_upper = as_dtype(self.bound_lower, state.vel.dtype), as_dtype(self.bound_upper, state.vel.dtype)
+        if pos_upd is not None:
+            pos_lower, pos_upper = as_dtype(pos_upd.bound_lower, state.pos.dtype), as_dtype(pos_upd.bound_upper, state.pos.dtype)
+        if block_size is None:
+            block_size = max(n_particles, 1)
+        
+        for start in range(0, n_particles, block_size):
+            rows = slice(start, min(start + block_size, n_particles))
+            pos, vel = state.pos[rows], state.vel[rows]
+            
+            if p_best_ix is None:
+                p_best = swarm.best_pos[None, :]
+            else:
+                block_ix = p_best_ix[rows]
+                p_best = state.best_pos[maximum(block_ix, 0)]
+                p_best[block_ix < 0] = swarm.best_pos
+            
+            draws = swarm.rng.random((pos.shape[0], 2, pos.shape[1])).astype(pos.dtype, copy=False)
+            cognitive, social = draws[:, 0], draws[:, 1]
+            cognitive *= state.c1[rows, None]
+            cognitive *= state.best_pos[rows] - pos
+            social *= state.c2[rows, None]
+            social *= p_best - pos
+            
+            if w is not None:
+                vel *= w[rows, None]
+            vel += cognitive
+            vel += social
+            clip(vel, vel_lower, vel_upper, out=vel)
+            
+            if pos_upd is not None:
+                pos += vel
+                clip(pos, pos_lower, pos_upper, out=pos)
+                swarm.mark_moved(rows)
+        
+    def _neighbors_p_best_ix_all(self, swarm: ParticleSwarmBase) -> ndarray:
+        state = swarm.state
+        neighbors = swarm.topology
+        if not isinstance(neighbors, CSRTopology):
+            if len(neighbors) > 0 and len(neighbors[0]) > 0 and isinstance(neighbors[0][0], (float, floating)):
+                return self._neighbors_p_best_ix_dist(swarm)
+            neighbors = CSRTopology.from_lists(neighbors)
+        
+        return neighbors.neighbors_best(state.best_fitness)
+    
+    def _neighbors_p_best_ix_dist(self, swarm: ParticleSwarmBase) -> ndarray:
+        state = swarm.state
+        dists = asarray(swarm.topology, dtype=float)
+        isolated = dists.sum(axis=1) == 0
+        if self.threshold is None:
+            return where(isolated, arange(len(state)), -1)
+        candidates = where(dists < self.threshold, state.best_fitness[None, :], -inf)
+        best_ix = argmax(candidates, axis=1)
+        isolated |= candidates.max(axis=1) == -inf
+        best_ix[isolated] = arange(len(state))[isolated]
+        
+        return best_ix
+      
+        
+class PositionUpdateVectorized(PositionUpdate):
+    def op(self, swarm: ParticleSwarmBase) -> None:
+        state = swarm.state
+        lower, upper = as_dtype(self.bound_lower, state.pos.dtype), as_dtype(self.bound_upper, state.pos.dtype)
+        block_size = swarm.block_size or max(len(state), 1)
+        for start in range(0, len(state), block_size):
+            pos = state.pos[start:start + block_size]
+            pos += state.vel[start:start + block_size]
+            clip(pos, lower, upper, out=pos)
+        swarm.mark_moved()
+
+
+class FusedVelocityPositionUpdateVectorized(PopulationOperatorBase):
+    def __init__(
+        self, 
+        velocity_upd: VelocityUpdateVectorized, 
+        pos_upd: PositionUpdateVectorized, 
+        block_size: Optional[int] = None
+    ):
+        super(FusedVelocityPositionUpdateVectorized, self).__init__()
+        self.velocity_upd = velocity_upd
+        self.pos_upd = pos_upd
+        self.block_size = block_size
+
+    def stages(self) -> List[PopulationOperatorBase]:
+        return [self.velocity_upd, self.pos_upd]
+
+    def op(self, swarm: ParticleSwarmBase) -> None:
+        block_size = self.block_size
+        if block_size is None:
+            block_size = max(1, _FUSED_BLOCK_ELEMENTS // max(swarm.state.pos_len, 1))
+        if swarm.block_size is not None:
+            block_size = min(block_size, swarm.block_size)
+        self.velocity_upd._update(swarm, self.pos_upd, block_size)
                 
                 
 class UpdateTopologyDist(PopulationOperatorBase):
-    def __init__(self, dist_fn: Callable[[ParticleInstance, ParticleInstance], float]):
+    def __init__(
+        self, 
+        dist_fn: Union[str, MetricBase, Callable[[ParticleInstance, ParticleInstance], float]],
+        block_size: Optional[int] = None,
+        threshold: Optional[float] = None,
+        neighbor_search: Optional[str] = None
+    ):
         super(UpdateTopologyDist, self).__init__()
-        self.dist_fn = dist_fn
+        if neighbor_search is None:
+            # a threshold only needs the pairs within it, so the full distance matrix is kept for unthresholded use
+            neighbor_search = 'dense' if threshold is None else 'auto'
+        if neighbor_search not in ['dense', 'auto', 'tree', 'brute']:
+            raise ValueError(f'unrecognized neighbor search "{neighbor_search}"')
+        if neighbor_search != 'dense' and threshold is None:
+            raise ValueError('radius neighbor search requires threshold to be specified')
+        self.dist_fn = as_metric(dist_fn)
+        self.block_size = block_size
+        self.threshold = threshold
+        self.neighbor_search = neighbor_search
         
     def op(self, swarm: ParticleSwarmBase):
-        for ix in enumerate(range(len(swarm))):
-            swarm.topology[ix, ix] = self.dist_fn(swarm[ix], swarm[ix])
-            for ix_other in range(ix):
-                swarm.topology[ix, ix_other] = self.dist_fn(swarm[ix], swarm[ix_other])
-                swarm.topology[ix_other, ix] = swarm.topology[ix, ix_other]
+        if self.neighbor_search == 'dense':
+            swarm.topology = pairwise_distances(swarm.positions, self.dist_fn, self.block_size or swarm.block_size)
+        else:
+            rows, cols = radius_pairs(
+                swarm.positions, 
+                self.threshold, 
+                self.dist_fn, 
+                self.neighbor_search, 
+                self.block_size or swarm.block_size
+            )
+            self_ix = arange(len(swarm))
+            swarm.topology = CSRTopology.from_pairs(
+                len(swarm), 
+                concatenate([rows, cols, self_ix]), 
+                concatenate([cols, rows, self_ix])
+            )
                 
                 
 class UpdateTopologyPredicate(PopulationOperatorBase):
-    def __init__(self, predicate_fn: Callable[[ParticleInstance, ParticleInstance], bool]):
+    def __init__(
+        self, 
+        predicate_fn: Callable[[ParticleInstance, ParticleInstance], bool],
+        dist_fn: Optional[Union[str, MetricBase, Callable[[ParticleInstance, ParticleInstance], float]]] = None,
+        threshold: Optional[float] = None,
+        neighbor_search: str = 'auto',
+        block_size: Optional[int] = None
+    ):
         super(UpdateTopologyPredicate, self).__init__()
+        if dist_fn is not None and threshold is None:
+            raise ValueError('dist_fn requires threshold to be specified')
         self.predicate_fn = predicate_fn
+        self.dist_fn = None if dist_fn is None else as_metric(dist_fn)
+        self.threshold = threshold
+        self.neighbor_search = neighbor_search
+        self.block_size = block_size
         
     def op(self, swarm: ParticleSwarmBase):
-        for ix in enumerate(range(len(swarm))):
-            swarm.topology[ix] = []
-            if self.predicate_fn(swarm[ix], swarm[ix]):
-                swarm.topology[ix].append(ix)
-            for ix_other in range(ix):
-                if self.predicate_fn(swarm[ix], swarm[ix_other]):
-                    swarm.topology[ix].append(ix_other)
-                    swarm.topology[ix_other].append(ix)
+        if self.dist_fn is None:
+            topology = [[] for _ in range(len(swarm))]
+            for ix in range(len(swarm)):
+                if self.predicate_fn(swarm[ix], swarm[ix]):
+                    topology[ix].append(ix)
+                for ix_other in range(ix):
+                    if self.predicate_fn(swarm[ix], swarm[ix_other]):
+                        topology[ix].append(ix_other)
+                        topology[ix_other].append(ix)
+            swarm.topology = topology
+        else:
+            rows, cols = radius_pairs(
+                swarm.positions, 
+                self.threshold, 
+                self.dist_fn, 
+                self.neighbor_search, 
+                self.block_size or swarm.block_size
+            )
+            keep = [self.predicate_fn(swarm[ix], swarm[ix_other]) for ix, ix_other in zip(rows, cols)]
+            rows, cols = rows[keep], cols[keep]
+            self_ix = array([ix for ix in range(len(swarm)) if self.predicate_fn(swarm[ix], swarm[ix])], dtype=int)
+            swarm.topology = CSRTopology.from_pairs(
+                len(swarm), 
+                concatenate([rows, cols, self_ix]), 
+                concatenate([cols, rows, self_ix])
+            )
 
 
 class LocalSearch(PopulationOperatorBase):
+    methods = ('gradient', 'adam', 'lbfgs')
+
     def __init__(
         self, 
         lr: float = 1e-3,
-        choose_candidates = Callable[[ParticleSwarmBase], Sequence[int]],
-        gradient_fn = Callable[[ParticleInstance], ndarray]
+        choose_candidates: Optional[Callable[[ParticleSwarmBase], Sequence[int]]] = None,
+        gradient_fn: Optional[Union[GradientBase, Callable[[ParticleInstance], ndarray]]] = None,
+        method: str = 'gradient',
+        n_steps: int = 1,
+        fitness_fn: Optional[Union[FitnessBase, Callable[[ParticleInstance], float]]] = None,
+        bound_lower: Optional[ndarray] = None,
+        bound_upper: Optional[ndarray] = None,
+        history_size: int = 5,
+        max_line_search: int = 10,
+        betas: Tuple[float, float] = (0.9, 0.999)
     ):
+        if choose_candidates is None or gradient_fn is None:
+            raise ValueError('local search requires choose_candidates and gradient_fn')
+        if method not in self.methods:
+            raise ValueError(f'unrecognized local search method "{method}"')
+        if n_steps < 1:
+            raise ValueError('number of local search steps must be at least 1')
+        if fitness_fn is None:
+            # refined positions must be scored, or fitnesses and bests would describe positions that moved away
+            raise ValueError('local search requires fitness_fn')
+        if history_size < 1:
+            raise ValueError('lbfgs history size must be at least 1')
         self.lr = lr
         self.choose_candidates = choose_candidates
-        self.gradient_fn = gradient_fn
+        self.gradient_fn = as_gradient(gradient_fn)
+        self.method = method
+        self.n_steps = n_steps
+        self.fitness_fn = as_fitness(fitness_fn)
+        self.bound_lower = bound_lower
+        self.bound_upper = bound_upper
+        self.history_size = history_size
+        self.max_line_search = max_line_search
+        self.betas = betas
 
     def op(self, swarm: ParticleSwarmBase) -> None:
-        for ix in self.choose_candidates(swarm):
+        ixs = array(self.choose_candidates(swarm), dtype=int)
+        if len(ixs) == 0:
+            return
+        # refine in float64 regardless of the swarm dtype; candidates are few
+        xs = swarm.positions[ixs].astype(float64)
+        if self.method == 'lbfgs':
+            xs, fitnesses = lbfgs_ascent(
+                xs,
+                self.fitness_fn.evaluate_positions(xs),
+                self.fitness_fn,
+                self.gradient_fn,
+                self.lr,
+                self.n_steps,
+                self.bound_lower,
+                self.bound_upper,
+                self.history_size,
+                self.max_line_search
+            )
+        else:
+            if self.method == 'adam':
+                xs = adam_ascent(xs, self.gradient_fn, self.lr, self.n_steps, self.bound_lower, self.bound_upper, self.betas)
+            else:
+                xs = gradient_ascent(xs, self.gradient_fn, self.lr, self.n_steps, self.bound_lower, self.bound_upper)
+            fitnesses = self.fitness_fn.evaluate_positions(xs)
+
+        xs = as_dtype(xs, swarm.dtype)
+        for row, ix in enumerate(ixs.tolist()):
             particle = swarm[ix]
-            particle.solution -= self.lr * self.gradient_fn(particle)
+            particle.solution = xs[row].copy()
+            swarm.mark_evaluated([ix])
+            fitness = float(fitnesses[row])
+            swarm.set_fitness(ix, fitness)
+            if particle.meta.best_fitness is None or fitness > particle.meta.best_fitness:
+                particle.meta.best_fitness = fitness
+                particle.meta.best_pos = xs[row].copy()
+            if swarm.best_fitness is None or fitness > swarm.best_fitness:
+                swarm.best_fitness = fitness
+                swarm.best_pos = xs[row].copy()
@@ -1,30 +1,48 @@
-from typing import Callable, Optional
+from itertools import count
+from time import perf_counter
+from typing import Callable, Iterator, Optional, Sequence, Tuple, Union
 
 from numpy import ndarray
 
+from .budget import BudgetExhausted, as_budget
+from .checkpoint import Checkpointer, load_checkpoint
+from .distance import MetricBase
+from .evaluators import SerialEvaluator
+from .fitness import FitnessBase, run_async
+from .history import History, IterationRecord, iteration_record
 from .population import ParticleSwarmBase
+from .stopping import StoppingCriterion, as_stopping_criterion
+from .topology import CSRTopology
 from .instance import ParticleInstance
-from .operators import EvalFitness, VelocityUpdate, PositionUpdate, UpdateTopologyDist, UpdateTopologyPredicate
+from ..core.operators import PopulationOperatorBase
+from .operators import (
+    EvalFitness, 
+    VelocityUpdate, 
+    VelocityUpdateVectorized, 
+    PositionUpdate, 
+    PositionUpdateVectorized, 
+    UpdateTopologyDist, 
+    UpdateTopologyPredicate
+)
 
-def pso_maximize(
+def build_pso_step(
     swarm: ParticleSwarmBase, 
-    fitness_fn: Callable[[ParticleInstance], float],
-    n_iter: int,
+    fitness_fn: Union[FitnessBase, Callable[[ParticleInstance], float]],
     bound_lower: ndarray,
     bound_upper: ndarray,
     vel_bound_lower: Optional[ndarray],
     vel_bound_upper: Optional[ndarray],
-    term_cond_fn: Optional[Callable[[ParticleSwarmBase], bool]] = None,
-    topology_dist_fn: Optional[Callable[[ParticleInstance, ParticleInstance], float]] = None,
+    topology_dist_fn: Optional[Union[str, MetricBase, Callable[[ParticleInstance, ParticleInstance], float]]] = None,
     topology_predicate_fn: Optional[Callable[[ParticleInstance, ParticleInstance], bool]] = None,
     threshold: Optional[float] = None,
-    verbosity: int = 0
-) -> None:
-    if verbosity > 0:
-        print("Beginning optimization")
-    
-    if n_iter < 1:
-        raise ValueError('n_iter must be at least 1')
+    topology: Optional[Union[CSRTopology, Callable[[Sequence[ParticleInstance]], CSRTopology]]] = None,
+    dist_block_size: Optional[int] = None,
+    neighbor_search: Optional[str] = None,
+    vectorized: bool = False,
+    evaluator: Optional[SerialEvaluator] = None,
+    track_dirty: bool = False,
+    prefilter_predicate: bool = False
+) -> Tuple[PopulationOperatorBase, EvalFitness]:
     if (bound_upper < bound_lower).any():
         raise ValueError('all lower bounds must be less than or equal to upper bounds')
     
@@ -36,38 +54,237 @@ def pso_maximize(
     if (vel_bound_upper < vel_bound_upper).any():
         raise ValueError('all velocity lower bounds must be less than or equal to upper bounds')
     
+    if topology is not None:
+        if topology_dist_fn is not None or topology_predicate_fn is not None:
+            raise ValueError('a static topology cannot be combined with topology_dist_fn or topology_predicate_fn')
+        if isinstance(topology, CSRTopology):
+            swarm.topology = topology
+        else:
+            swarm.topology = topology(swarm.solutions)
+    
+    if topology_dist_fn is not None and topology_predicate_fn is not None and not prefilter_predicate:
+        raise ValueError('at most one of topology_dist_fn and topology_predicate_fn and be specified')
+    if prefilter_predicate and (topology_dist_fn is None or topology_predicate_fn is None):
+        raise ValueError('prefilter_predicate requires both topology_dist_fn and topology_predicate_fn')
+    
     if topology_dist_fn is not None:
-        if topology_predicate_fn is not None:
-            raise ValueError('at most one of topology_dist_fn and topology_predicate_fn and be specified')
         if threshold is None:
             raise ValueError('topology_dist_fn requires threshold to be specified')
-        topology_upd = UpdateTopologyDist(topology_dist_fn)
+        if prefilter_predicate:
+            # the predicate is only evaluated on the pairs within threshold under topology_dist_fn
+            topology_upd = UpdateTopologyPredicate(
+                topology_predicate_fn, 
+                topology_dist_fn, 
+                threshold, 
+                'auto' if neighbor_search in [None, 'dense'] else neighbor_search,
+                dist_block_size
+            )
+        else:
+            topology_upd = UpdateTopologyDist(topology_dist_fn, dist_block_size, threshold, neighbor_search)
     elif topology_predicate_fn is not None:
         topology_upd = UpdateTopologyPredicate(topology_predicate_fn)
     else:
         topology_upd = None
     
-    eval_fitness = EvalFitness(fitness_fn)
-    velocity_upd = VelocityUpdate(vel_bound_lower, vel_bound_upper, threshold)
-    pos_upd = PositionUpdate(bound_lower, bound_upper)
+    eval_fitness = EvalFitness(fitness_fn, evaluator, track_dirty)
+    if vectorized:
+        if not swarm.array_backed:
+            raise ValueError('vectorized updates require an array-backed swarm (storage="array")')
+        velocity_upd = VelocityUpdateVectorized(vel_bound_lower, vel_bound_upper, threshold)
+        pos_upd = PositionUpdateVectorized(bound_lower, bound_upper)
+    else:
+        velocity_upd = VelocityUpdate(vel_bound_lower, vel_bound_upper, threshold)
+        pos_upd = PositionUpdate(bound_lower, bound_upper)
     
     if topology_upd is None:
-        pso_step = eval_fitness + velocity_upd + pos_upd
+        pso_step = (eval_fitness + velocity_upd + pos_upd).compile()
     else:
-        pso_step = eval_fitness + velocity_upd + pos_upd + topology_upd
-        
-    for iter in range(n_iter):
-        if verbosity > 1:
-            print(f'  Iteration {iter + 1}')
-        pso_step(swarm)
-        if term_cond_fn is not None and term_cond_fn(swarm):
-            break
+        pso_step = (eval_fitness + velocity_upd + pos_upd + topology_upd).compile()
+    
+    return pso_step, eval_fitness
+
+
+def pso_iterate(
+    swarm: ParticleSwarmBase, 
+    fitness_fn: Union[FitnessBase, Callable[[ParticleInstance], float]],
+    n_iter: Optional[int],
+    bound_lower: ndarray,
+    bound_upper: ndarray,
+    vel_bound_lower: Optional[ndarray],
+    vel_bound_upper: Optional[ndarray],
+    term_cond_fn: Optional[Callable[[ParticleSwarmBase], bool]] = None,
+    topology_dist_fn: Optional[Union[str, MetricBase, Callable[[ParticleInstance, ParticleInstance], float]]] = None,
+    topology_predicate_fn: Optional[Callable[[ParticleInstance, ParticleInstance], bool]] = None,
+    threshold: Optional[float] = None,
+    *,
+    stopping: Optional[Union[StoppingCriterion, Sequence[StoppingCriterion]]] = None,
+    max_evaluations: Optional[int] = None,
+    deadline: Optional[float] = None,
+    topology: Optional[Union[CSRTopology, Callable[[Sequence[ParticleInstance]], CSRTopology]]] = None,
+    dist_block_size: Optional[int] = None,
+    neighbor_search: Optional[str] = None,
+    vectorized: bool = False,
+    evaluator: Optional[SerialEvaluator] = None,
+    track_dirty: bool = False,
+    prefilter_predicate: bool = False,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: int = 1,
+    resume_from: Optional[str] = None,
+    history: Optional[History] = None,
+    record_diversity: bool = True
+) -> Iterator[IterationRecord]:
+    budget = as_budget(max_evaluations, deadline)
+    if n_iter is None and budget is None:
+        raise ValueError('n_iter is required without max_evaluations or a deadline')
+    if n_iter is not None and n_iter < 1:
+        raise ValueError('n_iter must be at least 1')
+    
+    pso_step, eval_fitness = build_pso_step(
+        swarm,
+        fitness_fn,
+        bound_lower,
+        bound_upper,
+        vel_bound_lower,
+        vel_bound_upper,
+        topology_dist_fn,
+        topology_predicate_fn,
+        threshold,
+        topology,
+        dist_block_size,
+        neighbor_search,
+        vectorized,
+        evaluator,
+        track_dirty,
+        prefilter_predicate
+    )
+    history = History() if history is None else history
+    stopping = as_stopping_criterion(stopping, term_cond_fn)
+    # diversity costs a pass over all positions, so it is only computed when recorded or needed to stop
+    record_diversity = record_diversity or (stopping is not None and stopping.uses_diversity)
+    swarm.termination_reason = None
+    
+    start_iter = 0
+    if resume_from is not None:
+        checkpoint = load_checkpoint(resume_from)
+        checkpoint.restore(swarm)
+        start_iter = checkpoint.iteration
+        if budget is not None and checkpoint.extra.get('budget') is not None:
+            budget.set_state(checkpoint.extra['budget'])
+        if stopping is not None and checkpoint.extra.get('stopping') is not None:
+            stopping.set_state(checkpoint.extra['stopping'])
+    checkpointer = None if checkpoint_path is None else Checkpointer(checkpoint_path, checkpoint_interval)
+    
+    t_start = perf_counter()
+    evals_start = eval_fitness.fitness_fn.n_evaluations
+    eval_fitness.fitness_fn.set_budget(budget)
+    try:
+        for iter in count(start_iter) if n_iter is None else range(start_iter, n_iter):
+            pso_step(swarm)
+            record = iteration_record(
+                swarm, 
+                iter + 1, 
+                eval_fitness.fitness_fn.n_evaluations - evals_start, 
+                perf_counter() - t_start, 
+                diversity=record_diversity
+            )
+            terminate = stopping is not None and stopping(swarm, record)
+            if checkpointer is not None and not terminate:
+                checkpointer.maybe_save(
+                    swarm, 
+                    iter + 1, 
+                    {
+                        'budget': None if budget is None else budget.get_state(),
+                        'stopping': None if stopping is None else stopping.get_state()
+                    }
+                )
+            yield history.append(record)
+            if terminate:
+                swarm.termination_reason = stopping.reason
+                break
+        else:
+            swarm.termination_reason = 'maximum number of iterations reached'
+
+        eval_fitness(swarm)
+    except BudgetExhausted as e:
+        # the swarm keeps the best position and fitness from the last completed evaluation,
+        # including the prefix of a batch that still fit the budget
+        if e.fitnesses is not None:
+            swarm.record_fitness(e.fitnesses)
+        if swarm.termination_reason is None:
+            swarm.termination_reason = str(e)
+    finally:
+        eval_fitness.fitness_fn.set_budget(None)
+        if checkpointer is not None:
+            checkpointer.close()
+
+
+def pso_maximize(
+    swarm: ParticleSwarmBase, 
+    fitness_fn: Union[FitnessBase, Callable[[ParticleInstance], float]],
+    n_iter: Optional[int],
+    bound_lower: ndarray,
+    bound_upper: ndarray,
+    vel_bound_lower: Optional[ndarray],
+    vel_bound_upper: Optional[ndarray],
+    term_cond_fn: Optional[Callable[[ParticleSwarmBase], bool]] = None,
+    topology_dist_fn: Optional[Union[str, MetricBase, Callable[[ParticleInstance, ParticleInstance], float]]] = None,
+    topology_predicate_fn: Optional[Callable[[ParticleInstance, ParticleInstance], bool]] = None,
+    threshold: Optional[float] = None,
+    verbosity: int = 0,
+    *,
+    stopping: Optional[Union[StoppingCriterion, Sequence[StoppingCriterion]]] = None,
+    max_evaluations: Optional[int] = None,
+    deadline: Optional[float] = None,
+    topology: Optional[Union[CSRTopology, Callable[[Sequence[ParticleInstance]], CSRTopology]]] = None,
+    dist_block_size: Optional[int] = None,
+    neighbor_search: Optional[str] = None,
+    vectorized: bool = False,
+    evaluator: Optional[SerialEvaluator] = None,
+    track_dirty: bool = False,
+    prefilter_predicate: bool = False,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_interval: int = 1,
+    resume_from: Optional[str] = None
+) -> None:
+    if verbosity > 0:
+        print("Beginning optimization")
+    
+    for record in pso_iterate(
+        swarm=swarm,
+        fitness_fn=fitness_fn,
+        n_iter=n_iter,
+        bound_lower=bound_lower,
+        bound_upper=bound_upper,
+        vel_bound_lower=vel_bound_lower,
+        vel_bound_upper=vel_bound_upper,
+        term_cond_fn=term_cond_fn,
+        stopping=stopping,
+        max_evaluations=max_evaluations,
+        deadline=deadline,
+        topology_dist_fn=topology_dist_fn,
+        topology_predicate_fn=topology_predicate_fn,
+        threshold=threshold,
+        topology=topology,
+        dist_block_size=dist_block_size,
+        neighbor_search=neighbor_search,
+        vectorized=vectorized,
+        evaluator=evaluator,
+        track_dirty=track_dirty,
+        prefilter_predicate=prefilter_predicate,
+        checkpoint_path=checkpoint_path,
+        checkpoint_interval=checkpoint_interval,
+        resume_from=resume_from,
+        record_diversity=False
+    ):
         if verbosity > 1:
-            print(f'    Current best fitness: {swarm.best_fitness}')
+            print(f'  Iteration {record.iteration}')
+            print(f'    Current best fitness: {record.best_fitness}')
         if verbosity > 2:
             print(swarm)
 
-    eval_fitness(swarm)
-
     if verbosity > 0:
-        print(f'Optimization Complete\n  Final best fitness: {swarm.best_fitness}')
\ No newline at end of file
+        print(f'Optimization Complete -- {swarm.termination_reason}\n  Final best fitness: {swarm.best_fitness}')
+
+
+async def pso_maximize_async(*args, **kwargs) -> None:
+    await run_async(pso_maximize, *args, **kwargs)
@@ -1,12 +1,20 @@
-from typing import Callable, List, Optional, Sequence, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
-from numpy import ndarray
+from numpy import argmax, array, flatnonzero, float64, isnan, nan, ndarray, ones, vstack, zeros
+from numpy.random import SeedSequence
+from numpy.typing import DTypeLike
 
 from ..core.population import PopulationBase
+from .dtypes import as_dtype, float_dtype
+from .fitness_index import FitnessIndex
 from .instance import ParticleInstance
+from .rng import SwarmRandom, as_swarm_random
+from .state import MappedSwarmState, SwarmState
 
 
 class ParticleSwarmBase(PopulationBase):
+    state_fields = ('best_pos', 'best_fitness', 'topology', 'moved')
+
     def __init__(
         self, 
         n_particles: int, 
@@ -15,7 +23,12 @@ class ParticleSwarmBase(PopulationBase):
         vel_initializer: Callable[[int], ndarray], 
         c_initializer: Union[Tuple[float, float], Callable[[], Tuple[float, float]]], 
         w_initializer: Optional[Union[float, Callable[[], float]]] = None,
-        topology: Optional[Callable[[Sequence[ParticleInstance]], Union[List[List[int]], List[List[float]]]]] = None
+        topology: Optional[Callable[[Sequence[ParticleInstance]], Union[List[List[int]], List[List[float]]]]] = None,
+        storage: str = 'list',
+        rng: Optional[Union[int, SeedSequence, SwarmRandom]] = None,
+        dtype: DTypeLike = float64,
+        mmap_dir: Optional[str] = None,
+        memory_budget: int = 2**28
     ) -> None:
         def _create_particle(
             pos_len: int, 
@@ -25,8 +38,8 @@ class ParticleSwarmBase(PopulationBase):
             w_initializer: Optional[Union[float, Callable[[], float]]] = None
         ) -> ParticleInstance:
             return ParticleInstance(
-                lambda: pos_initializer(pos_len),
-                lambda: vel_initializer(pos_len),
+                lambda: as_dtype(pos_initializer(pos_len), self.dtype),
+                lambda: as_dtype(vel_initializer(pos_len), self.dtype),
                 c_initializer,
                 w_initializer
             )
@@ -34,10 +47,178 @@ class ParticleSwarmBase(PopulationBase):
             return [
                 _create_particle(pos_len, pos_initializer, vel_initializer, c_initializer, w_initializer) for _ in range(n_particles)
             ]
+        def _initialize_array():
+            for ix in range(n_particles):
+                self.state.load(
+                    ix, 
+                    _create_particle(pos_len, pos_initializer, vel_initializer, c_initializer, w_initializer)
+                )
+            return [self.state.view(ix) for ix in range(n_particles)]
+        
+        self.dtype = float_dtype(dtype)
+        if storage == 'list':
+            self.state = None
+            initializer = _initialize
+        elif storage == 'array':
+            self.state = SwarmState(n_particles, pos_len, self.dtype)
+            initializer = _initialize_array
+        elif storage == 'memmap':
+            self.state = MappedSwarmState(n_particles, pos_len, self.dtype, mmap_dir, memory_budget)
+            initializer = _initialize_array
+        else:
+            raise ValueError(f'unrecognized storage "{storage}"')
+        self.storage = storage
+        self.rng = as_swarm_random(rng)
         
-        super(ParticleSwarmBase, self).__init__(_initialize, subpopulations=None, topology=topology)
+        super(ParticleSwarmBase, self).__init__(initializer, subpopulations=None, topology=topology)
         self.best_pos = None
         self.best_fitness = None
+        self.termination_reason = None
+        # rows whose positions changed since their fitnesses were computed; None until the first evaluation
+        self.moved = None
+        self.fitness_index = FitnessIndex(self.fitnesses)
 
     def __iter__(self):
-        return self.solutions.__iter__()
\ No newline at end of file
+        return self.solutions.__iter__()
+
+    @property
+    def block_size(self) -> Optional[int]:
+        if isinstance(self.state, MappedSwarmState):
+            return self.state.block_size
+        return None
+
+    @property
+    def pos_len(self) -> int:
+        if self.state is None:
+            return len(self[0].solution)
+        return self.state.pos_len
+
+    def random_coefficients(self) -> ndarray:
+        # drawn particle-major so any row block of the swarm consumes the same stream values
+        return self.rng.random((len(self), 2, self.pos_len)).astype(self.dtype, copy=False).swapaxes(0, 1)
+    
+    def __setitem__(self, key, val):
+        if self.state is None:
+            out = super(ParticleSwarmBase, self).__setitem__(key, val)
+        else:
+            out = self.state.load(key, val)
+        self.fitness_index.update(key, val.meta.fitness)
+        self.mark_moved(key)
+        return out
+
+    def set_fitness(self, ix: int, fitness: Optional[float]) -> None:
+        self[ix].meta.fitness = fitness
+        self.fitness_index.update(ix, fitness)
+
+    @property
+    def array_backed(self) -> bool:
+        return self.state is not None
+
+    @property
+    def positions(self) -> ndarray:
+        if self.state is None:
+            return vstack([particle.solution for particle in self])
+        return self.state.pos
+
+    @property
+    def velocities(self) -> ndarray:
+        if self.state is None:
+            return vstack([particle.meta.vel for particle in self])
+        return self.state.vel
+
+    @property
+    def fitnesses(self) -> ndarray:
+        if self.state is None:
+            return array([nan if particle.meta.fitness is None else particle.meta.fitness for particle in self])
+        return self.state.fitness
+
+    @property
+    def best_fitnesses(self) -> ndarray:
+        if self.state is None:
+            return array([nan if particle.meta.best_fitness is None else particle.meta.best_fitness for particle in self])
+        return self.state.best_fitness
+
+    @property
+    def best_positions(self) -> ndarray:
+        if self.state is None:
+            return vstack([
+                particle.solution if particle.meta.best_pos is None else particle.meta.best_pos for particle in self
+            ])
+        return self.state.best_pos
+
+    @property
+    def dirty(self) -> ndarray:
+        if self.moved is None:
+            return ones((len(self),), dtype=bool)
+        return self.moved | isnan(self.fitnesses)
+
+    def close(self) -> None:
+        if isinstance(self.state, MappedSwarmState):
+            self.state.close()
+
+    def mark_moved(self, rows: Optional[Union[slice, ndarray, Sequence[int]]] = None) -> None:
+        if self.moved is not None:
+            self.moved[slice(None) if rows is None else rows] = True
+
+    def mark_evaluated(self, rows: Optional[Union[slice, ndarray, Sequence[int]]] = None) -> None:
+        if rows is None:
+            self.moved = zeros((len(self),), dtype=bool)
+        elif self.moved is not None:
+            self.moved[rows] = False
+
+    def get_state(self) -> Dict[str, Any]:
+        if self.state is None:
+            arrays = SwarmState(len(self), len(self[0].solution), self.dtype)
+            for ix, particle in enumerate(self):
+                arrays.load(ix, particle)
+        else:
+            arrays = self.state
+        state = {'particles': arrays.arrays(), 'rng': self.rng.get_state()}
+        for name in self.state_fields:
+            val = getattr(self, name)
+            state[name] = val.copy() if isinstance(val, ndarray) else val
+        return state
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        arrays = state['particles']
+        if arrays['pos'].shape[0] != len(self):
+            raise ValueError(f'state has {arrays["pos"].shape[0]} particles (expected {len(self)})')
+        if self.state is None:
+            loaded = SwarmState(*arrays['pos'].shape, self.dtype)
+            loaded.set_arrays(arrays)
+            for ix, particle in enumerate(self):
+                loaded.unload(ix, particle)
+        else:
+            self.state.set_arrays(arrays)
+        if 'rng' in state:
+            self.rng.set_state(state['rng'])
+        for name in self.state_fields:
+            setattr(self, name, state[name])
+        self.fitness_index.rebuild(self.fitnesses)
+
+    def record_fitness(self, fitnesses: ndarray) -> Optional[int]:
+        if self.state is None:
+            for particle, fitness in zip(self, fitnesses):
+                fitness = float(fitness)
+                if particle.meta.best_fitness is None or fitness > particle.meta.best_fitness:
+                    particle.meta.best_fitness = fitness
+                    particle.meta.best_pos = particle.solution.copy()
+                particle.meta.fitness = fitness
+        else:
+            state = self.state
+            state.fitness[:] = fitnesses
+            improved = isnan(state.best_fitness) | (fitnesses > state.best_fitness)
+            state.best_fitness[improved] = fitnesses[improved]
+            rows = flatnonzero(improved)
+            block_size = len(rows) if self.block_size is None else self.block_size
+            for start in range(0, len(rows), max(block_size, 1)):
+                block = rows[start:start + block_size]
+                state.best_pos[block] = state.pos[block]
+
+        self.fitness_index.rebuild(fitnesses)
+        best_ix = int(argmax(fitnesses))
+        if self.best_fitness is None or fitnesses[best_ix] > self.best_fitness:
+            self.best_fitness = float(fitnesses[best_ix])
+            self.best_pos = self[best_ix].solution.copy()
+            return best_ix
+        return None
@@ -0,0 +1,132 @@
+from json import dumps, loads
+from threading import Thread
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from numpy import concatenate, empty, ndarray, prod, uint32
+from numpy.random import PCG64, Generator, SeedSequence, randint
+
+
+Size = Optional[Union[int, Tuple[int, ...]]]
+
+
+class SwarmRandom(object):
+    def __init__(
+        self,
+        seed: Optional[Union[int, Sequence[int], SeedSequence]] = None,
+        buffer_size: int = 0,
+        background: bool = False
+    ) -> None:
+        if buffer_size < 0:
+            raise ValueError('buffer size must be non-negative')
+        if background and buffer_size == 0:
+            raise ValueError('background refill requires a buffer')
+        self.seed_seq = seed if isinstance(seed, SeedSequence) else SeedSequence(seed)
+        bit_generator = PCG64(self.seed_seq)
+        # uniforms come from their own jumped stream so buffering never changes which values are drawn
+        self.generator = Generator(bit_generator)
+        self._uniform = Generator(bit_generator.jumped())
+        self.buffer_size = buffer_size
+        self.background = background
+        self._buffer = empty((0,))
+        self._pos = 0
+        self._next = None
+        self._thread = None
+
+    def random(self, size: Size = None) -> Union[float, ndarray]:
+        if size is None:
+            return float(self._take(1)[0])
+        return self._take(int(prod(size))).reshape(size)
+
+    def uniform(self, low: Union[float, ndarray] = 0., high: Union[float, ndarray] = 1., size: Size = None) -> Union[float, ndarray]:
+        return low + (high - low) * self.random(size)
+
+    def normal(self, loc: Union[float, ndarray] = 0., scale: Union[float, ndarray] = 1., size: Size = None) -> Union[float, ndarray]:
+        return self.generator.normal(loc, scale, size)
+
+    def integers(self, low: int, high: Optional[int] = None, size: Size = None) -> Union[int, ndarray]:
+        return self.generator.integers(low, high, size)
+
+    def binomial(self, n: int, p: float, size: Size = None) -> Union[int, ndarray]:
+        return self.generator.binomial(n, p, size)
+
+    def choice(self, a: Union[int, ndarray], size: Size = None, replace: bool = True, p: Optional[ndarray] = None) -> Union[Any, ndarray]:
+        return self.generator.choice(a, size=size, replace=replace, p=p)
+
+    def spawn(self, n: int) -> List["SwarmRandom"]:
+        return [SwarmRandom(child, self.buffer_size, self.background) for child in self.seed_seq.spawn(n)]
+
+    def _take(self, n: int) -> ndarray:
+        if self.buffer_size == 0:
+            return self._uniform.random(n)
+        parts = []
+        while n > 0:
+            if self._pos == len(self._buffer):
+                if self._thread is None and n >= self.buffer_size:
+                    parts.append(self._uniform.random(n))
+                    break
+                self._refill()
+            take = min(n, len(self._buffer) - self._pos)
+            parts.append(self._buffer[self._pos:self._pos + take])
+            self._pos += take
+            n -= take
+        return parts[0] if len(parts) == 1 else concatenate(parts)
+
+    def _refill(self) -> None:
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self._buffer, self._next = self._next, None
+        else:
+            self._buffer = self._uniform.random(self.buffer_size)
+        self._pos = 0
+        if self.background:
+            self._thread = Thread(target=self._prefetch, daemon=True)
+            self._thread.start()
+
+    def _prefetch(self) -> None:
+        self._next = self._uniform.random(self.buffer_size)
+
+    def _drain(self) -> ndarray:
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self._buffer, self._next = concatenate([self._buffer[self._pos:], self._next]), None
+            self._pos = 0
+        return self._buffer[self._pos:]
+
+    def get_state(self) -> Dict[str, Any]:
+        return {
+            'seed_seq': dumps({
+                'entropy': self.seed_seq.entropy,
+                'spawn_key': list(self.seed_seq.spawn_key),
+                'n_children_spawned': self.seed_seq.n_children_spawned
+            }),
+            'generator': dumps(self.generator.bit_generator.state),
+            'uniform': dumps(self._uniform.bit_generator.state),
+            'buffered': self._drain().copy()
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self._drain()
+        seed_seq = loads(state['seed_seq'])
+        self.seed_seq = SeedSequence(
+            seed_seq['entropy'],
+            spawn_key=tuple(seed_seq['spawn_key']),
+            n_children_spawned=seed_seq['n_children_spawned']
+        )
+        self.generator.bit_generator.state = loads(state['generator'])
+        self._uniform.bit_generator.state = loads(state['uniform'])
+        self._buffer = state['buffered'].copy()
+        self._pos = 0
+
+    def close(self) -> None:
+        self._drain()
+
+
+def as_swarm_random(rng: Optional[Union[int, Sequence[int], SeedSequence, SwarmRandom]] = None) -> SwarmRandom:
+    if isinstance(rng, SwarmRandom):
+        return rng
+    if rng is None:
+        # seed from the legacy global state so numpy.random.seed keeps runs reproducible
+        rng = randint(0, 2**32, size=4, dtype=uint32).tolist()
+    return SwarmRandom(rng)
@@ -0,0 +1,151 @@
+from os import close, remove
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp, mkstemp
+from typing import Dict, Optional
+from weakref import finalize
+
+from numpy import dtype as np_dtype, empty, float64, full, isnan, memmap, nan, ndarray
+from numpy.typing import DTypeLike
+
+from .instance import ParticleInstance, ParticleView
+
+
+class SwarmState(object):
+    fields = ('pos', 'vel', 'best_pos', 'fitness', 'best_fitness', 'c1', 'c2', 'w')
+
+    def __init__(self, n_particles: int, pos_len: int, dtype: DTypeLike = float64) -> None:
+        self.pos = empty((n_particles, pos_len), dtype=dtype)
+        self.vel = empty((n_particles, pos_len), dtype=dtype)
+        self.best_pos = empty((n_particles, pos_len), dtype=dtype)
+        self.fitness = full((n_particles,), nan)
+        self.best_fitness = full((n_particles,), nan)
+        self.c1 = empty((n_particles,))
+        self.c2 = empty((n_particles,))
+        self.w = full((n_particles,), nan)
+
+    def __len__(self):
+        return self.pos.shape[0]
+
+    @property
+    def pos_len(self) -> int:
+        return self.pos.shape[1]
+
+    def load(self, ix: int, particle: ParticleInstance) -> None:
+        self.pos[ix] = particle.solution
+        self.vel[ix] = particle.meta.vel
+        self.c1[ix] = particle.meta.c1
+        self.c2[ix] = particle.meta.c2
+        self.w[ix] = nan if particle.meta.w is None else particle.meta.w
+        self.fitness[ix] = nan if particle.meta.fitness is None else particle.meta.fitness
+        if particle.meta.best_pos is None or particle.meta.best_fitness is None:
+            self.best_fitness[ix] = nan
+        else:
+            self.best_fitness[ix] = particle.meta.best_fitness
+            self.best_pos[ix] = particle.meta.best_pos
+
+    def unload(self, ix: int, particle: ParticleInstance) -> None:
+        particle.solution = self.pos[ix].copy()
+        particle.meta.vel = self.vel[ix].copy()
+        particle.meta.c1 = float(self.c1[ix])
+        particle.meta.c2 = float(self.c2[ix])
+        particle.meta.w = None if isnan(self.w[ix]) else float(self.w[ix])
+        particle.meta.fitness = None if isnan(self.fitness[ix]) else float(self.fitness[ix])
+        if isnan(self.best_fitness[ix]):
+            particle.meta.best_fitness = None
+            particle.meta.best_pos = None
+        else:
+            particle.meta.best_fitness = float(self.best_fitness[ix])
+            particle.meta.best_pos = self.best_pos[ix].copy()
+
+    def arrays(self) -> Dict[str, ndarray]:
+        return {name: getattr(self, name).copy() for name in self.fields}
+
+    def set_arrays(self, arrays: Dict[str, ndarray]) -> None:
+        for name in self.fields:
+            getattr(self, name)[:] = arrays[name]
+
+    def view(self, ix: int) -> ParticleView:
+        return ParticleView(self, ix)
+
+
+def _discard(fpath: str) -> None:
+    try:
+        remove(fpath)
+    except OSError:
+        pass
+
+
+# pos, vel, best_pos plus the temporaries a streamed velocity update allocates per block
+_STREAMED_ROW_COPIES = 6
+
+
+class MappedSwarmState(SwarmState):
+    mapped_fields = ('pos', 'vel', 'best_pos')
+
+    def __init__(
+        self, 
+        n_particles: int, 
+        pos_len: int, 
+        dtype: DTypeLike = float64, 
+        directory: Optional[str] = None,
+        memory_budget: int = 2**28
+    ) -> None:
+        if memory_budget < 1:
+            raise ValueError('memory budget must be at least 1 byte')
+        super(MappedSwarmState, self).__init__(0, pos_len, dtype)
+        if directory is None:
+            directory = mkdtemp(prefix='swarm-')
+            self._cleanup = finalize(self, rmtree, directory, ignore_errors=True)
+        else:
+            self._cleanup = None
+        self.directory = directory
+        self.memory_budget = memory_budget
+        for name in self.mapped_fields:
+            setattr(self, name, memmap(join(directory, f'{name}.dat'), dtype=dtype, mode='w+', shape=(n_particles, pos_len)))
+        self.fitness = full((n_particles,), nan)
+        self.best_fitness = full((n_particles,), nan)
+        self.c1 = empty((n_particles,))
+        self.c2 = empty((n_particles,))
+        self.w = full((n_particles,), nan)
+
+    @property
+    def block_size(self) -> int:
+        row_bytes = self.pos_len * np_dtype(self.pos.dtype).itemsize
+        return max(1, self.memory_budget // max(_STREAMED_ROW_COPIES * row_bytes, 1))
+
+    def arrays(self) -> Dict[str, ndarray]:
+        arrays = {name: getattr(self, name).copy() for name in self.fields if name not in self.mapped_fields}
+        for name in self.mapped_fields:
+            arrays[name] = self._snapshot(name)
+        return arrays
+
+    def _snapshot(self, name: str) -> memmap:
+        # copied block by block into a scratch map next to the live one, so capturing never holds a field in RAM
+        src = getattr(self, name)
+        fd, fpath = mkstemp(prefix=f'{name}-snapshot-', suffix='.dat', dir=self.directory)
+        close(fd)
+        snapshot = memmap(fpath, dtype=src.dtype, mode='w+', shape=src.shape)
+        finalize(snapshot, _discard, fpath)
+        block_size = self.block_size
+        for start in range(0, len(src), block_size):
+            snapshot[start:start + block_size] = src[start:start + block_size]
+        return snapshot
+
+    def set_arrays(self, arrays: Dict[str, ndarray]) -> None:
+        block_size = self.block_size
+        for name in self.fields:
+            dest, src = getattr(self, name), arrays[name]
+            for start in range(0, len(dest), block_size):
+                dest[start:start + block_size] = src[start:start + block_size]
+
+    def flush(self) -> None:
+        for name in self.mapped_fields:
+            getattr(self, name).flush()
+
+    def close(self) -> None:
+        self.flush()
+        for name in self.mapped_fields:
+            setattr(self, name, None)
+        if self._cleanup is not None:
+            self._cleanup()
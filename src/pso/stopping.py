@@ -0,0 +1,286 @@
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Sequence, Union
+
+from numpy import float64, full, inf, isnan, maximum, minimum, sqrt
+
+from .history import IterationRecord
+
+
+class StoppingCriterion(object):
+    # criteria that never read record.diversity clear this so runs can skip computing it
+    uses_diversity = True
+
+    def __init__(self) -> None:
+        self.reason = None
+
+    def reset(self) -> None:
+        self.reason = None
+
+    # windowed criteria override these so a checkpointed run resumes with the same stopping decisions
+    def get_state(self) -> Dict[str, Any]:
+        return {}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        pass
+
+    def update(self, swarm, record: IterationRecord) -> bool:
+        raise NotImplementedError()
+
+    def __call__(self, swarm, record: IterationRecord) -> bool:
+        stop = self.update(swarm, record)
+        if not stop:
+            self.reason = None
+        return stop
+
+    def __or__(self, other: "StoppingCriterion") -> "AnyOf":
+        return AnyOf(self, other)
+
+    def __and__(self, other: "StoppingCriterion") -> "AllOf":
+        return AllOf(self, other)
+
+
+class AnyOf(StoppingCriterion):
+    def __init__(self, *criteria: StoppingCriterion) -> None:
+        super(AnyOf, self).__init__()
+        if len(criteria) == 0:
+            raise ValueError('at least one stopping criterion is required')
+        self.criteria = [
+            sub for criterion in criteria for sub in (criterion.criteria if type(criterion) is AnyOf else [criterion])
+        ]
+
+    @property
+    def uses_diversity(self) -> bool:
+        return any(criterion.uses_diversity for criterion in self.criteria)
+
+    def reset(self) -> None:
+        super(AnyOf, self).reset()
+        for criterion in self.criteria:
+            criterion.reset()
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'criteria': tuple(criterion.get_state() for criterion in self.criteria)}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        for criterion, criterion_state in zip(self.criteria, state['criteria']):
+            criterion.set_state(criterion_state)
+
+    def update(self, swarm, record: IterationRecord) -> bool:
+        # every criterion sees every iteration so windowed state stays current
+        stopped = [criterion for criterion in self.criteria if criterion(swarm, record)]
+        self.reason = '; '.join(criterion.reason for criterion in stopped) if stopped else None
+        return len(stopped) > 0
+
+
+class AllOf(StoppingCriterion):
+    def __init__(self, *criteria: StoppingCriterion) -> None:
+        super(AllOf, self).__init__()
+        if len(criteria) == 0:
+            raise ValueError('at least one stopping criterion is required')
+        self.criteria = [
+            sub for criterion in criteria for sub in (criterion.criteria if type(criterion) is AllOf else [criterion])
+        ]
+
+    @property
+    def uses_diversity(self) -> bool:
+        return any(criterion.uses_diversity for criterion in self.criteria)
+
+    def reset(self) -> None:
+        super(AllOf, self).reset()
+        for criterion in self.criteria:
+            criterion.reset()
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'criteria': tuple(criterion.get_state() for criterion in self.criteria)}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        for criterion, criterion_state in zip(self.criteria, state['criteria']):
+            criterion.set_state(criterion_state)
+
+    def update(self, swarm, record: IterationRecord) -> bool:
+        stopped = [criterion(swarm, record) for criterion in self.criteria]
+        if not all(stopped):
+            return False
+        self.reason = ' and '.join(criterion.reason for criterion in self.criteria)
+        return True
+
+
+class Condition(StoppingCriterion):
+    uses_diversity = False
+
+    def __init__(self, fn: Callable[..., bool], reason: str = 'termination condition met') -> None:
+        super(Condition, self).__init__()
+        self.fn = fn
+        self.message = reason
+
+    def update(self, swarm, record: IterationRecord) -> bool:
+        if not self.fn(swarm):
+            return False
+        self.reason = self.message
+        return True
+
+
+class TargetFitness(StoppingCriterion):
+    uses_diversity = False
+
+    def __init__(self, target: float) -> None:
+        super(TargetFitness, self).__init__()
+        self.target = target
+
+    def update(self, swarm, record: IterationRecord) -> bool:
+        if record.best_fitness is None or not record.best_fitness >= self.target:
+            return False
+        self.reason = f'target fitness {self.target} reached ({record.best_fitness})'
+        return True
+
+
+class Stagnation(StoppingCriterion):
+    uses_diversity = False
+
+    def __init__(self, window: int, tol: float = 0.) -> None:
+        super(Stagnation, self).__init__()
+        if window < 1:
+            raise ValueError('stagnation window must be at least 1')
+        if tol < 0.:
+            raise ValueError('stagnation tolerance must be non-negative')
+        self.window = window
+        self.tol = tol
+        self.reset()
+
+    def reset(self) -> None:
+        super(Stagnation, self).reset()
+        self._best = -inf
+        self._n_stagnant = 0
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'best': self._best, 'n_stagnant': self._n_stagnant}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self._best = float(state['best'])
+        self._n_stagnant = int(state['n_stagnant'])
+
+    def update(self, swarm, record: IterationRecord) -> bool:
+        if record.best_fitness is not None and record.best_fitness > self._best + self.tol:
+            self._best = record.best_fitness
+            self._n_stagnant = 0
+            return False
+        self._n_stagnant += 1
+        if self._n_stagnant < self.window:
+            return False
+        self.reason = f'best fitness improved by at most {self.tol} over {self.window} iterations'
+        return True
+
+
+class RelativeImprovement(StoppingCriterion):
+    uses_diversity = False
+
+    def __init__(self, tol: float, window: int = 1) -> None:
+        super(RelativeImprovement, self).__init__()
+        if tol < 0.:
+            raise ValueError('relative improvement tolerance must be non-negative')
+        if window < 1:
+            raise ValueError('relative improvement window must be at least 1')
+        self.tol = tol
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        super(RelativeImprovement, self).reset()
+        self._bests = deque(maxlen=self.window + 1)
+
+    def get_state(self) -> Dict[str, Any]:
+        return {'bests': [float(best) for best in self._bests]}
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self._bests = deque(state['bests'], maxlen=self.window + 1)
+
+    def update(self, swarm, record: IterationRecord) -> bool:
+        if record.best_fitness is None:
+            return False
+        self._bests.append(record.best_fitness)
+        if len(self._bests) <= self.window:
+            return False
+        old, new = self._bests[0], self._bests[-1]
+        improvement = (new - old) / max(abs(old), 1e-300)
+        if improvement > self.tol:
+            return False
+        self.reason = f'relative improvement {improvement:.3g} over {self.window} iterations below {self.tol}'
+        return True
+
+
+class DiversityCollapse(StoppingCriterion):
+    def __init__(self, min_diversity: float) -> None:
+        super(DiversityCollapse, self).__init__()
+        self.min_diversity = min_diversity
+
+    def update(self, swarm, record: IterationRecord) -> bool:
+        # the record already carries the streamed mean distance to the centroid
+        if isnan(record.diversity) or record.diversity >= self.min_diversity:
+            return False
+        self.reason = f'swarm diversity {record.diversity:.3g} below {self.min_diversity}'
+        return True
+
+
+class DiameterCollapse(StoppingCriterion):
+    uses_diversity = False
+
+    def __init__(self, min_diameter: float) -> None:
+        super(DiameterCollapse, self).__init__()
+        self.min_diameter = min_diameter
+
+    def update(self, swarm, record: IterationRecord) -> bool:
+        # bounding-box diagonal bounds the pairwise diameter from above in O(n) instead of O(n^2)
+        positions = swarm.positions
+        block_size = getattr(swarm, 'block_size', None) or len(positions)
+        lower = full((positions.shape[1],), inf)
+        upper = full((positions.shape[1],), -inf)
+        for start in range(0, len(positions), block_size):
+            block = positions[start:start + block_size]
+            minimum(lower, block.min(axis=0), out=lower)
+            maximum(upper, block.max(axis=0), out=upper)
+        extent = upper - lower
+        diameter = float(sqrt((extent * extent).sum()))
+        if diameter >= self.min_diameter:
+            return False
+        self.reason = f'swarm diameter {diameter:.3g} below {self.min_diameter}'
+        return True
+
+
+class VelocityCollapse(StoppingCriterion):
+    uses_diversity = False
+
+    def __init__(self, min_norm: float) -> None:
+        super(VelocityCollapse, self).__init__()
+        self.min_norm = min_norm
+
+    def update(self, swarm, record: IterationRecord) -> bool:
+        velocities = swarm.velocities
+        block_size = getattr(swarm, 'block_size', None) or len(velocities)
+        total = 0.
+        for start in range(0, len(velocities), block_size):
+            block = velocities[start:start + block_size].astype(float64)
+            total += sqrt((block * block).sum(axis=1)).sum()
+        mean_norm = total / max(len(velocities), 1)
+        if mean_norm >= self.min_norm:
+            return False
+        self.reason = f'mean velocity norm {mean_norm:.3g} below {self.min_norm}'
+        return True
+
+
+def as_stopping_criterion(
+    stopping: Optional[Union[StoppingCriterion, Sequence[StoppingCriterion]]] = None,
+    term_cond_fn: Optional[Callable[..., bool]] = None
+) -> Optional[StoppingCriterion]:
+    criteria = []
+    if term_cond_fn is not None:
+        criteria.append(Condition(term_cond_fn))
+    if isinstance(stopping, StoppingCriterion):
+        criteria.append(stopping)
+    elif isinstance(stopping, Sequence):
+        criteria.extend(stopping)
+    elif stopping is not None:
+        raise ValueError(f'unrecognized stopping criterion {stopping!r}')
+    if len(criteria) == 0:
+        return None
+    criterion = criteria[0] if len(criteria) == 1 else AnyOf(*criteria)
+    criterion.reset()
+    return criterion
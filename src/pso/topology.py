@@ -0,0 +1,136 @@
+from typing import Callable, Optional, Sequence
+
+from numpy import (
+    arange, argsort, bincount, concatenate, cumsum, diff, full, inf, int64, isnan, maximum, minimum, ndarray,
+    repeat, stack, where, zeros
+)
+from numpy.random import rand
+
+from .instance import ParticleInstance
+from .rng import SwarmRandom
+
+
+class CSRTopology(object):
+    def __init__(self, indptr: ndarray, indices: ndarray) -> None:
+        self.indptr = indptr.astype(int64)
+        self.indices = indices.astype(int64)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, ix: int) -> ndarray:
+        return self.indices[self.indptr[ix]:self.indptr[ix + 1]]
+
+    def __iter__(self):
+        return (self[ix] for ix in range(len(self)))
+
+    def __str__(self):
+        return 'CSRTopology(\n' + ',\n'.join(str(row.tolist()) for row in self) + '\n)'
+
+    @property
+    def counts(self) -> ndarray:
+        return diff(self.indptr)
+
+    @classmethod
+    def from_lists(cls, neighbors: Sequence[Sequence[int]]) -> "CSRTopology":
+        counts = [len(row) for row in neighbors]
+        indptr = concatenate([[0], cumsum(counts)])
+        indices = concatenate([row for row in neighbors if len(row) > 0]) if indptr[-1] > 0 else zeros((0,))
+        return cls(indptr, indices)
+
+    @classmethod
+    def from_pairs(cls, n_particles: int, rows: ndarray, cols: ndarray) -> "CSRTopology":
+        order = argsort(rows, kind='stable')
+        indptr = concatenate([[0], cumsum(bincount(rows, minlength=n_particles))])
+        return cls(indptr, cols[order])
+
+    @classmethod
+    def fully_connected(cls, n_particles: int) -> "CSRTopology":
+        indptr = arange(0, n_particles * n_particles + 1, n_particles)
+        indices = repeat(arange(n_particles)[None, :], n_particles, axis=0).ravel()
+        return cls(indptr, indices)
+
+    @classmethod
+    def ring(cls, n_particles: int, k: int = 1) -> "CSRTopology":
+        if k < 1:
+            raise ValueError('ring radius must be at least 1')
+        offsets = arange(-k, k + 1)
+        if 2 * k + 1 > n_particles:
+            return cls.fully_connected(n_particles)
+        indices = (arange(n_particles)[:, None] + offsets[None, :]) % n_particles
+        indptr = arange(0, indices.size + 1, len(offsets))
+        return cls(indptr, indices.ravel())
+
+    @classmethod
+    def von_neumann(cls, n_particles: int, n_rows: Optional[int] = None) -> "CSRTopology":
+        if n_rows is None:
+            n_rows = max(r for r in range(1, int(n_particles ** 0.5) + 1) if n_particles % r == 0)
+        if n_particles % n_rows != 0:
+            raise ValueError(f'number of particles ({n_particles}) must be divisible by n_rows ({n_rows})')
+        n_cols = n_particles // n_rows
+        ixs = arange(n_particles)
+        row, col = ixs // n_cols, ixs % n_cols
+        indices = stack([
+            ixs,
+            ((row - 1) % n_rows) * n_cols + col,
+            ((row + 1) % n_rows) * n_cols + col,
+            row * n_cols + (col - 1) % n_cols,
+            row * n_cols + (col + 1) % n_cols
+        ], axis=1)
+        indptr = arange(0, indices.size + 1, 5)
+        return cls(indptr, indices.ravel())
+
+    @classmethod
+    def star(cls, n_particles: int, hub: int = 0) -> "CSRTopology":
+        neighbors = [[ix, hub] if ix != hub else list(range(n_particles)) for ix in range(n_particles)]
+        return cls.from_lists(neighbors)
+
+    @classmethod
+    def random_k(cls, n_particles: int, k: int, rng: Optional[SwarmRandom] = None) -> "CSRTopology":
+        if k < 1:
+            raise ValueError('number of random neighbors must be at least 1')
+        k = min(k, n_particles - 1)
+        draws = rand(n_particles, n_particles - 1) if rng is None else rng.random((n_particles, n_particles - 1))
+        others = argsort(draws, axis=1)[:, :k]
+        others += others >= arange(n_particles)[:, None]
+        indices = concatenate([arange(n_particles)[:, None], others], axis=1)
+        indptr = arange(0, indices.size + 1, k + 1)
+        return cls(indptr, indices.ravel())
+
+    def neighbors_best(self, fitnesses: ndarray) -> ndarray:
+        n_particles = len(self)
+        counts = self.counts
+        nonempty = counts > 0
+        starts = self.indptr[:-1][nonempty]
+
+        vals = where(isnan(fitnesses), -inf, fitnesses)[self.indices]
+        seg_max = full((n_particles,), -inf)
+        seg_max[nonempty] = maximum.reduceat(vals, starts)
+
+        is_max = vals == repeat(seg_max, counts)
+        positions = where(is_max, arange(len(vals)), len(vals))
+
+        out = arange(n_particles)
+        out[nonempty] = self.indices[minimum.reduceat(positions, starts)]
+
+        return out
+
+
+def fully_connected() -> Callable[[Sequence[ParticleInstance]], CSRTopology]:
+    return lambda particles: CSRTopology.fully_connected(len(particles))
+
+
+def ring(k: int = 1) -> Callable[[Sequence[ParticleInstance]], CSRTopology]:
+    return lambda particles: CSRTopology.ring(len(particles), k)
+
+
+def von_neumann(n_rows: Optional[int] = None) -> Callable[[Sequence[ParticleInstance]], CSRTopology]:
+    return lambda particles: CSRTopology.von_neumann(len(particles), n_rows)
+
+
+def star(hub: int = 0) -> Callable[[Sequence[ParticleInstance]], CSRTopology]:
+    return lambda particles: CSRTopology.star(len(particles), hub)
+
+
+def random_k(k: int, rng: Optional[SwarmRandom] = None) -> Callable[[Sequence[ParticleInstance]], CSRTopology]:
+    return lambda particles: CSRTopology.random_k(len(particles), k, rng)
@@ -0,0 +1,86 @@
+from os.path import abspath, dirname
+import sys
+
+import pytest
+from numpy import cos, random, repeat
+
+# the sources are imported as the top-level src package from the repository root
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from src.pso import ParticleSwarmBase, batch_fitness, pso_iterate  # noqa: E402
+from src.pso.adaptive_complex_directed import (  # noqa: E402
+    ParticleSwarmAdaptiveComplexDirected,
+    acd_pso_iterate,
+    batch_diff
+)
+from src.pso.ese_adaptive import ParticleSwarmAPSOESE, apso_ese_iterate  # noqa: E402
+from src.pso.initializers import uniform  # noqa: E402
+
+DIM = 4
+LOWER, UPPER = repeat(-5., DIM), repeat(5., DIM)
+
+
+def objective(xs):
+    # smooth but multimodal, so swarms keep moving for a few dozen iterations
+    return -(xs ** 2).sum(axis=-1) + cos(3. * xs).sum(axis=-1)
+
+
+def particle_objective(particle):
+    return float(objective(particle.solution))
+
+
+def _make_swarm(kind='pso', n_particles=20, dim=DIM, seed=3, fitness_fn=None, n_iter=30, diff_fn=None, **kwargs):
+    # the initializers draw from the global generator, the updates from the swarm's own;
+    # without a seed both are left to the caller, as the island model seeds them per island
+    if seed is not None:
+        random.seed(seed)
+    pos_init, vel_init = lambda n: uniform(n, -5., 5.), lambda n: uniform(n, -1., 1.)
+    if kind == 'pso':
+        return ParticleSwarmBase(n_particles, dim, pos_init, vel_init, (2., 2.), 0.7, rng=seed, **kwargs)
+    if kind == 'ese':
+        return ParticleSwarmAPSOESE(n_particles, dim, pos_init, vel_init, rng=seed, **kwargs)
+    return ParticleSwarmAdaptiveComplexDirected(
+        n_particles, dim, pos_init, vel_init, (2., 2.), 0.1, 3., 1e-8, 0.9, 0.4, 100 if n_iter is None else n_iter,
+        batch_fitness(objective) if fitness_fn is None else fitness_fn, 'euclidean',
+        batch_diff(lambda a, b: abs(a - b)) if diff_fn is None else diff_fn, rng=seed, **kwargs
+    )
+
+
+def _run_optimizer(kind, n_iter=30, fitness_fn=None, n_interrupt=None, seed=3, swarm_kwargs=None, **kwargs):
+    # runs one of the three optimizers and returns the swarm with its records, abandoning the run early on request
+    fitness_fn = batch_fitness(objective) if fitness_fn is None else fitness_fn
+    swarm = _make_swarm(kind, seed=seed, fitness_fn=fitness_fn, n_iter=n_iter, **(swarm_kwargs or {}))
+    if kind == 'pso':
+        records = pso_iterate(swarm, fitness_fn, n_iter, LOWER, UPPER, LOWER / 5., UPPER / 5., **kwargs)
+    elif kind == 'ese':
+        records = apso_ese_iterate(fitness_fn, swarm, n_iter, 'euclidean', LOWER, UPPER, LOWER / 5., UPPER / 5., **kwargs)
+    else:
+        records = acd_pso_iterate(swarm, LOWER, UPPER, LOWER / 5., UPPER / 5., **kwargs)
+
+    history = []
+    for record in records:
+        history.append(record)
+        if len(history) == n_interrupt:
+            records.close()
+            break
+    return swarm, history
+
+
+@pytest.fixture
+def fitness():
+    return objective
+
+
+@pytest.fixture
+def particle_fitness():
+    return particle_objective
+
+
+@pytest.fixture
+def make_swarm():
+    return _make_swarm
+
+
+@pytest.fixture
+def run_optimizer():
+    return _run_optimizer
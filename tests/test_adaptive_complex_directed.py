@@ -0,0 +1,18 @@
+from numpy import mean
+
+from src.pso.adaptive_complex_directed.util import _random_pairs
+from src.pso.rng import SwarmRandom
+
+
+def test_random_pairs_keep_the_binomial_connection_count():
+    rng = SwarmRandom(0)
+    n_particles, prob = 12, 0.6
+    n_pairs = n_particles * (n_particles - 1) // 2
+    counts = []
+    for _ in range(400):
+        rows, cols = _random_pairs(n_particles, prob, rng)
+        assert (rows > cols).all() and (cols >= 0).all() and (rows < n_particles).all()
+        assert len(set(zip(rows.tolist(), cols.tolist()))) == len(rows)
+        counts.append(len(rows))
+    # sampling with replacement loses collisions and lands well below the binomial mean of 39.6
+    assert abs(mean(counts) - n_pairs * prob) < 0.5
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from numpy import array_equal, random
+
+from src.pso import async_fitness, run_async
+
+
+def _tracked(fitness, xs):
+    # records how many evaluations are in flight, later rows finishing first
+    state = {'active': 0, 'peak': 0, 'loops': set()}
+    delays = {x.tobytes(): 0.002 * (len(xs) - ix) for ix, x in enumerate(xs)}
+
+    async def fn(particle):
+        state['active'] += 1
+        state['peak'] = max(state['peak'], state['active'])
+        state['loops'].add(asyncio.get_running_loop())
+        await asyncio.sleep(delays[particle.solution.tobytes()])
+        state['active'] -= 1
+        return float(fitness(particle.solution))
+
+    return fn, state
+
+
+@pytest.mark.parametrize('max_concurrency,expected_peak', [(None, 16), (3, 3)])
+def test_async_fitness_runs_concurrently_and_keeps_order(max_concurrency, expected_peak, fitness):
+    xs = random.default_rng(0).normal(size=(16, 4))
+    fn, state = _tracked(fitness, xs)
+    fitness_fn = async_fitness(fn, max_concurrency=max_concurrency)
+    assert array_equal(fitness_fn.evaluate_positions(xs), fitness(xs))
+    assert state['peak'] == expected_peak
+    assert fitness_fn.n_evaluations == 16
+
+
+def test_run_async_evaluates_on_the_callers_loop(fitness):
+    xs = random.default_rng(1).normal(size=(8, 4))
+    fn, state = _tracked(fitness, xs)
+    fitness_fn = async_fitness(fn)
+
+    async def main():
+        with pytest.raises(RuntimeError, match='inside a running event loop'):
+            fitness_fn.evaluate_positions(xs)
+        return asyncio.get_running_loop(), await run_async(fitness_fn.evaluate_positions, xs)
+
+    loop, out = asyncio.run(main())
+    assert array_equal(out, fitness(xs))
+    assert state['loops'] == {loop}
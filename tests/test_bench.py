@@ -0,0 +1,46 @@
+import pytest
+
+from src.apps.bench.bench_runner import compare
+
+
+def _row(seed=0, **kwargs):
+    row = {
+        'optimizer': 'pso', 'test': 'sphere', 'dim': 10, 'n_particles': 50, 'n_iter': 100, 'eval_delay': 0., 
+        'eval_work': 0, 'dtype': 'float64', 'storage': 'array', 'seed': seed, 'iters_per_sec': 100., 
+        'evals_per_sec': 5000., 'peak_memory_mb': 10., 'final_fitness': -1., 'time_to_target': 0.5
+    }
+    row.update(kwargs)
+    return row
+
+
+def test_matching_results_pass():
+    baseline = [_row(0), _row(1)]
+    assert compare([_row(0, iters_per_sec=95.), _row(1)], baseline) == ([], [])
+
+
+@pytest.mark.parametrize('gate_throughput', [False, True])
+def test_throughput_is_only_gated_on_request(gate_throughput):
+    results = [_row(iters_per_sec=80., evals_per_sec=4000.)]
+    regressions, warnings = compare(results, [_row()], 0.1, gate_throughput)
+    assert len(regressions if gate_throughput else warnings) == 2
+    assert len(warnings if gate_throughput else regressions) == 0
+    assert all('per_sec' in msg for msg in regressions + warnings)
+
+
+def test_tolerance_is_a_pure_threshold():
+    results = [_row(iters_per_sec=80., peak_memory_mb=11.5)]
+    assert compare(results, [_row()], 0.25, True) == ([], [])
+    regressions, _ = compare(results, [_row()], 0.1, True)
+    assert len(regressions) == 2
+
+
+def test_quality_regressions_always_fail():
+    results = [_row(final_fitness=-2., time_to_target=None), _row(seed=1, final_fitness=-2., time_to_target=None)]
+    regressions, warnings = compare(results, [_row(), _row(seed=1)])
+    assert warnings == []
+    assert any('final_fitness' in msg for msg in regressions)
+    assert any('target reached in 0 runs (baseline 2)' in msg for msg in regressions)
+
+
+def test_unmatched_configurations_are_skipped():
+    assert compare([_row(dim=20, iters_per_sec=1.)], [_row()], 0.1, True) == ([], [])
@@ -0,0 +1,50 @@
+import pytest
+from numpy import array_equal, isneginf
+
+from src.pso import Budget, BudgetExhausted, batch_fitness
+from src.pso.evaluators import SerialEvaluator, evaluate_swarm
+
+
+def _run(run_optimizer, kind, **kwargs):
+    # every optimizer runs without an iteration limit, so only the budget of 610 evaluations ends it
+    vectorized = {'vectorized': True} if kind == 'pso' else {}
+    return run_optimizer(kind, None, swarm_kwargs={'storage': 'array'}, max_evaluations=610, **vectorized, **kwargs)
+
+
+@pytest.mark.parametrize('kind', ['pso', 'ese', 'acd'])
+def test_run_spends_exactly_the_evaluation_budget(kind, run_optimizer, fitness):
+    fitness_fn = batch_fitness(fitness)
+    swarm, history = _run(run_optimizer, kind, fitness_fn=fitness_fn)
+    assert swarm.termination_reason.startswith('evaluation budget exhausted')
+    # the last batch only partially fits, and its prefix is still evaluated
+    assert fitness_fn.n_evaluations == 610
+    assert swarm.best_fitness is not None
+    assert history[-1].n_evaluations <= 610
+
+
+def test_partial_batch_evaluates_the_prefix_that_fits(make_swarm, fitness):
+    swarm = make_swarm('pso', storage='array')
+    fitness_fn = batch_fitness(fitness)
+    fitness_fn.set_budget(Budget(max_evaluations=7))
+    with pytest.raises(BudgetExhausted, match=r'7 of 7 used, 13 requested') as exc_info:
+        evaluate_swarm(SerialEvaluator(), fitness_fn, swarm)
+    fitnesses = exc_info.value.fitnesses
+    assert fitness_fn.n_evaluations == 7
+    assert array_equal(fitnesses[:7], fitness(swarm.positions[:7]))
+    assert isneginf(fitnesses[7:]).all()
+
+
+@pytest.mark.parametrize('kind', ['pso', 'ese', 'acd'])
+def test_resumed_budgeted_run_matches_uninterrupted(kind, run_optimizer, tmp_path):
+    expected, expected_history = _run(run_optimizer, kind)
+    assert expected.termination_reason.startswith('evaluation budget exhausted')
+
+    checkpoint_path = str(tmp_path / 'checkpoint.npz')
+    _run(run_optimizer, kind, n_interrupt=len(expected_history) // 2, checkpoint_path=checkpoint_path)
+    swarm, history = _run(run_optimizer, kind, resume_from=checkpoint_path)
+
+    assert history[-1].iteration == expected_history[-1].iteration
+    assert swarm.termination_reason == expected.termination_reason
+    assert array_equal(swarm.positions, expected.positions)
+    assert array_equal(swarm.best_positions, expected.best_positions)
+    assert swarm.best_fitness == expected.best_fitness
@@ -0,0 +1,49 @@
+import pytest
+from numpy import array_equal
+
+from src.pso import batch_fitness
+
+
+class Crash(Exception):
+    pass
+
+
+class _CrashingFitness(object):
+    def __init__(self, fn, limit=None):
+        self.fn = fn
+        self.limit = limit
+        self.n_calls = 0
+
+    def __call__(self, xs):
+        self.n_calls += 1
+        if self.limit is not None and self.n_calls > self.limit:
+            raise Crash()
+        return self.fn(xs)
+
+
+def _run(run_optimizer, fitness, kind, storage, limit=None, seed=3, **kwargs):
+    topology = {'topology_dist_fn': 'euclidean', 'threshold': 3.} if kind == 'pso' else {}
+    swarm, _ = run_optimizer(
+        kind, 30, batch_fitness(_CrashingFitness(fitness, limit)), seed=seed, swarm_kwargs={'storage': storage},
+        **topology, **kwargs
+    )
+    return swarm
+
+
+@pytest.mark.parametrize('storage', ['list', 'array'])
+@pytest.mark.parametrize('kind', ['pso', 'ese', 'acd'])
+def test_resume_after_crash_is_bit_exact(kind, storage, run_optimizer, fitness, tmp_path):
+    expected = _run(run_optimizer, fitness, kind, storage)
+
+    checkpoint_path = str(tmp_path / 'checkpoint.npz')
+    with pytest.raises(Crash):
+        _run(run_optimizer, fitness, kind, storage, limit=17, checkpoint_path=checkpoint_path, checkpoint_interval=2)
+    # the checkpoint carries the generator states as well, so a different seed must not matter
+    swarm = _run(
+        run_optimizer, fitness, kind, storage, seed=99, resume_from=checkpoint_path, checkpoint_path=checkpoint_path
+    )
+
+    assert array_equal(swarm.positions, expected.positions)
+    assert array_equal(swarm.velocities, expected.velocities)
+    assert array_equal(swarm.best_positions, expected.best_positions)
+    assert swarm.best_fitness == expected.best_fitness
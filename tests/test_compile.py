@@ -0,0 +1,52 @@
+import pytest
+from numpy import array_equal
+
+from src.core.operators import (
+    CompiledOperator, FusedForEach, PopulationOperatorBase, PopulationOperatorForEach, SequentialOperator
+)
+
+
+class _Append(PopulationOperatorForEach):
+    def __init__(self, tag):
+        super(_Append, self).__init__()
+        self.tag = tag
+
+    def op_single(self, instance):
+        instance.append(self.tag)
+
+
+class _Mark(PopulationOperatorBase):
+    def op(self, pop):
+        for instance in pop:
+            instance.append('|')
+
+
+def test_compile_flattens_and_fuses_adjacent_stages():
+    chain = _Append('a') + _Append('b') + _Mark() + (_Append('c') + _Append('d'))
+    compiled = chain.compile()
+    assert isinstance(compiled, CompiledOperator)
+    assert [type(stage) for stage in compiled.stages()] == [FusedForEach, _Mark, FusedForEach]
+
+    expected, pop = [[] for _ in range(3)], [[] for _ in range(3)]
+    chain(expected)
+    compiled(pop)
+    assert pop == expected == [['a', 'b', '|', 'c', 'd']] * 3
+    assert isinstance(SequentialOperator(_Append('a'), _Append('b')).compile(), FusedForEach)
+
+
+@pytest.mark.parametrize('kind,kwargs', [
+    ('pso', {}),
+    ('pso', {'swarm_kwargs': {'storage': 'array'}, 'vectorized': True}),
+    ('ese', {}),
+    ('acd', {})
+])
+def test_compiled_step_matches_the_unfused_chain(kind, kwargs, run_optimizer, monkeypatch):
+    expected, expected_history = run_optimizer(kind, 15, **kwargs)
+    with monkeypatch.context() as patch:
+        # leave every operator chain exactly as it was built
+        patch.setattr(PopulationOperatorBase, 'compile', lambda self: self)
+        swarm, history = run_optimizer(kind, 15, **kwargs)
+
+    assert array_equal(expected.positions, swarm.positions)
+    assert array_equal(expected.velocities, swarm.velocities)
+    assert [record.best_fitness for record in expected_history] == [record.best_fitness for record in history]
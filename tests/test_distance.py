@@ -0,0 +1,77 @@
+import math
+
+import pytest
+from numpy import array_equal, random
+from numpy.testing import assert_allclose
+from scipy.spatial.distance import cdist
+
+from src.pso.adaptive_complex_directed import batch_diff
+from src.pso.adaptive_complex_directed.operators import EvalFitness
+from src.pso.distance import (
+    as_metric,
+    mean_distances,
+    mean_distances_sampled,
+    mean_distances_sqeuclidean,
+    pairwise_distances,
+    radius_pairs
+)
+from src.pso.rng import SwarmRandom
+
+
+@pytest.mark.parametrize('block_size', [None, 7])
+@pytest.mark.parametrize('name', ['euclidean', 'sqeuclidean', 'cityblock', 'chebyshev', 'cosine'])
+def test_registered_metrics_match_cdist(name, block_size):
+    xs = random.default_rng(0).normal(size=(30, 5))
+    assert_allclose(pairwise_distances(xs, as_metric(name), block_size), cdist(xs, xs, metric=name), atol=1e-12)
+
+
+@pytest.mark.parametrize('name,radius', [('euclidean', 1.5), ('sqeuclidean', 2.), ('cityblock', 2.5), ('chebyshev', 1.)])
+def test_tree_radius_pairs_match_brute(name, radius):
+    xs = random.default_rng(1).normal(size=(300, 3))
+    pairs = {}
+    for method, block_size in [('tree', None), ('brute', None), ('brute', 64)]:
+        rows, cols = radius_pairs(xs, radius, as_metric(name), method, block_size)
+        assert (rows > cols).all()
+        pairs[method, block_size] = sorted(zip(rows.tolist(), cols.tolist()))
+    expected = sorted(zip(*[ix.tolist() for ix in (cdist(xs, xs, metric=name) < radius).nonzero()]))
+    expected = [(row, col) for row, col in expected if row > col]
+    assert len(expected) > 0
+    assert pairs['tree', None] == pairs['brute', None] == pairs['brute', 64] == expected
+
+
+def test_scalar_and_batch_diff_build_the_same_network(make_swarm):
+    networks = []
+    for diff_fn in [lambda a, b: math.fabs(a - b), batch_diff(lambda a, b: abs(a - b))]:
+        swarm = make_swarm('acd', storage='array', diff_fn=diff_fn)
+        # the first evaluation builds the initial network
+        EvalFitness()(swarm)
+        networks.append(swarm.topology)
+    assert networks[0].nnz > 0
+    assert array_equal(networks[0].toarray(), networks[1].toarray())
+
+
+def _exact_mean_distances(xs, name):
+    return cdist(xs, xs, metric=name).sum(axis=1) / (len(xs) - 1)
+
+
+@pytest.mark.parametrize('block_size', [None, 7])
+def test_mean_distances_match_the_exact_mean(block_size):
+    xs = random.default_rng(2).normal(size=(40, 5))
+    expected = _exact_mean_distances(xs, 'sqeuclidean')
+    assert_allclose(mean_distances(xs, as_metric('sqeuclidean'), block_size), expected, rtol=1e-12)
+    assert_allclose(mean_distances_sqeuclidean(xs), expected, rtol=1e-12)
+
+
+def test_sampled_mean_distances_estimate_the_exact_mean():
+    xs = random.default_rng(3).normal(size=(400, 5))
+    expected = _exact_mean_distances(xs, 'euclidean')
+
+    # with every particle as an anchor the estimate is exact and carries no error
+    means, std_errs = mean_distances_sampled(xs, as_metric('euclidean'), 400, SwarmRandom(0))
+    assert_allclose(means, expected, rtol=1e-12)
+    assert_allclose(std_errs, 0., atol=1e-12)
+
+    means, std_errs = mean_distances_sampled(xs, as_metric('euclidean'), 50, SwarmRandom(0))
+    assert (std_errs > 0.).all()
+    # the standard errors are calibrated: almost all estimates fall within three of them
+    assert (abs(means - expected) <= 3. * std_errs).mean() > 0.95
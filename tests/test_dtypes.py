@@ -0,0 +1,35 @@
+import pytest
+from numpy import float32, float64, int32, random
+from numpy.testing import assert_allclose
+from scipy.spatial.distance import cdist
+
+from src.pso.distance import as_metric, mean_distances
+
+
+@pytest.mark.parametrize('kind,kwargs', [
+    ('pso', {}),
+    ('pso', {'storage': 'array'}),
+    ('ese', {}),
+    ('acd', {})
+])
+def test_float32_state_stays_float32(kind, kwargs, run_optimizer):
+    vectorized = {'vectorized': True} if kwargs.get('storage') == 'array' else {}
+    swarm, history = run_optimizer(kind, 10, swarm_kwargs=dict(kwargs, dtype=float32), **vectorized)
+    assert len(history) == 10
+    assert swarm.positions.dtype == float32
+    assert swarm.velocities.dtype == float32
+    assert swarm.best_positions.dtype == float32
+
+
+def test_swarm_dtype_must_be_floating(make_swarm):
+    with pytest.raises(ValueError, match='floating point'):
+        make_swarm('pso', dtype=int32)
+
+
+def test_float32_distances_accumulate_in_float64():
+    # a large common offset would wipe out float32 Gram-matrix distances without centering
+    xs = (random.default_rng(0).normal(size=(50, 8)) + 1e3).astype(float32)
+    expected = cdist(xs.astype(float64), xs.astype(float64))
+    out = mean_distances(xs, as_metric('euclidean'))
+    assert out.dtype == float64
+    assert_allclose(out, expected.sum(axis=1) / 49., rtol=1e-5)
@@ -0,0 +1,16 @@
+from numpy import random
+
+from src.pso import batch_fitness
+from src.pso.ese_adaptive.operators import EvalFitness
+
+
+def test_default_delta_comes_from_the_swarm_generator(make_swarm, fitness):
+    deltas = []
+    for global_seed in (0, 1):
+        swarm = make_swarm('ese', storage='array')
+        random.seed(global_seed)
+        eval_fitness = EvalFitness(batch_fitness(fitness), 'euclidean')
+        eval_fitness(swarm)
+        deltas.append(eval_fitness.delta)
+    assert 0.05 <= deltas[0] <= 0.1
+    assert deltas[0] == deltas[1]
@@ -0,0 +1,83 @@
+import gc
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+from numpy import array_equal, random
+
+from src.pso import batch_fitness, cached_fitness
+from src.pso.evaluators import ProcessPoolEvaluator, SerialEvaluator, evaluate_swarm
+
+
+def test_failed_evaluation_leaves_rows_dirty(make_swarm, fitness):
+    swarm = make_swarm('pso', storage='array')
+    evaluator = SerialEvaluator()
+    for ix, value in enumerate(evaluate_swarm(evaluator, batch_fitness(fitness), swarm, track_dirty=True)):
+        swarm.set_fitness(ix, value)
+    assert not swarm.dirty.any()
+
+    swarm.positions[[2, 5]] += 1.
+    swarm.mark_moved([2, 5])
+
+    def fail(xs):
+        raise RuntimeError('evaluation failed')
+
+    with pytest.raises(RuntimeError):
+        evaluate_swarm(evaluator, batch_fitness(fail), swarm, track_dirty=True)
+    assert swarm.dirty.nonzero()[0].tolist() == [2, 5]
+
+
+def test_checkpoint_keeps_only_the_moved_flags(make_swarm, fitness):
+    swarm = make_swarm('pso', storage='array')
+    fitness_fn = batch_fitness(fitness)
+    swarm.record_fitness(evaluate_swarm(SerialEvaluator(), fitness_fn, swarm, track_dirty=True))
+    swarm.positions[4] += 1.
+    swarm.mark_moved([4])
+    state = swarm.get_state()
+    assert state['moved'].dtype == bool and state['moved'].shape == (len(swarm),)
+
+    restored = make_swarm('pso', storage='array')
+    restored.set_state(state)
+    assert restored.dirty.nonzero()[0].tolist() == [4]
+    evaluate_swarm(SerialEvaluator(), fitness_fn, restored, track_dirty=True)
+    assert fitness_fn.n_evaluations == len(swarm) + 1
+
+
+@pytest.mark.parametrize('make_fitness', [
+    lambda fn, particle_fn: batch_fitness(fn),
+    lambda fn, particle_fn: particle_fn,
+    lambda fn, particle_fn: cached_fitness(batch_fitness(fn), tol=1e-9)
+])
+@pytest.mark.parametrize('storage', ['array', 'memmap'])
+def test_process_pool_matches_serial(storage, make_fitness, run_optimizer, fitness, particle_fitness):
+    def run(evaluator):
+        swarm, _ = run_optimizer(
+            'pso', 10, make_fitness(fitness, particle_fitness), seed=11, swarm_kwargs={'storage': storage, 'n_particles': 23},
+            vectorized=True, evaluator=evaluator, track_dirty=True
+        )
+        return swarm
+
+    expected = run(None)
+    with ProcessPoolEvaluator(2, chunk_size=4) as evaluator:
+        swarm = run(evaluator)
+    assert array_equal(swarm.positions, expected.positions)
+    assert array_equal(swarm.fitnesses, expected.fitnesses)
+    assert array_equal(swarm.best_fitnesses, expected.best_fitnesses)
+
+
+def test_process_pool_is_reused_and_released_without_close(fitness):
+    fitness_fn = batch_fitness(fitness)
+    xs = random.default_rng(0).normal(size=(17, 3))
+    evaluator = ProcessPoolEvaluator(2, chunk_size=4)
+    assert array_equal(evaluator.evaluate_positions(fitness_fn, xs), fitness(xs))
+    pool, shm_name = evaluator._resources['pool'], evaluator._resources['shm'].name
+    assert array_equal(evaluator.evaluate_positions(fitness_fn, xs + 1.), fitness(xs + 1.))
+    # the same fitness is served by the same workers and shared block
+    assert evaluator._resources['pool'] is pool
+    assert evaluator._resources['shm'].name == shm_name
+
+    del evaluator
+    gc.collect()
+    with pytest.raises(ValueError):
+        pool.map(abs, [1])
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=shm_name)
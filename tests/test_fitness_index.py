@@ -0,0 +1,78 @@
+import pytest
+from numpy import arange, argsort, array_equal, bincount, isnan, nan, random, unique, where
+
+from src.pso.fitness_index import FitnessIndex
+from src.pso.rng import SwarmRandom
+
+
+def _fitnesses(n=50, seed=0):
+    # distinct fitnesses of both signs, with a few unevaluated particles ranking last
+    rng = random.default_rng(seed)
+    fitnesses = rng.permutation(n) - n / 2. + 0.5
+    fitnesses[rng.choice(n, 5, replace=False)] = nan
+    return fitnesses
+
+
+def _keys(fitnesses):
+    return where(isnan(fitnesses), -float('inf'), fitnesses)
+
+
+@pytest.mark.parametrize('k', [0, 1, 7, 50])
+def test_top_and_bottom_k_match_argsort(k):
+    fitnesses = _fitnesses()
+    index = FitnessIndex(fitnesses)
+    keys = _keys(fitnesses)
+    order = argsort(keys, kind='stable')
+    # the unevaluated particles tie at the bottom, so compare fitnesses rather than indices
+    for selected, expected in [(index.top_k(k), order[len(order) - k:]), (index.bottom_k(k), order[:k])]:
+        assert len(unique(selected)) == k
+        assert array_equal(keys[selected], keys[expected])
+    with pytest.raises(ValueError):
+        index.top_k(51)
+
+
+def test_best_and_worst_follow_updates():
+    fitnesses = _fitnesses()
+    index = FitnessIndex(fitnesses)
+    rng = random.default_rng(1)
+    for step in range(500):
+        if step % 3 == 0:
+            # query before some updates so the heaps go stale and are compacted along the way
+            keys = _keys(fitnesses)
+            assert keys[index.best()] == keys.max()
+            assert keys[index.worst()] == keys.min()
+        ix = int(rng.integers(len(fitnesses)))
+        fitnesses[ix] = nan if rng.random() < 0.05 else rng.normal(scale=50.)
+        index.update(ix, None if isnan(fitnesses[ix]) else fitnesses[ix])
+    keys = _keys(fitnesses)
+    assert keys[index.best()] == keys.max()
+    assert keys[index.worst()] == keys.min()
+    assert array_equal(index.keys, keys)
+
+
+def test_roulette_handles_negative_fitnesses():
+    fitnesses = _fitnesses(10)
+    index = FitnessIndex(fitnesses)
+    rng = SwarmRandom(2)
+    counts = bincount([index.roulette(1, rng)[0] for _ in range(20000)], minlength=10)
+    # weights are shifted so the lowest evaluated fitness gets none, and unevaluated particles are never drawn
+    keys = _keys(fitnesses)
+    valid = keys > -float('inf')
+    weights = where(valid, keys - keys[valid].min(), 0.)
+    assert (counts[weights == 0.] == 0).all()
+    assert abs(counts / counts.sum() - weights / weights.sum()).max() < 0.02
+
+    selected = index.roulette(4, rng)
+    assert len(unique(selected)) == 4
+    assert (weights[selected] > 0.).all()
+
+
+@pytest.mark.parametrize('size', [1, 2, 5])
+def test_tournament_picks_the_best_contestant(size):
+    fitnesses = _fitnesses()
+    index = FitnessIndex(fitnesses)
+    winners = index.tournament(200, SwarmRandom(3), size)
+    contestants = SwarmRandom(3).integers(0, len(fitnesses), size=(200, size))
+    keys = _keys(fitnesses)
+    assert array_equal(winners, contestants[arange(200), keys[contestants].argmax(axis=1)])
+    assert (keys[winners] == keys[contestants].max(axis=1)).all()
@@ -0,0 +1,34 @@
+import pytest
+from numpy import eye, random
+from numpy.testing import assert_allclose
+
+from src.apps.test_functions import get_test, test_names
+from src.apps.test_functions.schwefel import bounds as schwefel_bounds, optimum as schwefel_optimum
+from src.apps.test_functions.transforms import ShiftedRotated
+
+
+@pytest.mark.parametrize('test_name', test_names)
+def test_gradient_matches_finite_differences(test_name):
+    dim, h = 5, 1e-6
+    test = get_test(test_name, dim, seed=4)
+    lower, upper = test['bounds']
+    xs = random.default_rng(5).uniform(0.5 * lower, 0.5 * upper, (8, dim))
+    fitness, gradient = test['fitness'].fn, test['gradient_batch'].evaluate_positions
+    # central differences along each axis, scaled to the width of the domain
+    step = h * (upper - lower)
+    expected = (
+        fitness(xs[:, None, :] + step * eye(dim)) - fitness(xs[:, None, :] - step * eye(dim))
+    ) / (2. * step)
+    assert_allclose(gradient(xs), expected, rtol=1e-4, atol=1e-4)
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('rotate', [False, True])
+def test_shifted_schwefel_optimum_stays_in_bounds(seed, rotate):
+    test = get_test('schwefel', 10)
+    shifted = ShiftedRotated(
+        test['fitness'].fn, test['gradient_batch'], 10, schwefel_bounds, rotate=rotate, seed=seed,
+        base_optimum=schwefel_optimum
+    )
+    assert (abs(shifted.optimum) <= 0.8 * schwefel_bounds[1]).all()
+    assert shifted.fitness(shifted.optimum) == pytest.approx(0., abs=1e-6)
@@ -0,0 +1,61 @@
+from functools import partial
+
+import pytest
+from numpy import repeat
+
+from src.pso import batch_fitness, build_pso_step, island_maximize
+from src.pso.adaptive_complex_directed import build_acd_pso_step
+from src.pso.ese_adaptive import build_apso_ese_step
+from src.pso.islands import _TOPOLOGIES
+
+
+def _make_island(make_swarm, fitness, ix):
+    swarm = make_swarm('pso', 10, 3, seed=None, storage='array')
+    step, _ = build_pso_step(
+        swarm, batch_fitness(fitness), repeat(-5., 3), repeat(5., 3), repeat(-1., 3), repeat(1., 3), vectorized=True
+    )
+    return swarm, step
+
+
+def _make_adaptive_island(make_swarm, fitness, kind, ix):
+    lower, upper = repeat(-5., 3), repeat(5., 3)
+    if kind == 'ese':
+        swarm = make_swarm('ese', 10, 3, seed=None, storage='array')
+        # an explicit delta, since the default is drawn from the swarm generator before the island replaces it
+        step, _ = build_apso_ese_step(
+            batch_fitness(fitness), swarm, 6, 'euclidean', lower, upper, lower / 5., upper / 5., delta=0.07
+        )
+    else:
+        swarm = make_swarm('acd', 10, 3, seed=None, fitness_fn=batch_fitness(fitness), n_iter=6, storage='array')
+        step = build_acd_pso_step(swarm, lower, upper, lower / 5., upper / 5.)
+    return swarm, step
+
+
+@pytest.mark.parametrize('topology', sorted(_TOPOLOGIES))
+def test_migration_runs_for_every_topology(topology, make_swarm, fitness):
+    model = island_maximize(
+        partial(_make_island, make_swarm, fitness), 3, 6, migration_interval=2, topology=topology, n_workers=2, seed=3
+    )
+    assert model.best_fitness is not None
+    assert model.crnt_iter == 6
+
+
+@pytest.mark.parametrize('topology', sorted(_TOPOLOGIES))
+def test_results_do_not_depend_on_worker_count(topology, make_swarm, fitness):
+    make_island = partial(_make_island, make_swarm, fitness)
+    results = [
+        island_maximize(make_island, 4, 6, migration_interval=2, topology=topology, n_workers=n_workers, seed=7).best_fitness
+        for n_workers in (1, 2, 4)
+    ]
+    assert results[0] == results[1] == results[2]
+
+
+@pytest.mark.parametrize('kind', ['ese', 'acd'])
+def test_adaptive_islands_do_not_depend_on_worker_count(kind, make_swarm, fitness):
+    make_island = partial(_make_adaptive_island, make_swarm, fitness, kind)
+    models = [
+        island_maximize(make_island, 4, 6, migration_interval=2, topology='ring', n_workers=n_workers, seed=5)
+        for n_workers in (1, 2)
+    ]
+    assert models[0].best_fitness is not None
+    assert models[0].best_fitness == models[1].best_fitness
@@ -0,0 +1,74 @@
+import pytest
+from numpy import full, random, repeat
+from numpy.testing import assert_allclose
+
+from src.pso import batch_fitness
+from src.pso.local_search import adam_ascent, batch_gradient, gradient_ascent, lbfgs_ascent
+from src.pso.operators import LocalSearch
+
+
+def _sphere(xs):
+    return -((xs - 1.) ** 2).sum(axis=-1)
+
+
+def _sphere_gradient(xs):
+    return -2. * (xs - 1.)
+
+
+def _rosenbrock(xs):
+    return -(100. * (xs[:, 1:] - xs[:, :-1] ** 2) ** 2 + (1. - xs[:, :-1]) ** 2).sum(axis=-1)
+
+
+def _rosenbrock_gradient(xs):
+    grad = full(xs.shape, 0.)
+    inner = xs[:, 1:] - xs[:, :-1] ** 2
+    grad[:, :-1] += 400. * xs[:, :-1] * inner + 2. * (1. - xs[:, :-1])
+    grad[:, 1:] -= 200. * inner
+    return grad
+
+
+def _refine(method, fitness, gradient, xs, n_steps, **kwargs):
+    if method == 'lbfgs':
+        xs, _ = lbfgs_ascent(xs, fitness(xs), batch_fitness(fitness), batch_gradient(gradient), 1e-3, n_steps, **kwargs)
+        return xs
+    if method == 'adam':
+        return adam_ascent(xs, batch_gradient(gradient), 0.05, n_steps, **kwargs)
+    return gradient_ascent(xs, batch_gradient(gradient), 0.1, n_steps, **kwargs)
+
+
+@pytest.mark.parametrize('method', ['gradient', 'adam', 'lbfgs'])
+def test_ascent_converges_on_the_sphere(method):
+    xs = random.default_rng(0).uniform(-3., 3., size=(6, 4))
+    assert_allclose(_refine(method, _sphere, _sphere_gradient, xs, 500), 1., atol=1e-3)
+
+
+def test_lbfgs_converges_on_rosenbrock():
+    xs = random.default_rng(1).uniform(-1.5, 1.5, size=(4, 3))
+    assert_allclose(_refine('lbfgs', _rosenbrock, _rosenbrock_gradient, xs, 500), 1., atol=1e-4)
+
+
+@pytest.mark.parametrize('method', ['gradient', 'adam', 'lbfgs'])
+def test_ascent_stays_within_bounds(method):
+    # the optimum at 1 lies outside the box, so every coordinate ends on the upper bound
+    xs = random.default_rng(2).uniform(-0.5, 0.5, size=(5, 3))
+    out = _refine(method, _sphere, _sphere_gradient, xs, 300, bound_lower=repeat(-0.5, 3), bound_upper=repeat(0.5, 3))
+    assert (out >= -0.5).all() and (out <= 0.5).all()
+    assert_allclose(out, 0.5, atol=1e-3)
+
+
+@pytest.mark.parametrize('method', ['gradient', 'adam', 'lbfgs'])
+def test_local_search_scores_refined_particles(method, make_swarm):
+    with pytest.raises(ValueError, match='local search requires fitness_fn'):
+        LocalSearch(0.1, lambda swarm: [0], batch_gradient(_sphere_gradient), method)
+
+    swarm = make_swarm('pso', storage='array')
+    swarm.record_fitness(_sphere(swarm.positions))
+    swarm.mark_evaluated()
+    local_search = LocalSearch(
+        0.1, lambda swarm: [2, 7], batch_gradient(_sphere_gradient), method, 20, batch_fitness(_sphere)
+    )
+    local_search(swarm)
+    assert_allclose(swarm.fitnesses[[2, 7]], _sphere(swarm.positions[[2, 7]]))
+    assert (swarm.best_fitnesses[[2, 7]] >= swarm.fitnesses[[2, 7]]).all()
+    assert swarm.best_fitness >= swarm.fitnesses[[2, 7]].max()
+    assert not swarm.dirty[[2, 7]].any()
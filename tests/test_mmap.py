@@ -0,0 +1,50 @@
+import pytest
+from numpy import array_equal, memmap
+
+from src.pso.checkpoint import Checkpoint, load_checkpoint
+
+
+def _memmap_kwargs(mmap_dir):
+    # a budget of a few rows forces every blocked pass through many blocks
+    mmap_dir.mkdir()
+    return {'storage': 'memmap', 'mmap_dir': str(mmap_dir), 'memory_budget': 1024}
+
+
+def test_capture_snapshots_mapped_fields_on_disk(make_swarm, fitness, tmp_path):
+    swarm = make_swarm('pso', 50, **_memmap_kwargs(tmp_path / 'swarm'))
+    swarm.record_fitness(fitness(swarm.positions))
+    checkpoint = Checkpoint.capture(swarm, 1)
+    particles = checkpoint.swarm_state['particles']
+    for name in swarm.state.mapped_fields:
+        assert isinstance(particles[name], memmap)
+    expected = swarm.positions.copy()
+
+    swarm.positions[:] += 1.
+    assert array_equal(particles['pos'], expected)
+
+    checkpoint_path = str(tmp_path / 'checkpoint.npz')
+    checkpoint.save(checkpoint_path)
+    restored = make_swarm('pso', 50, **_memmap_kwargs(tmp_path / 'restored'))
+    load_checkpoint(checkpoint_path).restore(restored)
+    assert array_equal(restored.positions, expected)
+    assert array_equal(restored.best_positions, swarm.best_positions)
+    assert array_equal(restored.velocities, swarm.velocities)
+
+
+@pytest.mark.parametrize('topology_kwargs', [
+    {},
+    {'topology_dist_fn': 'euclidean', 'threshold': 3., 'neighbor_search': 'brute'}
+])
+def test_memmap_matches_in_memory(topology_kwargs, run_optimizer, tmp_path):
+    results = {}
+    for storage, swarm_kwargs in [('array', {'storage': 'array'}), ('memmap', _memmap_kwargs(tmp_path / 'swarm'))]:
+        swarm_kwargs['n_particles'] = 50
+        results[storage] = run_optimizer('pso', 12, seed=0, swarm_kwargs=swarm_kwargs, vectorized=True, **topology_kwargs)
+
+    (expected, expected_history), (swarm, history) = results['array'], results['memmap']
+    assert swarm.block_size < len(swarm)
+    assert array_equal(swarm.positions, expected.positions)
+    assert array_equal(swarm.velocities, expected.velocities)
+    assert array_equal(swarm.best_positions, expected.best_positions)
+    assert swarm.best_fitness == expected.best_fitness
+    assert history[-1].diversity == pytest.approx(expected_history[-1].diversity, rel=1e-12)
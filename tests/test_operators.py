@@ -0,0 +1,46 @@
+from numpy import array, array_equal, random, repeat
+from numpy.testing import assert_allclose
+
+from src.pso import ParticleSwarmBase, batch_fitness
+from src.pso.initializers import uniform
+from src.pso.operators import EvalFitness, VelocityUpdate
+
+DIM = 3
+LOWER, UPPER = repeat(-5., DIM), repeat(5., DIM)
+
+
+def _evaluated_swarm(fitness, c, w):
+    random.seed(2)
+    swarm = ParticleSwarmBase(8, DIM, lambda n: uniform(n, -5., 5.), lambda n: uniform(n, -1., 1.), c, w)
+    EvalFitness(batch_fitness(fitness))(swarm)
+    return swarm
+
+
+def test_velocity_update_applies_inertia(fitness):
+    # without acceleration terms the update only scales the velocity by the inertia weight
+    swarm = _evaluated_swarm(fitness, (0., 0.), 0.5)
+    velocities = array([particle.meta.vel for particle in swarm])
+    VelocityUpdate(LOWER, UPPER)(swarm)
+    assert_allclose(array([particle.meta.vel for particle in swarm]), 0.5 * velocities, rtol=1e-15)
+
+
+def test_velocity_update_without_inertia_keeps_velocity(fitness):
+    swarm = _evaluated_swarm(fitness, (0., 0.), None)
+    velocities = array([particle.meta.vel for particle in swarm])
+    VelocityUpdate(LOWER, UPPER)(swarm)
+    assert array_equal(array([particle.meta.vel for particle in swarm]), velocities)
+
+
+def test_thresholded_neighbourhood_ignores_distant_particles(fitness):
+    swarm = _evaluated_swarm(fitness, (2., 2.), 0.7)
+    # particle 0 holds the best fitness but lies outside every other particle's threshold
+    swarm[0].meta.best_fitness = 1e9
+    swarm.topology = [
+        [0. if ix == other else (10. if 0 in (ix, other) else 1.) for other in range(len(swarm))]
+        for ix in range(len(swarm))
+    ]
+    update = VelocityUpdate(LOWER, UPPER, threshold=3.)
+    best_reachable = max(range(1, len(swarm)), key=lambda ix: swarm[ix].meta.best_fitness)
+    for ix in range(1, len(swarm)):
+        assert array_equal(update._neighbors_p_best(ix, swarm), swarm[best_reachable].meta.best_pos)
+    assert array_equal(update._neighbors_p_best(0, swarm), swarm[0].meta.best_pos)
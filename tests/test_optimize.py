@@ -0,0 +1,18 @@
+import pytest
+from numpy.testing import assert_allclose
+
+
+@pytest.mark.parametrize('topology_kwargs', [{}, {'topology_dist_fn': 'euclidean', 'threshold': 3.}])
+@pytest.mark.parametrize('storage,vectorized', [('array', False), ('array', True), ('memmap', False), ('memmap', True)])
+def test_update_paths_match_particle_loop(storage, vectorized, topology_kwargs, run_optimizer):
+    def run(storage, vectorized):
+        swarm, _ = run_optimizer(
+            'pso', 15, seed=11, swarm_kwargs={'storage': storage}, vectorized=vectorized, **topology_kwargs
+        )
+        return swarm
+
+    expected = run('list', False)
+    swarm = run(storage, vectorized)
+    assert_allclose(swarm.positions, expected.positions, rtol=1e-14, atol=1e-14)
+    assert_allclose(swarm.velocities, expected.velocities, rtol=1e-14, atol=1e-14)
+    assert_allclose(swarm.best_fitnesses, expected.best_fitnesses, rtol=1e-14, atol=1e-14)
@@ -0,0 +1,52 @@
+import json
+
+from src.core.operators import OperatorProfiler, PopulationOperatorBase, count_evaluations
+from src.pso import batch_fitness
+
+
+class _Evaluate(PopulationOperatorBase):
+    def op(self, pop):
+        count_evaluations(len(pop))
+
+
+class _Outer(PopulationOperatorBase):
+    def __init__(self):
+        super(_Outer, self).__init__()
+        self.inner = _Evaluate()
+
+    def op(self, pop):
+        self.inner(pop)
+        self.inner(pop)
+
+
+def test_trace_records_nested_operators(tmp_path):
+    with OperatorProfiler(track_memory=True) as profiler:
+        _Outer()([0] * 3)
+    trace_path = tmp_path / 'trace.json'
+    profiler.save_trace(str(trace_path))
+    with open(trace_path) as fp:
+        events = json.load(fp)['traceEvents']
+
+    # events are written as they finish, so the inner calls come before the outer one
+    assert [event['name'] for event in events] == ['_Evaluate', '_Evaluate', '_Outer']
+    assert all(event['ph'] == 'X' and event['cat'] == 'operator' for event in events)
+    assert all('alloc_peak_bytes' in event['args'] for event in events)
+    inner, outer = events[:2], events[2]
+    # nested operators are attributed inclusively, in time and in evaluations
+    assert [event['args']['evaluations'] for event in events] == [3, 3, 6]
+    for event in inner:
+        assert outer['ts'] <= event['ts'] and event['ts'] + event['dur'] <= outer['ts'] + outer['dur']
+    assert profiler.stats['_Evaluate'].calls == 2
+    assert profiler.top_level_ns == profiler.stats['_Outer'].total_ns
+
+
+def test_profiled_run_counts_every_evaluation(run_optimizer, fitness):
+    fitness_fn = batch_fitness(fitness)
+    with OperatorProfiler() as profiler:
+        run_optimizer('pso', 5, fitness_fn, swarm_kwargs={'storage': 'array'}, vectorized=True)
+    trace = profiler.to_chrome_trace()
+    assert sum(event['args']['evaluations'] for event in trace['traceEvents']) == fitness_fn.n_evaluations
+    assert profiler.stats['EvalFitness'].evaluations == fitness_fn.n_evaluations
+    summary = profiler.summary().splitlines()
+    assert summary[0].split()[:2] == ['operator', 'calls']
+    assert {line.split()[0] for line in summary[2:]} == set(profiler.stats)
@@ -0,0 +1,36 @@
+import pytest
+from numpy import array_equal, isnan
+
+from src.pso import DiversityCollapse, RelativeImprovement, Stagnation
+
+
+@pytest.mark.parametrize('make_stopping', [
+    lambda: Stagnation(8, 1e-3),
+    lambda: RelativeImprovement(1e-3, 6),
+    lambda: Stagnation(8, 1e-3) | RelativeImprovement(1e-3, 6)
+])
+def test_resumed_run_stops_like_uninterrupted(make_stopping, run_optimizer, tmp_path):
+    def run(**kwargs):
+        return run_optimizer('pso', 500, swarm_kwargs={'storage': 'array'}, vectorized=True, stopping=make_stopping(), **kwargs)
+
+    expected, expected_history = run()
+    assert expected_history[-1].iteration < 500
+
+    checkpoint_path = str(tmp_path / 'checkpoint.npz')
+    run(n_interrupt=expected_history[-1].iteration - 3, checkpoint_path=checkpoint_path)
+    swarm, history = run(resume_from=checkpoint_path)
+
+    assert history[-1].iteration == expected_history[-1].iteration
+    assert swarm.termination_reason == expected.termination_reason
+    assert array_equal(swarm.positions, expected.positions)
+    assert swarm.best_fitness == expected.best_fitness
+
+
+@pytest.mark.parametrize('kind', ['pso', 'ese', 'acd'])
+def test_diversity_is_only_computed_when_recorded_or_needed(kind, run_optimizer):
+    _, history = run_optimizer(kind, 5, record_diversity=False)
+    assert all(isnan(record.diversity) for record in history)
+    _, history = run_optimizer(kind, 5, record_diversity=False, stopping=Stagnation(50) | DiversityCollapse(1e-12))
+    assert not any(isnan(record.diversity) for record in history)
+    _, history = run_optimizer(kind, 5)
+    assert not any(isnan(record.diversity) for record in history)
@@ -0,0 +1,76 @@
+import pytest
+from numpy import inf, isnan, nan, random, repeat
+from numpy.linalg import norm
+
+from src.pso import batch_fitness, build_pso_step
+from src.pso.operators import UpdateTopologyDist
+from src.pso.rng import SwarmRandom
+from src.pso.topology import CSRTopology
+
+
+def _build(swarm, fitness, **kwargs):
+    lower, upper = repeat(-5., swarm.pos_len), repeat(5., swarm.pos_len)
+    return build_pso_step(swarm, batch_fitness(fitness), lower, upper, None, None, **kwargs)
+
+
+def test_distance_and_predicate_topologies_are_exclusive(make_swarm, fitness):
+    with pytest.raises(ValueError, match='at most one of topology_dist_fn and topology_predicate_fn'):
+        _build(make_swarm(), fitness, topology_dist_fn='euclidean', topology_predicate_fn=lambda a, b: True, threshold=3.)
+    with pytest.raises(ValueError, match='prefilter_predicate requires'):
+        _build(make_swarm(), fitness, topology_predicate_fn=lambda a, b: True, prefilter_predicate=True)
+
+
+def test_prefiltered_predicate_only_links_pairs_within_threshold(make_swarm, fitness):
+    swarm = make_swarm(storage='array')
+    pso_step, _ = _build(
+        swarm, fitness, topology_dist_fn='euclidean', topology_predicate_fn=lambda a, b: abs(a.solution[0] - b.solution[0]) > 1., 
+        threshold=3., prefilter_predicate=True
+    )
+    pso_step(swarm)
+
+    positions = swarm.positions
+    expected = [
+        sorted(
+            ix_other for ix_other in range(len(swarm)) 
+            if ix_other != ix and norm(positions[ix] - positions[ix_other]) < 3. 
+            and abs(positions[ix, 0] - positions[ix_other, 0]) > 1.
+        ) 
+        for ix in range(len(swarm))
+    ]
+    assert [sorted(neighbors.tolist()) for neighbors in swarm.topology] == expected
+
+
+def test_thresholded_distance_topology_defaults_to_radius_search(make_swarm):
+    swarm = make_swarm(storage='array')
+    assert UpdateTopologyDist('euclidean').neighbor_search == 'dense'
+    topology_upd = UpdateTopologyDist('euclidean', threshold=3.)
+    assert topology_upd.neighbor_search == 'auto'
+    topology_upd(swarm)
+    assert isinstance(swarm.topology, CSRTopology)
+    dists = norm(swarm.positions[:, None] - swarm.positions[None, :], axis=-1)
+    assert [sorted(neighbors.tolist()) for neighbors in swarm.topology] == [row.nonzero()[0].tolist() for row in dists < 3.]
+
+
+def _neighbors_best_loop(topology, fitnesses):
+    # the first neighbour holding the best fitness wins, particles without neighbours keep themselves
+    best = []
+    for ix, row in enumerate(topology):
+        candidates = [(-inf if isnan(fitnesses[j]) else fitnesses[j], -pos, j) for pos, j in enumerate(row.tolist())]
+        best.append(max(candidates)[2] if candidates else ix)
+    return best
+
+
+@pytest.mark.parametrize('topology', [
+    CSRTopology.fully_connected(30),
+    CSRTopology.ring(30, 2),
+    CSRTopology.von_neumann(30),
+    CSRTopology.star(30, 4),
+    CSRTopology.random_k(30, 3, SwarmRandom(0)),
+    CSRTopology.from_lists([[] if ix % 4 == 0 else [(ix * 7 + j) % 30 for j in range(ix % 5)] for ix in range(30)])
+])
+def test_neighbors_best_matches_a_python_loop(topology):
+    rng = random.default_rng(1)
+    # few distinct values so ties are common, with some unevaluated particles
+    fitnesses = rng.integers(0, 4, 30).astype(float)
+    fitnesses[rng.choice(30, 6, replace=False)] = nan
+    assert topology.neighbors_best(fitnesses).tolist() == _neighbors_best_loop(topology, fitnesses)